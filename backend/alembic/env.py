@@ -18,8 +18,9 @@ if SRC_DIR.exists():
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. Skipped when migrating from inside the running
+# API, where it would disable the server's already configured loggers.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 from sniffnet.database import db  # noqa: E402
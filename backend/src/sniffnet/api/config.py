@@ -1,7 +1,142 @@
 import os
 from pathlib import Path
 
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no", "off", "")
+
+
+# Which routers this process serves: all | crud | inference. "crud" workers never import
+# numpy, PIL or the model backends.
+API_ROLE = os.getenv("API_ROLE", "all")
+API_ROLES = ("all", "crud", "inference")
+API_HOST = os.getenv("API_HOST", "localhost")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+# >1 serves from pre-forked workers sharing one preloaded model copy-on-write
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+
 DEFAULT_WEIGHTS_PATH = Path(__file__).resolve().parents[3] / "artifacts" / "models" / "model.pth"
 
 MODEL_WEIGHTS_PATH = Path(os.getenv("MODEL_WEIGHTS_PATH", DEFAULT_WEIGHTS_PATH))
 MODEL_DEVICE = os.getenv("MODEL_DEVICE", "cpu")
+# torch | onnxruntime (CPU only, serves MODEL_ONNX_PATH without importing torch)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+MODEL_ONNX_PATH = os.getenv("MODEL_ONNX_PATH") or None
+MODEL_FUSE = _env_flag("MODEL_FUSE", "1")
+# Memory-map .pth checkpoints (.safetensors always are). Deploy new weights by renaming
+# over MODEL_WEIGHTS_PATH, never by rewriting it in place. Mapped weights are served
+# unfused (MODEL_FUSE is ignored) so workers share them; TorchScript and INT8 copy them.
+MODEL_MMAP_WEIGHTS = _env_flag("MODEL_MMAP_WEIGHTS", "0")
+# eager | torchscript | compile
+MODEL_SERVING_MODE = os.getenv("MODEL_SERVING_MODE", "eager")
+MODEL_WARMUP_BATCH_SIZES = [
+    int(size) for size in os.getenv("MODEL_WARMUP_BATCH_SIZES", "1,8,16").split(",") if size.strip()
+]
+# Batch sizes of the post-load self-benchmark reported by /api/model/health
+MODEL_HEALTH_BATCH_SIZES = [
+    int(size) for size in os.getenv("MODEL_HEALTH_BATCH_SIZES", "1,8,32").split(",") if size.strip()
+]
+# none | dynamic (INT8 fc) | static (INT8 conv stack, calibrated on MODEL_CALIBRATION_DIR)
+MODEL_QUANTIZATION = os.getenv("MODEL_QUANTIZATION", "none")
+MODEL_CALIBRATION_DIR = os.getenv("MODEL_CALIBRATION_DIR") or None
+
+# Threads decoding and preprocessing uploads (and running bulk/video forwards) off the event loop
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Forward passes that may run at once: the micro-batcher's plus one bulk, video or job forward
+MODEL_MAX_CONCURRENT_FORWARDS = int(os.getenv("MODEL_MAX_CONCURRENT_FORWARDS", "2"))
+# Intra-op threads of the model backend (process-wide for torch); 0 means all cores, since
+# /api/predict forwards run one at a time on the micro-batcher thread
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0")) or (os.cpu_count() or 1)
+
+# Model backend threads per pre-forked worker; 0 splits the cores evenly between the workers
+API_WORKER_THREADS = int(os.getenv("API_WORKER_THREADS", "0")) or max(1, (os.cpu_count() or 1) // API_WORKERS)
+
+# Extra keyword arguments for model_loader.start_load
+MODEL_LOAD_OPTIONS = {
+    "fuse": MODEL_FUSE,
+    "serving_mode": MODEL_SERVING_MODE,
+    "warmup_batch_sizes": MODEL_WARMUP_BATCH_SIZES,
+    "quantization": MODEL_QUANTIZATION,
+    "calibration_dir": MODEL_CALIBRATION_DIR,
+    "backend": MODEL_BACKEND,
+    "onnx_path": MODEL_ONNX_PATH,
+    "num_threads": TORCH_NUM_THREADS,
+    "mmap_weights": MODEL_MMAP_WEIGHTS,
+    "health_batch_sizes": MODEL_HEALTH_BATCH_SIZES,
+}
+
+# Optional cascade: a small model (e.g. a reduced-width ResNet-18 checkpoint) answers first and
+# images below MODEL_CASCADE_THRESHOLD softmax confidence are escalated to the full model.
+# MODEL_CASCADE_INPUT_STRIDE=2 feeds the small model half-resolution input; MODEL_CASCADE_AUDIT_RATE
+# re-checks that fraction of confident answers with the full model to measure agreement.
+MODEL_CASCADE_WEIGHTS_PATH = os.getenv("MODEL_CASCADE_WEIGHTS_PATH") or None
+MODEL_CASCADE_THRESHOLD = float(os.getenv("MODEL_CASCADE_THRESHOLD", "0.9"))
+MODEL_CASCADE_INPUT_STRIDE = int(os.getenv("MODEL_CASCADE_INPUT_STRIDE", "1"))
+MODEL_CASCADE_AUDIT_RATE = float(os.getenv("MODEL_CASCADE_AUDIT_RATE", "0"))
+
+# Startup work done concurrently in the app lifespan; /api/ready turns green once all of it is done
+STARTUP_RUN_MIGRATIONS = _env_flag("STARTUP_RUN_MIGRATIONS", "1")
+STARTUP_PRELOAD_MODEL = _env_flag("STARTUP_PRELOAD_MODEL", "1")
+DB_POOL_WARMUP_CONNECTIONS = int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", "5"))
+
+# Poll MODEL_WEIGHTS_PATH and hot-swap the served model when the file changes
+MODEL_WATCH_WEIGHTS = _env_flag("MODEL_WATCH_WEIGHTS", "0")
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "2"))
+
+# Registry of resident models: the default one plus checkpoints from the Model table,
+# least recently used evicted past MODEL_REGISTRY_MAX_MODELS or MODEL_REGISTRY_MAX_MB (0 = unlimited)
+MODEL_REGISTRY_MAX_MODELS = int(os.getenv("MODEL_REGISTRY_MAX_MODELS", "3"))
+MODEL_REGISTRY_MAX_MB = float(os.getenv("MODEL_REGISTRY_MAX_MB", "0"))
+# Where Model.weights blobs are written before loading
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", DEFAULT_WEIGHTS_PATH.parent / "cache"))
+# How long a request waits for its model to finish loading before it gets 503
+MODEL_LOAD_TIMEOUT_S = float(os.getenv("MODEL_LOAD_TIMEOUT_S", "30"))
+
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "16"))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+
+# Admission control: past PREDICT_MAX_PENDING requests in flight new ones get 429 at once,
+# and requests still queued PREDICT_DEADLINE_S after arrival are dropped with 503 (0 = no limit).
+# The deadline runs while a request waits for a cold model load, so it has to stay above
+# MODEL_LOAD_TIMEOUT_S: otherwise requests arriving during a load time out once it is done.
+PREDICT_MAX_PENDING = int(os.getenv("PREDICT_MAX_PENDING", "256"))
+PREDICT_DEADLINE_S = float(os.getenv("PREDICT_DEADLINE_S", str(MODEL_LOAD_TIMEOUT_S + 10)))
+
+# Frames buffered per /api/predict/stream connection; older ones are dropped when the
+# client sends faster than the model keeps up
+PREDICT_STREAM_MAX_PENDING = int(os.getenv("PREDICT_STREAM_MAX_PENDING", "4"))
+
+# /api/predict/video: frames sampled per second of video and the timeline's segment length
+PREDICT_VIDEO_SAMPLE_FPS = float(os.getenv("PREDICT_VIDEO_SAMPLE_FPS", "2"))
+PREDICT_VIDEO_SEGMENT_S = float(os.getenv("PREDICT_VIDEO_SEGMENT_S", "1"))
+
+PREDICT_BULK_MAX_IMAGES = int(os.getenv("PREDICT_BULK_MAX_IMAGES", "1000"))
+PREDICT_BULK_CHUNK_SIZE = int(os.getenv("PREDICT_BULK_CHUNK_SIZE", "64"))
+
+# Asynchronous bulk jobs (/api/predict/jobs) keep their state and results in PREDICT_JOBS_DIR.
+# Jobs read uploaded archives; server paths are accepted only below PREDICT_JOBS_INPUT_ROOT,
+# and not at all while it is unset.
+PREDICT_JOBS_DIR = Path(os.getenv("PREDICT_JOBS_DIR", DEFAULT_WEIGHTS_PATH.parents[1] / "jobs"))
+PREDICT_JOBS_INPUT_ROOT = os.getenv("PREDICT_JOBS_INPUT_ROOT") or None
+PREDICT_JOBS_BATCH_SIZE = int(os.getenv("PREDICT_JOBS_BATCH_SIZE", "64"))
+
+# Content-addressed cache of /api/predict results; PREDICT_CACHE_SIZE=0 disables it.
+# PREDICT_CACHE_DIR adds an on-disk tier that several workers can share; expired files
+# are swept from it about once per TTL.
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "1024"))
+PREDICT_CACHE_TTL_S = float(os.getenv("PREDICT_CACHE_TTL_S", "600"))
+PREDICT_CACHE_DIR = os.getenv("PREDICT_CACHE_DIR") or None
+
+# Optional near-duplicate lookup in front of the model: reuse the prediction of a recent
+# image whose perceptual hash is within PREDICT_PHASH_MAX_DISTANCE bits (of 64)
+PREDICT_PHASH_ENABLED = _env_flag("PREDICT_PHASH_ENABLED", "0")
+PREDICT_PHASH_MAX_DISTANCE = int(os.getenv("PREDICT_PHASH_MAX_DISTANCE", "4"))
+PREDICT_PHASH_SIZE = int(os.getenv("PREDICT_PHASH_SIZE", "4096"))
+
+# Nearest-neighbour index of image embeddings (the model's pooled features), memory-mapped
+# in PREDICT_EMBEDDINGS_DIR; unset disables it. Images classified by /api/predict with the
+# default model are added to it; behind a model cascade only those the full model saw
+# (escalated or audited) are. PREDICT_EMBEDDINGS_DTYPE=float16 halves its size.
+PREDICT_EMBEDDINGS_DIR = os.getenv("PREDICT_EMBEDDINGS_DIR") or None
+PREDICT_EMBEDDINGS_DIM = int(os.getenv("PREDICT_EMBEDDINGS_DIM", "512"))
+PREDICT_EMBEDDINGS_DTYPE = os.getenv("PREDICT_EMBEDDINGS_DTYPE", "float32")
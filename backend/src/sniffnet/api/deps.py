@@ -6,4 +6,4 @@ def get_database():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,182 @@
+"""Singletons shared by the inference routers.
+
+Kept apart from ``deps`` so that CRUD-only workers never import the ML stack.
+"""
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from sniffnet.api import prefork
+from sniffnet.api.config import (
+    INFERENCE_WORKERS,
+    MODEL_CACHE_DIR,
+    MODEL_CASCADE_AUDIT_RATE,
+    MODEL_CASCADE_INPUT_STRIDE,
+    MODEL_CASCADE_THRESHOLD,
+    MODEL_CASCADE_WEIGHTS_PATH,
+    MODEL_DEVICE,
+    MODEL_LOAD_OPTIONS,
+    MODEL_MAX_CONCURRENT_FORWARDS,
+    MODEL_REGISTRY_MAX_MB,
+    MODEL_REGISTRY_MAX_MODELS,
+    MODEL_WATCH_INTERVAL_S,
+    MODEL_WEIGHTS_PATH,
+    PREDICT_CACHE_DIR,
+    PREDICT_DEADLINE_S,
+    PREDICT_EMBEDDINGS_DIM,
+    PREDICT_EMBEDDINGS_DIR,
+    PREDICT_EMBEDDINGS_DTYPE,
+    PREDICT_JOBS_BATCH_SIZE,
+    PREDICT_JOBS_DIR,
+    PREDICT_CACHE_SIZE,
+    PREDICT_CACHE_TTL_S,
+    PREDICT_PHASH_ENABLED,
+    PREDICT_PHASH_MAX_DISTANCE,
+    PREDICT_PHASH_SIZE,
+    PREDICT_MAX_BATCH_SIZE,
+    PREDICT_MAX_PENDING,
+    PREDICT_MAX_WAIT_MS,
+)
+from sniffnet.core.admission import AdmissionController
+from sniffnet.core.batching import MicroBatcher
+from sniffnet.core.bulk_jobs import BulkJobs
+from sniffnet.core.checkpoints import materialize_checkpoint
+from sniffnet.core.embedding_index import EmbeddingIndex
+from sniffnet.core.executor import InferenceExecutor
+from sniffnet.core import model_loader
+from sniffnet.core.model_loader import configure_cascade, configure_forwards, configure_registry, predict_keyed_batch
+from sniffnet.core.perceptual_cache import PerceptualIndex
+from sniffnet.core.prediction_cache import PredictionCache
+from sniffnet.core.weights_watcher import WeightsWatcher
+from sniffnet.database.db import SessionLocal
+from sniffnet.database.db_models import Model
+
+configure_registry(MODEL_REGISTRY_MAX_MODELS, int(MODEL_REGISTRY_MAX_MB * 1024 * 1024))
+configure_forwards(MODEL_MAX_CONCURRENT_FORWARDS)
+if MODEL_CASCADE_WEIGHTS_PATH:
+    # No options: the small model loads with those of the full model, thread count included
+    configure_cascade(
+        MODEL_CASCADE_WEIGHTS_PATH,
+        MODEL_DEVICE,
+        threshold=MODEL_CASCADE_THRESHOLD,
+        input_stride=MODEL_CASCADE_INPUT_STRIDE,
+        audit_rate=MODEL_CASCADE_AUDIT_RATE,
+    )
+
+# Requests are submitted as (model key, pixels) pairs
+_PREDICT_BATCHER = MicroBatcher(
+    predict_keyed_batch,
+    max_batch_size=PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=PREDICT_MAX_WAIT_MS,
+    name="predict-batcher",
+)
+
+_ADMISSION = AdmissionController(PREDICT_MAX_PENDING, PREDICT_DEADLINE_S)
+
+_INFERENCE_EXECUTOR = InferenceExecutor(max_workers=INFERENCE_WORKERS)
+
+_PREDICTION_CACHE = PredictionCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL_S, PREDICT_CACHE_DIR)
+
+_PERCEPTUAL_INDEX = PerceptualIndex(
+    PREDICT_PHASH_SIZE if PREDICT_PHASH_ENABLED else 0,
+    max_distance=PREDICT_PHASH_MAX_DISTANCE,
+)
+
+
+_EMBEDDING_INDEX = EmbeddingIndex(PREDICT_EMBEDDINGS_DIR, dim=PREDICT_EMBEDDINGS_DIM, dtype=PREDICT_EMBEDDINGS_DTYPE)
+
+
+def _reload_default_model() -> bool:
+    """Start swapping in the new default weights; False if that has to wait for a running load."""
+    if not model_loader.is_loaded():
+        # Not loaded at all: the first request will load the new file anyway
+        return not model_loader.is_loading()
+    return model_loader.reload(str(MODEL_WEIGHTS_PATH))
+
+
+# With an explicit MODEL_ONNX_PATH the onnxruntime backend never reads the checkpoint: watch the file it serves
+if MODEL_LOAD_OPTIONS["backend"] == "onnxruntime" and MODEL_LOAD_OPTIONS["onnx_path"]:
+    _WATCHED_PATH = Path(MODEL_LOAD_OPTIONS["onnx_path"])
+else:
+    _WATCHED_PATH = MODEL_WEIGHTS_PATH
+
+_WEIGHTS_WATCHER = WeightsWatcher(_WATCHED_PATH, _reload_default_model, interval_s=MODEL_WATCH_INTERVAL_S)
+
+
+def _materialize_model_weights(db: Session, model_id: int) -> Path | None:
+    """Write the weights of a ``Model`` row to the checkpoint cache; None if there are none."""
+    row = db.query(Model).filter(Model.model_id == model_id).first()
+    if row is None or not row.weights:
+        return None
+    return materialize_checkpoint(row.weights, MODEL_CACHE_DIR, f"model-{model_id}")
+
+
+def start_stored_model_load(db: Session, model_id: int) -> bool:
+    """Start loading ``model:{model_id}`` from the Model table; False if the row has no weights."""
+    key = f"model:{model_id}"
+    if model_loader.is_loaded(key) or model_loader.is_loading(key):
+        # Already in the registry: don't write the weights blob out again
+        return True
+    weights_file = _materialize_model_weights(db, model_id)
+    if weights_file is None:
+        return False
+    # Stored checkpoints have no exported .onnx next to them
+    options = {**get_model_load_options(), "onnx_path": None}
+    model_loader.start_load(str(weights_file), MODEL_DEVICE, **options, key=key)
+    return True
+
+
+def _load_job_model(key: str) -> None:
+    """Load a bulk job's model again if the registry evicted it while the job was queued."""
+    if key == model_loader.DEFAULT_KEY:
+        model_loader.start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE, **get_model_load_options())
+        return
+
+    model_id = int(key.removeprefix("model:"))
+    db = SessionLocal()
+    try:
+        if not start_stored_model_load(db, model_id):
+            raise RuntimeError(f"Model {model_id} has no weights")
+    finally:
+        db.close()
+
+
+_BULK_JOBS = BulkJobs(PREDICT_JOBS_DIR, batch_size=PREDICT_JOBS_BATCH_SIZE, load_model=_load_job_model)
+
+
+def get_predict_batcher() -> MicroBatcher:
+    return _PREDICT_BATCHER
+
+
+def get_admission_controller() -> AdmissionController:
+    return _ADMISSION
+
+
+def get_inference_executor() -> InferenceExecutor:
+    return _INFERENCE_EXECUTOR
+
+
+def get_weights_watcher() -> WeightsWatcher:
+    return _WEIGHTS_WATCHER
+
+
+def get_bulk_jobs() -> BulkJobs:
+    return _BULK_JOBS
+
+
+def get_prediction_cache() -> PredictionCache:
+    return _PREDICTION_CACHE
+
+
+def get_perceptual_index() -> PerceptualIndex:
+    return _PERCEPTUAL_INDEX
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    return _EMBEDDING_INDEX
+
+
+def get_model_load_options() -> dict:
+    """``start_load`` keyword arguments for the served models, with this pre-forked worker's thread count."""
+    threads = prefork.worker_threads()
+    return MODEL_LOAD_OPTIONS if threads is None else {**MODEL_LOAD_OPTIONS, "num_threads": threads}
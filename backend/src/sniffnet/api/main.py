@@ -1,8 +1,9 @@
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from alembic import command
-from alembic.config import Config
-from pathlib import Path
 from sniffnet.api.routes import (
     datasets,
     experiments,
@@ -11,13 +12,60 @@ from sniffnet.api.routes import (
     training_configs,
     users,
     auth,
-    predict,
-    model_load,
+    health,
+)
+from sniffnet.api import prefork
+from sniffnet.api.config import (
+    API_HOST,
+    API_PORT,
+    API_ROLE,
+    API_ROLES,
+    API_WORKER_THREADS,
+    API_WORKERS,
+    MODEL_WATCH_WEIGHTS,
+)
+from sniffnet.api.startup import (
+    default_startup_checks,
+    preload_before_fork,
+    run_migrations,  # noqa: F401 (re-exported)
 )
 
 import uvicorn
 
-app = FastAPI()
+if API_ROLE not in API_ROLES:
+    raise ValueError(f"Unknown API_ROLE {API_ROLE!r}; expected one of {API_ROLES}")
+SERVE_CRUD = API_ROLE in ("all", "crud")
+SERVE_INFERENCE = API_ROLE in ("all", "inference")
+
+# Inference routers pull in numpy, PIL and the model loader: import them only when served
+INFERENCE_ROUTERS = ("predict", "model_load")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Migrations, DB pool warmup and model preload run concurrently in the background;
+    # /api/ready reports when all of them are done
+    # Pre-forked workers were migrated by the parent
+    app.state.startup = default_startup_checks(serve_inference=SERVE_INFERENCE, migrations=not prefork.in_worker())
+    startup_task = asyncio.create_task(app.state.startup.run())
+
+    watcher = None
+    if SERVE_INFERENCE and MODEL_WATCH_WEIGHTS:
+        from sniffnet.api.inference_deps import get_weights_watcher
+
+        watcher = get_weights_watcher()
+        watcher.start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    if SERVE_INFERENCE:
+        from sniffnet.api.inference_deps import get_embedding_index
+
+        get_embedding_index().flush()
+    startup_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -34,30 +82,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(datasets.router)
-app.include_router(experiments.router)
-app.include_router(metrics.router)
-app.include_router(models.router)
-app.include_router(training_configs.router)
-app.include_router(users.router)
-app.include_router(auth.router)
-app.include_router(predict.router)
-app.include_router(model_load.router)
+if SERVE_CRUD:
+    app.include_router(datasets.router)
+    app.include_router(experiments.router)
+    app.include_router(metrics.router)
+    app.include_router(models.router)
+    app.include_router(training_configs.router)
+    app.include_router(users.router)
+    app.include_router(auth.router)
+if SERVE_INFERENCE:
+    for name in INFERENCE_ROUTERS:
+        app.include_router(importlib.import_module(f"sniffnet.api.routes.{name}").router)
+app.include_router(health.router)
 
 @app.get("/")
 def get_main_page():
     return {"message": "Hello, World!"}
 
 
-def run_migrations() -> None:
-    project_root = Path(__file__).resolve().parents[3]
-    alembic_cfg = Config(str(project_root / "alembic.ini"))
-    command.upgrade(alembic_cfg, "head")
-
-
 def main() -> None:
-    run_migrations()
-    uvicorn.run(app, host="localhost", port=8000)
+    if API_WORKERS > 1:
+        prefork.serve_prefork(
+            app,
+            API_WORKERS,
+            API_HOST,
+            API_PORT,
+            API_WORKER_THREADS,
+            preload=lambda: preload_before_fork(serve_inference=SERVE_INFERENCE),
+        )
+    else:
+        uvicorn.run(app, host=API_HOST, port=API_PORT)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,192 @@
+"""Pre-fork serving: load the model once in a parent process, then fork N uvicorn workers.
+
+Forked workers share the parent's model weights copy-on-write. The parent runs
+torch single-threaded, because the OpenMP pool of a parent that has used several
+threads hangs in forked children. Each worker then sets its own thread count.
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing.sharedctypes import RawArray
+from typing import Callable
+
+import uvicorn
+
+_LOGGER = logging.getLogger(__name__)
+
+# Per-worker slots in memory shared by all workers: pid, requests served, start time
+_FIELDS = 3
+_SLOTS = None
+_WORKER_INDEX = None
+_WORKER_THREADS = None
+_STARTED_AT = None
+
+
+def in_worker() -> bool:
+    """True inside a forked pre-fork worker."""
+    return _WORKER_INDEX is not None
+
+
+def worker_threads() -> int | None:
+    """Model backend threads of this pre-forked worker, or None outside pre-fork mode."""
+    return _WORKER_THREADS
+
+
+class _CountRequests:
+    """ASGI wrapper counting the HTTP requests this worker has served."""
+
+    def __init__(self, app, index: int) -> None:
+        self.app = app
+        self.index = index
+
+    async def __call__(self, scope, receive, send):
+        # Counted on arrival, so a client that sees a response also sees it counted
+        if scope["type"] == "http":
+            _SLOTS[self.index * _FIELDS + 1] += 1
+        await self.app(scope, receive, send)
+
+
+def _memory_mb(pid: int) -> dict | None:
+    """RSS/PSS and shared/private memory of ``pid`` from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r", encoding="ascii") as fh:
+            fields = dict(line.split(":", 1) for line in fh if ":" in line and not line.startswith(" "))
+    except OSError:
+        return None
+
+    def kb(*names):
+        return sum(int(fields[name].split()[0]) for name in names if name in fields) / 1024
+
+    return {
+        "rss_mb": kb("Rss"),
+        "pss_mb": kb("Pss"),
+        "shared_mb": kb("Shared_Clean", "Shared_Dirty"),
+        "private_mb": kb("Private_Clean", "Private_Dirty"),
+    }
+
+
+def worker_stats() -> dict | None:
+    """Memory and request counts of every worker, or None outside pre-fork mode."""
+    if _SLOTS is None:
+        return None
+
+    now = time.time()
+    workers = []
+    for index in range(len(_SLOTS) // _FIELDS):
+        pid, requests, started_at = _SLOTS[index * _FIELDS:(index + 1) * _FIELDS]
+        workers.append(
+            {
+                "index": index,
+                "pid": int(pid),
+                "requests": int(requests),
+                "uptime_s": now - started_at if started_at else None,
+                "memory": _memory_mb(int(pid)) if pid else None,
+            }
+        )
+
+    total = sum(worker["requests"] for worker in workers)
+    uptime = now - _STARTED_AT
+    return {
+        "worker": _WORKER_INDEX,
+        "workers": workers,
+        "total_requests": total,
+        "uptime_s": uptime,
+        "throughput_rps": total / uptime if uptime > 0 else 0.0,
+        "total_pss_mb": sum(worker["memory"]["pss_mb"] for worker in workers if worker["memory"]),
+    }
+
+
+def _run_worker(app, index: int, sock: socket.socket, threads: int, log_level: str) -> None:
+    global _WORKER_INDEX, _WORKER_THREADS
+    _WORKER_INDEX = index
+    _WORKER_THREADS = threads
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    _SLOTS[index * _FIELDS:(index + 1) * _FIELDS] = [os.getpid(), 0, time.time()]
+
+    from sniffnet.database.db import engine
+
+    # Connections opened by the parent must not be shared with the children
+    engine.dispose(close=False)
+    # Loads in this worker ask for its share of the cores through ``worker_threads``
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+    config = uvicorn.Config(_CountRequests(app, index), log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve_prefork(
+    app,
+    workers: int,
+    host: str,
+    port: int,
+    threads_per_worker: int,
+    preload: Callable[[], None] | None = None,
+    log_level: str = "info",
+) -> None:
+    """Run ``preload`` once, then serve ``app`` from ``workers`` forked processes.
+
+    Workers that die are restarted; SIGTERM/SIGINT stop all of them.
+    """
+    global _SLOTS, _STARTED_AT
+    _SLOTS = RawArray("d", workers * _FIELDS)
+    _STARTED_AT = time.time()
+
+    if preload is not None:
+        preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Keep the preloaded objects out of the collector so it doesn't write to (and copy) their pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, index, sock, threads_per_worker, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        spawn(index)
+    _LOGGER.info(
+        "Serving on %s:%d with %d pre-forked workers, %d threads each", host, port, workers, threads_per_worker
+    )
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            _LOGGER.warning("Worker %d (pid %d) exited with status %d; restarting it", index, pid, status)
+            spawn(index)
+    sock.close()
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+from sniffnet.api import prefork
+from sniffnet.core import telemetry
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/api/live")
+def live():
+    return {"status": "ok"}
+
+
+@router.get("/api/ready")
+def ready(request: Request):
+    """200 once migrations, DB pool warmup and model preload have all finished, 503 before."""
+    startup = getattr(request.app.state, "startup", None)
+    if startup is None:
+        return JSONResponse(status_code=503, content={"ready": False, "steps": {}})
+
+    status = startup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@router.get("/api/workers")
+def workers():
+    """Per-worker memory (RSS/PSS, shared vs private) and aggregate throughput in pre-fork mode."""
+    stats = prefork.worker_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Not running in pre-fork mode")
+    return stats
+
+
+@router.get("/api/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of this process's counters, gauges and histograms."""
+    return Response(content=telemetry.render(), media_type=telemetry.CONTENT_TYPE)
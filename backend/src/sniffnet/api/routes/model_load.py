@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
 from sniffnet.api.config import MODEL_DEVICE, MODEL_WEIGHTS_PATH
+from sniffnet.api.inference_deps import get_model_load_options
 from sniffnet.core import model_loader
 
 router = APIRouter(tags=["model"])
@@ -11,9 +12,39 @@ def load_model():
     if model_loader.is_loaded():
         return {"status": "already_loaded"}
 
-    started = model_loader.start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE)
+    started = model_loader.start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE, **get_model_load_options())
 
     if started or model_loader.is_loading():
         return {"status": "loading_started"}
 
     return {"status": "already_loaded"}
+
+
+@router.post("/api/model/reload")
+def reload_model():
+    """Load the weights at MODEL_WEIGHTS_PATH again and swap them in without downtime."""
+    if not model_loader.is_loaded():
+        return load_model()
+
+    try:
+        started = model_loader.reload(str(MODEL_WEIGHTS_PATH))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+    return {"status": "reload_started" if started else "reload_in_progress"}
+
+
+@router.get("/api/model/quantization")
+def quantization_report():
+    report = model_loader.get_quantization_report()
+    if report is None:
+        raise HTTPException(status_code=404, detail="Model is not quantized")
+    return report
+
+
+@router.get("/api/model/cascade")
+def cascade_stats():
+    stats = model_loader.get_cascade_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No model cascade configured")
+    return stats
@@ -1,27 +1,99 @@
-from io import BytesIO
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Annotated, List
 
-import torch
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
-from PIL import Image
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Depends,
+    UploadFile,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from sqlalchemy.orm import Session
 
-from sniffnet.api.config import MODEL_DEVICE, MODEL_WEIGHTS_PATH
-from sniffnet.core.model_loader import start_load, get_model_blocking, get_model_health
+from sniffnet.api.config import (
+    MODEL_DEVICE,
+    MODEL_LOAD_TIMEOUT_S,
+    MODEL_WEIGHTS_PATH,
+    PREDICT_BULK_CHUNK_SIZE,
+    PREDICT_BULK_MAX_IMAGES,
+    PREDICT_JOBS_INPUT_ROOT,
+    PREDICT_STREAM_MAX_PENDING,
+    PREDICT_VIDEO_SAMPLE_FPS,
+    PREDICT_VIDEO_SEGMENT_S,
+)
+from sniffnet.api.deps import get_database
+from sniffnet.api.inference_deps import (
+    get_admission_controller,
+    get_bulk_jobs,
+    get_embedding_index,
+    get_inference_executor,
+    get_model_load_options,
+    get_perceptual_index,
+    get_prediction_cache,
+    get_predict_batcher,
+    start_stored_model_load,
+)
+from sniffnet.core.admission import AdmissionController, Overloaded
+from sniffnet.core.batching import DeadlineExceeded, MicroBatcher
+from sniffnet.core.bulk_jobs import BulkJobs
+from sniffnet.core.embedding_index import EmbeddingIndex, image_id
+from sniffnet.core.executor import InferenceExecutor
+from sniffnet.core.image_sources import is_archive, iter_archive_images
+from sniffnet.core.model_loader import (
+    DEFAULT_KEY,
+    EMBEDDING_IF_COMPUTED,
+    EMBEDDING_REQUIRED,
+    start_load,
+    get_device,
+    get_model_blocking,
+    get_model_health,
+    get_model_identity,
+    is_loaded,
+    list_models,
+    predict_batch,
+    supports_embeddings,
+)
+from sniffnet.core.perceptual_cache import PerceptualIndex, dhash
+from sniffnet.core.prediction_cache import PredictionCache, cache_key
+from sniffnet.core.preprocessing import decode_image, pixels_from_buffer
+from sniffnet.core.runners import format_prediction
+from sniffnet.core.telemetry import PREDICT_IN_FLIGHT, PREDICT_REQUESTS, PREDICT_STAGE_SECONDS
+from sniffnet.core.video import classify_video
 
 router = APIRouter(tags=["predict"])
 
 
-@router.post("/api/predict")
-async def predict(file: UploadFile = File(...)):
-    try:
-        image_bytes = await file.read()
-        image = Image.open(BytesIO(image_bytes)).convert("RGB")
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file")
+async def _resolve_model_key(model_id: int | None, db: Session) -> str:
+    """Registry key for ``model_id``, starting its load from the Model table if needed."""
+    if model_id is None:
+        return DEFAULT_KEY
+
+    key = f"model:{model_id}"
+    # Loaded models skip the thread hop; a loading one is caught by start_stored_model_load
+    if not is_loaded(key) and not await asyncio.to_thread(start_stored_model_load, db, model_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Model {model_id} has no weights")
+    return key
 
-    start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE)
+
+async def _get_model_or_raise(timeout: float = MODEL_LOAD_TIMEOUT_S, key: str = DEFAULT_KEY):
+    if key == DEFAULT_KEY:
+        start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE, **get_model_load_options())
 
     try:
-        model, transform, classes = get_model_blocking(timeout=30)
+        if is_loaded(key):
+            return get_model_blocking(key=key)
+        # Waiting for the loader thread is not CPU work: keep it off the inference pool
+        return await asyncio.to_thread(get_model_blocking, timeout, key)
     except RuntimeError as exc:
         message = str(exc)
         if "loading in progress" in message:
@@ -31,43 +103,684 @@ async def predict(file: UploadFile = File(...)):
             )
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=message)
 
-    tensor = transform(image).unsqueeze(0)
-    device = next(model.parameters()).device
-    tensor = tensor.to(device)
 
-    with torch.no_grad():
-        logits = model(tensor)
-        probs_tensor = torch.softmax(logits, dim=1)[0]
+def _decode_and_transform(image_bytes: bytes, transform, out: np.ndarray | None = None):
+    """Decode one upload and run the preprocessing pipeline; None if it is not an image."""
+    start = time.perf_counter()
+    try:
+        image = decode_image(image_bytes, transform.size)
+    except Exception:
+        return None
+    decoded = time.perf_counter()
+    pixels = transform(image, out=out)
+    PREDICT_STAGE_SECONDS.observe(decoded - start, "decode")
+    PREDICT_STAGE_SECONDS.observe(time.perf_counter() - decoded, "transform")
+    return pixels
+
+
+def _decode_transform_and_hash(image_bytes: bytes, transform, with_hash: bool):
+    """``_decode_and_transform`` plus the perceptual hash of the preprocessed image."""
+    pixels = _decode_and_transform(image_bytes, transform)
+    if pixels is None or not with_hash:
+        return pixels, None
+    return pixels, dhash(pixels)
+
+
+def _outcome_of(exc: HTTPException) -> str:
+    if exc.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+        return "rejected"
+    if exc.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+        return "unavailable"
+    return "client_error" if exc.status_code < 500 else "error"
+
+
+@contextmanager
+def _admitted(admission: AdmissionController, endpoint: str):
+    """Admit a request, yielding its deadline; shed it with 429/503 and Retry-After otherwise."""
+    try:
+        with admission.admit(endpoint) as deadline:
+            try:
+                yield deadline
+            except DeadlineExceeded:
+                admission.record_expired(endpoint)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Request expired in the inference queue, try again",
+                    headers={"Retry-After": str(admission.retry_after())},
+                )
+    except Overloaded as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many pending inference requests, try again",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+
+def _check_deadline(deadline: float | None) -> None:
+    if deadline is not None and time.monotonic() > deadline:
+        raise DeadlineExceeded("deadline exceeded before inference")
+
+
+def _predict_in_chunks(batch: np.ndarray, chunk_size: int, key: str = DEFAULT_KEY) -> list:
+    rows = []
+    for start in range(0, len(batch), chunk_size):
+        rows.extend(predict_batch(batch[start:start + chunk_size], key=key))
+    return rows
 
-    probs = probs_tensor.cpu().tolist()
-    pred_idx = int(probs_tensor.argmax().item())
 
-    probs_by_class = {classes[i]: float(probs[i]) for i in range(min(len(classes), len(probs)))}
+def _raw_transform_and_hash(pixels: np.ndarray, transform, with_hash: bool):
+    """Normalize pre-resized pixels straight from the request body, plus their perceptual hash.
 
+    Raises ValueError when ``pixels`` are not ``transform.size`` square.
+    """
+    start = time.perf_counter()
+    if pixels.shape[:2] != (transform.size, transform.size):
+        height, width = pixels.shape[:2]
+        raise ValueError(f"expected {transform.size}x{transform.size} pixels, got {height}x{width}")
+    normalized = transform.normalize(pixels)
+    PREDICT_STAGE_SECONDS.observe(time.perf_counter() - start, "transform")
+    return normalized, dhash(normalized) if with_hash else None
+
+
+async def _cache_call(cache: PredictionCache, method, *args):
+    """Call a ``cache`` method, on a worker thread when it may touch the disk tier."""
+    if cache.disk_dir is None:
+        return method(*args)
+    return await asyncio.to_thread(method, *args)
+
+
+async def _predict_one(
+    batcher, executor, cache, near_duplicates, index, db, read, model_id, deadline, preprocess
+) -> tuple:
+    """Classify one image; returns the prediction and how it was produced.
+
+    ``read()`` is awaited for the request payload and ``preprocess(payload, transform,
+    with_hash)`` turns it into model input and its perceptual hash. Images the default
+    model classifies are added to the embedding ``index`` from the same forward pass.
+    """
+    start = time.perf_counter()
+    payload = await read()
+    read_done = time.perf_counter()
+    PREDICT_STAGE_SECONDS.observe(read_done - start, "read")
+
+    key = await _resolve_model_key(model_id, db)
+    model, transform, classes = await _get_model_or_raise(key=key)
+    loaded = time.perf_counter()
+    PREDICT_STAGE_SECONDS.observe(loaded - read_done, "model")
+
+    # The model identity is part of the key, so new weights never hit old entries
+    identity = get_model_identity(key)
+    content_key = cache_key(payload, identity) if cache.enabled and identity else None
+    if content_key is not None:
+        cached = await _cache_call(cache, cache.get, content_key)
+        PREDICT_STAGE_SECONDS.observe(time.perf_counter() - loaded, "cache")
+        if cached is not None:
+            return cached, "cache_hit"
+
+    use_phash = near_duplicates.enabled and identity is not None
+    try:
+        pixels, image_hash = await executor.run(preprocess, payload, transform, use_phash)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid pixels: {exc}")
+    if pixels is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file")
+
+    outcome = "near_duplicate"
+    prediction = near_duplicates.get(image_hash, identity) if image_hash is not None else None
+    if prediction is None:
+        outcome = "ok"
+        _check_deadline(deadline)
+        # Behind a cascade, only images the full model sees come back with an embedding
+        embed = key == DEFAULT_KEY and index.configured and supports_embeddings(key)
+        submitted = time.perf_counter()
+        try:
+            item = (key, pixels, EMBEDDING_IF_COMPUTED) if embed else (key, pixels)
+            result = await asyncio.wrap_future(batcher.submit(item, deadline=deadline))
+        except RuntimeError as exc:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+        PREDICT_STAGE_SECONDS.observe(time.perf_counter() - submitted, "batch")
+
+        probs_row, embedding = result if embed else (result, None)
+        prediction = format_prediction(probs_row, classes)
+        if image_hash is not None:
+            near_duplicates.put(image_hash, identity, prediction)
+        if embedding is not None:
+            identity_of_embedding = get_model_identity(key, cascade=False)
+            await executor.run(
+                index.add, [image_id(payload)], embedding, [int(probs_row.argmax())], identity_of_embedding, classes
+            )
+
+    if content_key is not None:
+        await _cache_call(cache, cache.put, content_key, prediction)
+    return prediction, outcome
+
+
+async def _predict_single(
+    endpoint, admission, batcher, executor, cache, near_duplicates, index, db, read, model_id, preprocess
+):
+    PREDICT_IN_FLIGHT.inc(endpoint)
+    outcome = "error"
+    try:
+        with _admitted(admission, endpoint) as deadline:
+            prediction, outcome = await _predict_one(
+                batcher, executor, cache, near_duplicates, index, db, read, model_id, deadline, preprocess
+            )
+        return prediction
+    except HTTPException as exc:
+        outcome = _outcome_of(exc)
+        raise
+    finally:
+        PREDICT_IN_FLIGHT.dec(endpoint)
+        PREDICT_REQUESTS.inc(endpoint, outcome)
+
+
+@router.post("/api/predict")
+async def predict(
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    batcher: Annotated[MicroBatcher, Depends(get_predict_batcher)],
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+    cache: Annotated[PredictionCache, Depends(get_prediction_cache)],
+    near_duplicates: Annotated[PerceptualIndex, Depends(get_perceptual_index)],
+    index: Annotated[EmbeddingIndex, Depends(get_embedding_index)],
+    db: Annotated[Session, Depends(get_database)],
+    file: UploadFile = File(...),
+    model_id: int | None = None,
+):
+    return await _predict_single(
+        "predict", admission, batcher, executor, cache, near_duplicates, index, db,
+        file.read, model_id, _decode_transform_and_hash,
+    )
+
+
+@router.post("/api/predict/raw")
+async def predict_raw(
+    request: Request,
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    batcher: Annotated[MicroBatcher, Depends(get_predict_batcher)],
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+    cache: Annotated[PredictionCache, Depends(get_prediction_cache)],
+    near_duplicates: Annotated[PerceptualIndex, Depends(get_perceptual_index)],
+    index: Annotated[EmbeddingIndex, Depends(get_embedding_index)],
+    db: Annotated[Session, Depends(get_database)],
+    shape: str | None = None,
+    model_id: int | None = None,
+):
+    """Classify pixels the client already resized to the model input size.
+
+    The body is either a ``.npy`` uint8 array or bare HWC RGB bytes declared with
+    ``?shape=224,224,3``. Skips image decoding and resizing: the pixels are normalized
+    in place from the request body, and cached predictions are keyed by the pixels.
+    """
+    try:
+        declared = tuple(int(dim) for dim in shape.split(",")) if shape else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid shape {shape!r}")
+
+    async def read() -> np.ndarray:
+        # Parsed once; the size is checked against the requested model's transform
+        try:
+            return pixels_from_buffer(await request.body(), declared)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid pixels: {exc}")
+
+    return await _predict_single(
+        "predict_raw", admission, batcher, executor, cache, near_duplicates, index, db,
+        read, model_id, _raw_transform_and_hash,
+    )
+
+
+async def _embed_one(batcher, executor, index, file, k, add, deadline) -> dict:
+    """The body of ``embed_image``."""
+    data = await file.read()
+    _, transform, classes = await _get_model_or_raise()
+    if not supports_embeddings():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The served model does not expose embeddings (use eager torch or a fresh ONNX export)",
+        )
+
+    pixels, _ = await executor.run(_decode_transform_and_hash, data, transform, False)
+    if pixels is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file")
+
+    _check_deadline(deadline)
+    try:
+        probs_row, embedding = await asyncio.wrap_future(
+            batcher.submit((DEFAULT_KEY, pixels, EMBEDDING_REQUIRED), deadline=deadline)
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+
+    row_id = image_id(data)
+    indexed, neighbours = await executor.run(
+        _index_and_search, index, row_id, embedding, int(probs_row.argmax()), classes, k, add
+    )
     return {
-        "class": classes[pred_idx] if pred_idx < len(classes) else str(pred_idx),
-        "confidence": float(probs[pred_idx]),
-        "probs": probs_by_class,
+        "id": row_id,
+        "prediction": format_prediction(probs_row, classes),
+        "embedding": embedding.tolist(),
+        "indexed": indexed,
+        "neighbours": neighbours,
     }
 
 
-@router.get("/api/model/health")
-async def model_health():
-    if not start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE):
-        # load already triggered or in progress; continue
-        pass
+def _index_and_search(index, row_id, embedding, label, classes, k, add) -> tuple:
+    """Optionally index an embedding, then find its neighbours; file I/O and a scan, so run on the pool."""
+    identity = get_model_identity(cascade=False)
+    if add:
+        index.add([row_id], embedding, [label], identity, classes)
+    return index.get(row_id, identity) is not None, index.search(embedding, k, identity, row_id)
+
+
+def _neighbours_of(index, row_id, k) -> list | None:
+    """Neighbours of an indexed image, or None if it is not indexed for the served model."""
+    identity = get_model_identity(cascade=False)
+    embedding = index.get(row_id, identity) if identity else None
+    return index.search(embedding, k, identity, row_id) if embedding is not None else None
 
+
+@router.post("/api/predict/embedding")
+async def embed_image(
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    batcher: Annotated[MicroBatcher, Depends(get_predict_batcher)],
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+    index: Annotated[EmbeddingIndex, Depends(get_embedding_index)],
+    file: UploadFile = File(...),
+    k: int = Form(10),
+    add: bool = Form(True),
+):
+    """Pooled features of an image with the default model, plus its prediction and nearest neighbours.
+
+    The embedding and the prediction come from one forward pass, micro-batched with
+    ordinary predictions. Neighbours are the ``k`` most similar indexed images by cosine
+    similarity; with ``add`` the image itself is indexed under its ``id``.
+    """
+    PREDICT_IN_FLIGHT.inc("embedding")
+    outcome = "error"
     try:
-        model, _, _ = get_model_blocking(timeout=30)
-        device = str(next(model.parameters()).device)
-    except RuntimeError as exc:
-        message = str(exc)
-        if "loading in progress" in message:
+        with _admitted(admission, "embedding") as deadline:
+            response = await _embed_one(batcher, executor, index, file, k, add, deadline)
+        outcome = "ok"
+        return response
+    except HTTPException as exc:
+        outcome = _outcome_of(exc)
+        raise
+    finally:
+        PREDICT_IN_FLIGHT.dec("embedding")
+        PREDICT_REQUESTS.inc("embedding", outcome)
+
+
+@router.get("/api/predict/embedding/index")
+def embedding_index_stats(index: Annotated[EmbeddingIndex, Depends(get_embedding_index)]):
+    return index.stats()
+
+
+@router.get("/api/predict/embedding/{row_id}/neighbours")
+async def embedding_neighbours(
+    row_id: str,
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+    index: Annotated[EmbeddingIndex, Depends(get_embedding_index)],
+    k: int = 10,
+):
+    """Nearest neighbours of an image already in the index, without running the model."""
+    neighbours = await executor.run(_neighbours_of, index, row_id, k)
+    if neighbours is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{row_id} is not in the embedding index")
+    return {"id": row_id, "neighbours": neighbours}
+
+
+def _archive_images(data: bytes, limit: int) -> list | None:
+    """Images in ``data`` if it is an archive (else None), extracting at most ``limit + 1``."""
+    if not is_archive(data):
+        return None
+    images = []
+    for image in iter_archive_images(data):
+        images.append(image)
+        # One past the limit is enough to reject the request; the rest is never decompressed
+        if len(images) > limit:
+            break
+    return images
+
+
+async def _predict_bulk(executor, db, files, model_id, deadline) -> dict:
+    """The body of ``predict_bulk``."""
+    uploads = []
+    for upload in files:
+        data = await upload.read()
+        try:
+            images = await executor.run(_archive_images, data, PREDICT_BULK_MAX_IMAGES - len(uploads))
+        except Exception:
             raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Model is loading, try again",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid archive: {upload.filename}",
             )
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=message)
+        if images is None:
+            uploads.append((upload.filename, data))
+        else:
+            uploads.extend(images)
+
+        if len(uploads) > PREDICT_BULK_MAX_IMAGES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {PREDICT_BULK_MAX_IMAGES} images per request",
+            )
+
+    if not uploads:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No images found")
+
+    key = await _resolve_model_key(model_id, db)
+    model, transform, classes = await _get_model_or_raise(key=key)
+
+    # Every image is preprocessed straight into its slot of one preallocated batch
+    batch = np.empty((len(uploads), 3, transform.size, transform.size), dtype=np.float32)
+    decoded = await asyncio.gather(
+        *(
+            executor.run(_decode_and_transform, data, transform, batch[i])
+            for i, (_, data) in enumerate(uploads)
+        )
+    )
+
+    valid_idx = [i for i, pixels in enumerate(decoded) if pixels is not None]
+    valid = batch if len(valid_idx) == len(uploads) else batch[valid_idx]
+    # The deadline only sheds requests still waiting to start: once the first chunk
+    # runs, a large upload is finished rather than dropped halfway
+    _check_deadline(deadline)
+    try:
+        rows = await executor.run(_predict_in_chunks, valid, PREDICT_BULK_CHUNK_SIZE, key)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+
+    rows_iter = iter(rows)
+    results = []
+    for (filename, _), pixels in zip(uploads, decoded):
+        if pixels is None:
+            results.append({"filename": filename, "error": "Invalid image file"})
+            continue
+        results.append({"filename": filename, **format_prediction(next(rows_iter), classes)})
+
+    return {"count": len(results), "results": results}
+
+
+@router.post("/api/predict/batch")
+async def predict_bulk(
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+    db: Annotated[Session, Depends(get_database)],
+    files: List[UploadFile] = File(...),
+    model_id: int | None = None,
+):
+    PREDICT_IN_FLIGHT.inc("predict_batch")
+    outcome = "error"
+    try:
+        with _admitted(admission, "predict_batch") as deadline:
+            response = await _predict_bulk(executor, db, files, model_id, deadline)
+        outcome = "ok"
+        return response
+    except HTTPException as exc:
+        outcome = _outcome_of(exc)
+        raise
+    finally:
+        PREDICT_IN_FLIGHT.dec("predict_batch")
+        PREDICT_REQUESTS.inc("predict_batch", outcome)
+
+
+async def _predict_video(executor, db, file, sample_fps, segment_s, model_id, deadline) -> dict:
+    """The body of ``predict_video``."""
+    key = await _resolve_model_key(model_id, db)
+    await _get_model_or_raise(key=key)
+    _check_deadline(deadline)
+    try:
+        # The upload is streamed to FFmpeg from its spooled file, never read into memory whole
+        return await executor.run(
+            classify_video, file.file, sample_fps, segment_s, PREDICT_BULK_CHUNK_SIZE, key
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except ModuleNotFoundError as exc:
+        if exc.name != "av":
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Video support needs PyAV: install the 'video' extra",
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+
+
+@router.post("/api/predict/video")
+async def predict_video(
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+    db: Annotated[Session, Depends(get_database)],
+    file: UploadFile = File(...),
+    sample_fps: float = PREDICT_VIDEO_SAMPLE_FPS,
+    segment_s: float = PREDICT_VIDEO_SEGMENT_S,
+    model_id: int | None = None,
+):
+    """Classify sampled frames of an uploaded video into a per-segment timeline."""
+    PREDICT_IN_FLIGHT.inc("predict_video")
+    outcome = "error"
+    try:
+        with _admitted(admission, "predict_video") as deadline:
+            response = await _predict_video(executor, db, file, sample_fps, segment_s, model_id, deadline)
+        outcome = "ok"
+        return response
+    except HTTPException as exc:
+        outcome = _outcome_of(exc)
+        raise
+    finally:
+        PREDICT_IN_FLIGHT.dec("predict_video")
+        PREDICT_REQUESTS.inc("predict_video", outcome)
+
+
+async def _predict_frame(batcher, executor, transform, classes, key, data: bytes) -> tuple:
+    """One stream frame's reply and outcome; errors are reported per frame, not raised."""
+    pixels = await executor.run(_decode_and_transform, data, transform) if data else None
+    if pixels is None:
+        return {"error": "Invalid image file"}, "client_error"
+    try:
+        probs_row = await asyncio.wrap_future(batcher.submit((key, pixels)))
+    except RuntimeError as exc:
+        return {"error": str(exc)}, "error"
+    return format_prediction(probs_row, classes), "ok"
+
+
+async def _stream_model(websocket: WebSocket, model_id: int | None, db: Session) -> tuple | None:
+    """``(key, transform, classes)`` of the stream's model, loading it again if it was evicted.
+
+    Closes ``websocket`` and returns None when the model is unavailable.
+    """
+    try:
+        key = await _resolve_model_key(model_id, db)
+        _, transform, classes = await _get_model_or_raise(key=key)
+    except HTTPException as exc:
+        # 1013: try again later
+        await websocket.close(code=1013 if exc.status_code == 503 else 1011, reason=str(exc.detail))
+        return None
+    return key, transform, classes
+
+
+@router.websocket("/api/predict/stream")
+async def predict_stream(
+    websocket: WebSocket,
+    batcher: Annotated[MicroBatcher, Depends(get_predict_batcher)],
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+    db: Annotated[Session, Depends(get_database)],
+    model_id: int | None = None,
+):
+    """Classify a stream of encoded frames sent as binary messages.
+
+    Every frame gets one JSON reply, in order, tagged with its index in the stream.
+    Frames arriving while the previous ones are being classified are buffered; past
+    PREDICT_STREAM_MAX_PENDING the oldest are dropped, and ``dropped`` in each reply
+    counts them. A buffered group of frames goes through the micro-batcher together,
+    with the model's labels and preprocessing as they are at that time, so a long-lived
+    stream follows hot swaps and reloads after eviction. Text messages close the stream.
+    """
+    await websocket.accept()
+    if await _stream_model(websocket, model_id, db) is None:
+        return
+
+    frames: deque = deque(maxlen=PREDICT_STREAM_MAX_PENDING)
+    arrived = asyncio.Event()
+
+    async def receive_frames():
+        index = 0
+        while True:
+            frames.append((index, await websocket.receive_bytes()))
+            index += 1
+            arrived.set()
+
+    PREDICT_IN_FLIGHT.inc("stream")
+    receiver = asyncio.create_task(receive_frames())
+    next_index = dropped = 0
+    try:
+        while True:
+            waiter = asyncio.create_task(arrived.wait())
+            await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                waiter.cancel()
+                # receive_bytes() raises KeyError for a text message; 1003: unsupported data
+                if isinstance(receiver.exception(), KeyError):
+                    await websocket.close(code=1003, reason="Frames must be binary messages")
+                break
+            arrived.clear()
+            model = await _stream_model(websocket, model_id, db)
+            if model is None:
+                break
+            key, transform, classes = model
+
+            group = list(frames)
+            frames.clear()
+            skipped = group[0][0] - next_index
+            if skipped:
+                dropped += skipped
+                PREDICT_REQUESTS.inc("stream", "dropped", amount=skipped)
+            next_index = group[-1][0] + 1
+
+            replies = await asyncio.gather(
+                *(_predict_frame(batcher, executor, transform, classes, key, data) for _, data in group)
+            )
+            for (index, _), (reply, outcome) in zip(group, replies):
+                PREDICT_REQUESTS.inc("stream", outcome)
+                await websocket.send_json({"frame": index, "dropped": dropped, **reply})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        PREDICT_IN_FLIGHT.dec("stream")
+        receiver.cancel()
+        try:
+            await receiver
+        except (asyncio.CancelledError, KeyError, WebSocketDisconnect):
+            pass
+
+
+def _job_source(path: str) -> Path:
+    # Reading server paths is opt-in: without a root, clients can only upload archives
+    if not PREDICT_JOBS_INPUT_ROOT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Server paths are disabled; upload an archive instead"
+        )
+    source = Path(path).expanduser().resolve()
+    if not source.is_relative_to(Path(PREDICT_JOBS_INPUT_ROOT).expanduser().resolve()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Path is outside PREDICT_JOBS_INPUT_ROOT")
+    if not source.exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{path} does not exist")
+    return source
+
+
+def _get_job_or_404(jobs: BulkJobs, job_id: str) -> dict:
+    try:
+        return jobs.get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+
+
+@router.post("/api/predict/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    jobs: Annotated[BulkJobs, Depends(get_bulk_jobs)],
+    db: Annotated[Session, Depends(get_database)],
+    path: str | None = Form(None),
+    file: UploadFile | None = File(None),
+    model_id: int | None = None,
+):
+    """Classify every image in an uploaded archive, or under a server directory/archive ``path``.
+
+    Server paths are only accepted below ``PREDICT_JOBS_INPUT_ROOT``, and not at all when it is unset.
+    """
+    if (path is None) == (file is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Send either a path or an archive file")
+
+    if file is not None:
+        archive = await file.read()
+        if not await asyncio.to_thread(is_archive, archive):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid archive: {file.filename}")
+        source = None
+    else:
+        archive = None
+        source = _job_source(path)
+
+    # The job waits for the model itself; only make sure it is being loaded
+    key = await _resolve_model_key(model_id, db)
+    if key == DEFAULT_KEY:
+        start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE, **get_model_load_options())
+    return await asyncio.to_thread(jobs.submit, source, key, archive)
+
+
+@router.get("/api/predict/jobs")
+def list_jobs(jobs: Annotated[BulkJobs, Depends(get_bulk_jobs)]):
+    return {"jobs": jobs.list()}
+
+
+@router.get("/api/predict/jobs/{job_id}")
+def job_status(job_id: str, jobs: Annotated[BulkJobs, Depends(get_bulk_jobs)]):
+    return _get_job_or_404(jobs, job_id)
+
+
+@router.get("/api/predict/jobs/{job_id}/results")
+def job_results(
+    job_id: str,
+    jobs: Annotated[BulkJobs, Depends(get_bulk_jobs)],
+    offset: int = 0,
+    limit: int = 1000,
+):
+    job = _get_job_or_404(jobs, job_id)
+    results = jobs.results(job_id, offset=max(0, offset), limit=max(0, limit))
+    return {"id": job_id, "state": job["state"], "offset": offset, "count": len(results), "results": results}
+
+
+@router.delete("/api/predict/jobs/{job_id}")
+def cancel_job(job_id: str, jobs: Annotated[BulkJobs, Depends(get_bulk_jobs)]):
+    _get_job_or_404(jobs, job_id)
+    return jobs.cancel(job_id)
+
+
+@router.get("/api/predict/batching")
+def batching_stats(
+    admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+    batcher: Annotated[MicroBatcher, Depends(get_predict_batcher)],
+    executor: Annotated[InferenceExecutor, Depends(get_inference_executor)],
+):
+    return {**batcher.stats(), "executor": executor.stats(), "admission": admission.stats()}
+
+
+@router.get("/api/predict/cache")
+def prediction_cache_stats(
+    cache: Annotated[PredictionCache, Depends(get_prediction_cache)],
+    near_duplicates: Annotated[PerceptualIndex, Depends(get_perceptual_index)],
+):
+    return {**cache.stats(), "near_duplicates": near_duplicates.stats()}
+
+
+@router.get("/api/model/registry")
+def model_registry():
+    return {"models": list_models()}
+
+
+@router.get("/api/model/health")
+async def model_health():
+    await _get_model_or_raise()
+    device = str(get_device())
 
     try:
         health = get_model_health()
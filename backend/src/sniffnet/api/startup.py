@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from sniffnet.api import prefork
+from sniffnet.api.config import (
+    DB_POOL_WARMUP_CONNECTIONS,
+    MODEL_BACKEND,
+    MODEL_DEVICE,
+    MODEL_LOAD_OPTIONS,
+    MODEL_WEIGHTS_PATH,
+    STARTUP_PRELOAD_MODEL,
+    STARTUP_RUN_MIGRATIONS,
+)
+from sniffnet.database.db import engine
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def run_migrations() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    project_root = Path(__file__).resolve().parents[3]
+    alembic_cfg = Config(str(project_root / "alembic.ini"))
+    alembic_cfg.attributes["configure_logger"] = False
+    command.upgrade(alembic_cfg, "head")
+
+
+def warm_db_pool(connections: int = DB_POOL_WARMUP_CONNECTIONS) -> None:
+    """Open ``connections`` pooled connections up front so the first requests don't pay for them."""
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in opened:
+            connection.close()
+
+
+def preload_model() -> None:
+    # Imported here so that CRUD-only startup never pays for the ML stack
+    from sniffnet.api.inference_deps import get_model_load_options
+    from sniffnet.core import model_loader
+
+    options = get_model_load_options()
+    started = model_loader.start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE, **options)
+    model_loader.get_model_blocking()
+    if not started and prefork.in_worker():
+        # Loaded by the single-threaded parent, which skipped the benchmark: run it with this worker's threads
+        model_loader.refresh_health(**options)
+
+
+def preload_before_fork(serve_inference: bool = True) -> None:
+    """Parent-process part of pre-fork startup: migrate once and load the model to share.
+
+    torch runs single-threaded here (see ``sniffnet.api.prefork``). onnxruntime sessions
+    own thread pools that do not survive a fork, so those workers load their own model.
+    """
+    if STARTUP_RUN_MIGRATIONS:
+        run_migrations()
+    if not (serve_inference and STARTUP_PRELOAD_MODEL and MODEL_BACKEND == "torch"):
+        return
+
+    import torch
+    from sniffnet.core import model_loader
+
+    torch.set_num_threads(1)
+    # Each worker benchmarks the model for the health payload with its own thread count
+    options = {**MODEL_LOAD_OPTIONS, "num_threads": None, "health_batch_sizes": ()}
+    model_loader.start_load(str(MODEL_WEIGHTS_PATH), MODEL_DEVICE, **options)
+    model_loader.get_model_blocking()
+
+
+class StartupChecks:
+    """Run the startup steps concurrently and track them for the readiness endpoint."""
+
+    def __init__(self, steps: dict[str, Callable[[], None]]) -> None:
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._state = {name: {"status": "pending", "seconds": None, "error": None} for name in steps}
+
+    async def _run_step(self, name: str) -> None:
+        with self._lock:
+            self._state[name]["status"] = "running"
+        start = time.perf_counter()
+        try:
+            # Every step is blocking I/O or native code: run them side by side in threads
+            await asyncio.to_thread(self.steps[name])
+        except Exception as exc:
+            _LOGGER.exception("Startup step %s failed", name)
+            status, error = "failed", str(exc) or type(exc).__name__
+        else:
+            status, error = "ready", None
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._state[name].update(status=status, seconds=seconds, error=error)
+        _LOGGER.info("Startup step %s: %s in %.2fs", name, status, seconds)
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._run_step(name) for name in self.steps))
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "ready": all(step["status"] == "ready" for step in self._state.values()),
+                "steps": {name: dict(step) for name, step in self._state.items()},
+            }
+
+
+def default_startup_checks(serve_inference: bool = True, migrations: bool = True) -> StartupChecks:
+    steps = {"database": warm_db_pool}
+    if STARTUP_RUN_MIGRATIONS and migrations:
+        steps["migrations"] = run_migrations
+    if STARTUP_PRELOAD_MODEL and serve_inference:
+        steps["model"] = preload_model
+    return StartupChecks(steps)
@@ -0,0 +1,90 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sniffnet.core.telemetry import ADMISSION_PENDING, ADMISSION_REJECTED
+
+
+class Overloaded(RuntimeError):
+    """Raised when a request arrives while the admission queue is full."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("too many pending inference requests")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded admission in front of inference.
+
+    At most ``max_pending`` requests may be between admission and their response;
+    the next one is rejected at once with ``Overloaded`` instead of waiting in line.
+    Each admitted request gets a ``time.monotonic()`` deadline ``deadline_s`` ahead,
+    which the caller hands to the batcher so stale requests never reach the model.
+    0 disables either limit.
+    """
+
+    def __init__(self, max_pending: int = 0, deadline_s: float = 0.0, name: str = "predict") -> None:
+        self.max_pending = max_pending
+        self.deadline_s = deadline_s
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._expired = 0
+        # Smoothed duration of admitted requests, the basis of the Retry-After hint
+        self._avg_seconds = 0.0
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait: about one request's service time."""
+        with self._lock:
+            return max(1, math.ceil(self._avg_seconds))
+
+    @contextmanager
+    def admit(self, endpoint: str) -> Iterator[float | None]:
+        """Hold a pending slot for the duration of a request and yield its deadline."""
+        with self._lock:
+            if self.max_pending and self._pending >= self.max_pending:
+                self._rejected += 1
+                full = True
+            else:
+                self._pending += 1
+                self._admitted += 1
+                full = False
+            pending = self._pending
+        if full:
+            ADMISSION_REJECTED.inc(endpoint, "queue_full")
+            raise Overloaded(self.retry_after())
+        ADMISSION_PENDING.set(pending, self.name)
+
+        start = time.monotonic()
+        try:
+            yield start + self.deadline_s if self.deadline_s else None
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._pending -= 1
+                self._avg_seconds = elapsed if self._admitted == 1 else 0.9 * self._avg_seconds + 0.1 * elapsed
+                pending = self._pending
+            ADMISSION_PENDING.set(pending, self.name)
+
+    def record_expired(self, endpoint: str) -> None:
+        """Count a request dropped because its deadline passed before it reached the model."""
+        with self._lock:
+            self._expired += 1
+        ADMISSION_REJECTED.inc(endpoint, "deadline")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "deadline_s": self.deadline_s,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "expired": self._expired,
+                "avg_seconds": self._avg_seconds,
+            }
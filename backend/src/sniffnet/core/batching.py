@@ -0,0 +1,133 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A queued item's deadline passed before it reached ``run_batch``."""
+
+
+class MicroBatcher:
+    """Collect concurrent requests and run them through ``run_batch`` together.
+
+    A single background thread takes the first queued item, then keeps collecting
+    until ``max_batch_size`` items are gathered or ``max_wait_ms`` has passed.
+    ``run_batch`` receives the list of payloads and must return one result per
+    payload, in order; each caller gets its own result through a ``Future``.
+    Items whose ``deadline`` has passed by the time they are collected fail with
+    ``DeadlineExceeded`` instead of being run.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "micro-batcher",
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._last_batch_size = 0
+        self._largest_batch_size = 0
+        self._expired = 0
+
+    def submit(self, payload: Any, deadline: float | None = None) -> Future:
+        """Queue a payload and return a future resolved with its result.
+
+        ``deadline`` is a ``time.monotonic()`` timestamp after which the item is dropped.
+        """
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((payload, future, deadline))
+        return future
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches = self._batches
+            requests = self._requests
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": batches,
+                "requests": requests,
+                "avg_batch_size": (requests / batches) if batches else 0.0,
+                "last_batch_size": self._last_batch_size,
+                "largest_batch_size": self._largest_batch_size,
+                "expired": self._expired,
+            }
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            items = self._collect()
+            # After _collect, which blocks until work arrives: an earlier clock reads too early
+            now = time.monotonic()
+            batch = []
+            for payload, future, deadline in items:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if deadline is not None and now > deadline:
+                    with self._lock:
+                        self._expired += 1
+                    future.set_exception(DeadlineExceeded("deadline exceeded while queued"))
+                    continue
+                batch.append((payload, future))
+            if not batch:
+                continue
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._last_batch_size = len(batch)
+                self._largest_batch_size = max(self._largest_batch_size, len(batch))
+
+            try:
+                results = self.run_batch([payload for payload, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"run_batch returned {len(results)} results for {len(batch)} inputs"
+                    )
+            except BaseException as exc:
+                _LOGGER.exception("Batch of %d failed in %s", len(batch), self.name)
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
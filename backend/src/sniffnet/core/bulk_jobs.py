@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import numpy as np
+
+from sniffnet.core.image_sources import count_path_images, iter_path_images
+from sniffnet.core.model_loader import DEFAULT_KEY, get_model_blocking, predict_batch
+from sniffnet.core.preprocessing import decode_image
+from sniffnet.core.runners import format_prediction
+
+_LOGGER = logging.getLogger(__name__)
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _chunks(items: Iterator, size: int) -> Iterator[list]:
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+class BulkJobs:
+    """Offline classification of a directory or archive, with progress that can be polled.
+
+    Jobs run one at a time on a background thread, streaming images through the model
+    held by ``model_loader`` in batches of ``batch_size``. Each job keeps two files in
+    ``jobs_dir``: ``<id>.json`` with its state and progress, rewritten after every batch,
+    and ``<id>.jsonl`` with one result line per image, appended as the job goes. Any
+    process sharing ``jobs_dir`` can therefore report on a job; it runs in the process
+    that accepted it.
+
+    ``load_model(key)``, if given, is called before a job waits for its model, so a model
+    evicted from the registry while the job was queued is loaded again.
+    """
+
+    def __init__(
+        self, jobs_dir: Path, batch_size: int = 64, load_model: Callable[[str], None] | None = None
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.jobs_dir = Path(jobs_dir).expanduser()
+        self.batch_size = batch_size
+        self._load_model = load_model
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: str, suffix: str) -> Path:
+        if not _JOB_ID.fullmatch(job_id):
+            raise KeyError(job_id)
+        return self.jobs_dir / f"{job_id}{suffix}"
+
+    def _write_status(self, status: dict) -> None:
+        status_file = self._path(status["id"], ".json")
+        tmp_file = status_file.with_suffix(".json.tmp")
+        tmp_file.write_text(json.dumps(status), encoding="utf-8")
+        os.replace(tmp_file, status_file)
+
+    def submit(self, source: Path, key: str = DEFAULT_KEY, archive: bytes | None = None) -> dict:
+        """Queue a job over the images at ``source``, or over an uploaded ``archive``."""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        if archive is not None:
+            source = self._path(job_id, ".upload")
+            source.write_bytes(archive)
+        elif not Path(source).exists():
+            raise FileNotFoundError(f"{source} does not exist")
+
+        status = {
+            "id": job_id,
+            "source": str(source),
+            "uploaded": archive is not None,
+            "model": key,
+            "state": "queued",
+            "total": None,
+            "processed": 0,
+            "failed": 0,
+            "error": None,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self._write_status(status)
+        self._ensure_worker()
+        self._queue.put(job_id)
+        return status
+
+    def get(self, job_id: str) -> dict:
+        """Current status of a job; raises KeyError for unknown ids."""
+        try:
+            return json.loads(self._path(job_id, ".json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise KeyError(job_id) from None
+
+    def list(self) -> List[dict]:
+        statuses = [json.loads(path.read_text(encoding="utf-8")) for path in self.jobs_dir.glob("*.json")]
+        return sorted(statuses, key=lambda status: status["created_at"])
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 1000) -> List[dict]:
+        """Result lines ``offset`` to ``offset + limit`` written so far."""
+        self.get(job_id)
+        results_file = self._path(job_id, ".jsonl")
+        if not results_file.exists():
+            return []
+        with open(results_file, "r", encoding="utf-8") as fh:
+            return [json.loads(line) for line in islice(fh, offset, offset + limit)]
+
+    def cancel(self, job_id: str) -> dict:
+        """Ask the job to stop after its current batch; results so far are kept."""
+        status = self.get(job_id)
+        if status["state"] in ("queued", "running"):
+            # A marker file, so the request reaches the job from any process
+            self._path(job_id, ".cancel").touch()
+        return status
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._worker, name="bulk-jobs", daemon=True)
+            self._thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            try:
+                status = self.get(job_id)
+            except Exception:
+                # Nothing to record the failure in; keep the worker alive for the other jobs
+                _LOGGER.exception("Skipping bulk job %s: unreadable status", job_id)
+                continue
+
+            try:
+                self._run(status)
+            except Exception as exc:
+                _LOGGER.exception("Bulk job %s failed", job_id)
+                status.update(state="failed", error=str(exc) or type(exc).__name__)
+            finally:
+                status["finished_at"] = _now()
+                self._write_status(status)
+                self._path(job_id, ".cancel").unlink(missing_ok=True)
+                if status["uploaded"]:
+                    Path(status["source"]).unlink(missing_ok=True)
+
+    def _run(self, status: dict) -> None:
+        job_id, key = status["id"], status["model"]
+        cancel_file = self._path(job_id, ".cancel")
+        if cancel_file.exists():
+            status["state"] = "cancelled"
+            return
+
+        source = Path(status["source"])
+        status.update(state="running", started_at=_now(), total=count_path_images(source))
+        self._write_status(status)
+
+        if self._load_model is not None:
+            self._load_model(key)
+        _, transform, classes = get_model_blocking(key=key)
+        # One buffer for the whole job: every batch is preprocessed into it in place
+        batch = np.empty((self.batch_size, 3, transform.size, transform.size), dtype=np.float32)
+
+        with open(self._path(job_id, ".jsonl"), "a", encoding="utf-8") as out:
+            for chunk in _chunks(iter_path_images(source), self.batch_size):
+                if cancel_file.exists():
+                    status["state"] = "cancelled"
+                    return
+
+                names, valid = [], []
+                for name, data in chunk:
+                    try:
+                        transform(decode_image(data, transform.size), out=batch[len(valid)])
+                    except Exception:
+                        names.append((name, False))
+                        continue
+                    names.append((name, True))
+                    valid.append(name)
+
+                rows = iter(predict_batch(batch[:len(valid)], key=key) if valid else [])
+                lines = [
+                    {"filename": name, **format_prediction(next(rows), classes)}
+                    if ok
+                    else {"filename": name, "error": "Invalid image file"}
+                    for name, ok in names
+                ]
+                out.writelines(json.dumps(line) + "\n" for line in lines)
+                out.flush()
+                status["processed"] += len(chunk)
+                status["failed"] += len(chunk) - len(valid)
+                self._write_status(status)
+
+        status["state"] = "done"
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+DEFAULT_CLASSES = ["Fresh", "Bad"]
+DEFAULT_CLASS_TO_IDX = {"Fresh": 0, "Bad": 1}
+SAFETENSORS_SUFFIX = ".safetensors"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def load_checkpoint(weights_file: Path, map_location="cpu", mmap: bool = False) -> dict:
+    """Load a checkpoint, memory-mapping its weights instead of copying them onto the heap.
+
+    ``.safetensors`` files (see ``convert_to_safetensors``) are always mapped; they keep
+    ``classes`` and ``class_to_idx`` as JSON metadata and come back in the ``model_state``
+    dict layout. ``.pth`` files are mapped with ``mmap`` (legacy non-zip files cannot be).
+    Mapped pages are shared through the page cache by every process that loads the file,
+    but a mapped file must be replaced by renaming a new file over it, never rewritten
+    in place, or the served weights change (or the process crashes) under it.
+    """
+    import torch
+
+    weights_file = Path(weights_file)
+    if weights_file.suffix == SAFETENSORS_SUFFIX:
+        from safetensors import safe_open
+
+        with safe_open(str(weights_file), framework="pt", device=str(map_location)) as fh:
+            metadata = fh.metadata() or {}
+            checkpoint = {"model_state": {name: fh.get_tensor(name) for name in fh.keys()}}
+        for field in ("classes", "class_to_idx"):
+            if field in metadata:
+                checkpoint[field] = json.loads(metadata[field])
+        return checkpoint
+
+    if not mmap:
+        return torch.load(weights_file, map_location=map_location)
+    try:
+        return torch.load(weights_file, map_location=map_location, mmap=True)
+    except RuntimeError as exc:
+        if "mmap" not in str(exc):
+            raise
+        _LOGGER.warning("%s uses the legacy torch.save format and cannot be memory-mapped", weights_file)
+        return torch.load(weights_file, map_location=map_location)
+
+
+def convert_to_safetensors(weights_file: Path, output_file: Path | None = None) -> Path:
+    """Write a ``.pth`` checkpoint as ``.safetensors``, keeping its class metadata."""
+    from safetensors.torch import save_file
+
+    weights_file = Path(weights_file)
+    output_file = Path(output_file) if output_file else weights_file.with_suffix(SAFETENSORS_SUFFIX)
+
+    checkpoint = load_checkpoint(weights_file)
+    state_dict, _ = extract_state_dict(checkpoint)
+    classes, class_to_idx = extract_class_metadata(checkpoint)
+    metadata = {"classes": json.dumps(classes), "class_to_idx": json.dumps(class_to_idx)}
+
+    tmp_file = output_file.with_suffix(f".{os.getpid()}.tmp")
+    save_file({name: tensor.contiguous() for name, tensor in state_dict.items()}, str(tmp_file), metadata)
+    os.replace(tmp_file, output_file)
+    return output_file
+
+
+def extract_state_dict(checkpoint) -> tuple[dict, str]:
+    """Normalize checkpoint formats to a state_dict and return its source tag."""
+    if isinstance(checkpoint, dict):
+        if "model_state" in checkpoint:
+            return checkpoint["model_state"], "model_state"
+        if "state_dict" in checkpoint:
+            return checkpoint["state_dict"], "state_dict"
+        return checkpoint, "state_dict_direct"
+    raise RuntimeError("Unsupported checkpoint format: expected dict or state_dict")
+
+
+def extract_class_metadata(checkpoint) -> tuple[list, dict]:
+    """Return ``(classes, class_to_idx)`` stored in a checkpoint, falling back to the defaults."""
+    classes = None
+    class_to_idx = None
+    if isinstance(checkpoint, dict):
+        classes = checkpoint.get("classes")
+        class_to_idx = checkpoint.get("class_to_idx")
+        if classes is not None and not isinstance(classes, list):
+            _LOGGER.warning("Invalid classes type in checkpoint (%s); ignoring", type(classes))
+            classes = None
+        if class_to_idx is not None and not isinstance(class_to_idx, dict):
+            _LOGGER.warning("Invalid class_to_idx type in checkpoint (%s); ignoring", type(class_to_idx))
+            class_to_idx = None
+
+    loaded_classes = classes if classes else list(DEFAULT_CLASSES)
+    loaded_class_to_idx = class_to_idx if class_to_idx else dict(DEFAULT_CLASS_TO_IDX)
+    if classes is None:
+        _LOGGER.warning("classes not found in checkpoint; using fallback order %s", loaded_classes)
+    if class_to_idx is None:
+        _LOGGER.warning("class_to_idx not found in checkpoint; using fallback mapping %s", loaded_class_to_idx)
+    return loaded_classes, loaded_class_to_idx
+
+
+def materialize_checkpoint(data: bytes, cache_dir: Path, name: str) -> Path:
+    """Write checkpoint bytes (e.g. a ``Model.weights`` blob) to ``cache_dir`` and return the path.
+
+    The file name carries a content hash, so unchanged weights are written only once and
+    updated weights never reuse a stale file.
+    """
+    cache_dir = Path(cache_dir).expanduser()
+    path = cache_dir / f"{name}-{hashlib.sha256(data).hexdigest()[:12]}.pth"
+    if path.exists():
+        return path
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,332 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+from sniffnet.core.telemetry import EMBEDDING_INDEX_ENTRIES, EMBEDDING_SEARCH_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+DTYPES = ("float32", "float16")
+# Longest id the index stores; image ids are 64-character SHA-256 hex digests
+ID_BYTES = 64
+# Rows scored per matrix-vector product, so a search never materializes the whole index
+_SEARCH_CHUNK = 8192
+
+
+def image_id(data: bytes) -> str:
+    """Index id of an uploaded image: the SHA-256 of its bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingIndex:
+    """Cosine-similarity nearest-neighbour index over image embeddings.
+
+    Vectors are L2-normalized and kept in ``index_dir`` as raw memory-mapped arrays:
+    ``vectors.bin`` (``float16`` halves its size at a small loss of precision),
+    ``ids.bin`` and ``labels.bin``. The files grow in place, doubling their capacity
+    when full, so existing rows are never copied. ``index.json`` records how many rows
+    are valid; it is rewritten at most every ``flush_interval_s`` seconds by inserts
+    and on ``flush``/``close``, so a crash loses at most that window of inserts.
+    Searches are an exact, vectorized scan in chunks of ``_SEARCH_CHUNK`` rows that
+    runs outside the lock, so inserts never wait for a scan.
+
+    All methods do file I/O or CPU work: call them off the event loop.
+
+    Embeddings from different weights are not comparable: the index belongs to the model
+    identity of its entries, is cleared when an insert comes from another one, and returns
+    no neighbours for queries from another one. Only one process may open a directory;
+    others (pre-forked workers) keep the index disabled. ``index_dir=None`` disables it.
+    """
+
+    def __init__(
+        self,
+        index_dir: Path | None,
+        dim: int = 512,
+        dtype: str = "float32",
+        initial_capacity: int = 1024,
+        flush_interval_s: float = 5.0,
+    ) -> None:
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown embedding dtype {dtype!r}; expected one of {DTYPES}")
+        self.index_dir = Path(index_dir).expanduser() if index_dir else None
+        self.dim = dim
+        self.dtype = dtype
+        self.initial_capacity = max(1, initial_capacity)
+        self.flush_interval_s = flush_interval_s
+
+        self._lock = threading.Lock()
+        self._opened = False
+        self._lock_file = None
+        self._vectors = None
+        self._ids = None
+        self._labels = None
+        self._capacity = 0
+        self._rows: dict = {}
+        self._count = 0
+        # Bumped on every reset, so a scan that raced one discards its results
+        self._generation = 0
+        self._identity = None
+        self._classes: List[str] = []
+        self._meta_written_at = 0.0
+        self._meta_dirty = False
+        self._searches = 0
+        self._resets = 0
+
+    @property
+    def configured(self) -> bool:
+        return self.index_dir is not None
+
+    @property
+    def enabled(self) -> bool:
+        if self.index_dir is None:
+            return False
+        if self._opened:
+            return self._lock_file is not None
+        return self._open()
+
+    def _open(self) -> bool:
+        """Map the files on first use; False when another process owns the directory."""
+        with self._lock:
+            if self._opened:
+                return self._lock_file is not None
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+
+            import fcntl
+
+            lock_file = open(self.index_dir / "index.lock", "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                _LOGGER.warning("Embedding index %s is open in another process; disabled here", self.index_dir)
+                self._opened = True
+                return False
+            self._lock_file = lock_file
+
+            meta = self._read_meta()
+            if meta is not None and (meta.get("dim"), meta.get("dtype")) == (self.dim, self.dtype):
+                self._count = meta["count"]
+                self._identity = meta["identity"]
+                self._classes = meta["classes"]
+                self._map_locked(max(self._file_capacity(), self.initial_capacity, self._count))
+                ids = self._ids[:self._count].tolist()
+                self._rows = {row_id.decode("ascii"): row for row, row_id in enumerate(ids)}
+                _LOGGER.info("Opened embedding index %s with %d entries", self.index_dir, self._count)
+            else:
+                if meta is not None:
+                    _LOGGER.warning("Embedding index %s has another dim/dtype; starting over", self.index_dir)
+                for name, _, _ in self._layout():
+                    (self.index_dir / f"{name}.bin").unlink(missing_ok=True)
+                self._map_locked(self.initial_capacity)
+                self._write_meta_locked()
+            EMBEDDING_INDEX_ENTRIES.set(self._count)
+            # Set last: ``enabled`` reads it without the lock
+            self._opened = True
+            return True
+
+    def _layout(self) -> tuple:
+        """``(name, dtype, row shape)`` of each file."""
+        return (("vectors", self.dtype, (self.dim,)), ("ids", f"S{ID_BYTES}", ()), ("labels", np.int16, ()))
+
+    def _file_capacity(self) -> int:
+        capacities = []
+        for name, dtype, row_shape in self._layout():
+            path = self.index_dir / f"{name}.bin"
+            row_bytes = np.dtype(dtype).itemsize * int(np.prod(row_shape, dtype=np.int64))
+            capacities.append(path.stat().st_size // row_bytes if path.exists() else 0)
+        return min(capacities)
+
+    def _map_locked(self, capacity: int) -> None:
+        """Extend the files to ``capacity`` rows if needed and map them again."""
+        arrays = []
+        for name, dtype, row_shape in self._layout():
+            path = self.index_dir / f"{name}.bin"
+            size = capacity * np.dtype(dtype).itemsize * int(np.prod(row_shape, dtype=np.int64))
+            with open(path, "ab") as fh:
+                if fh.tell() < size:
+                    # Extending is sparse: no existing row moves, no new page is written
+                    fh.truncate(size)
+            arrays.append(np.memmap(path, dtype=dtype, mode="r+", shape=(capacity, *row_shape)))
+        # Scans still holding the old mappings keep reading valid rows
+        self._vectors, self._ids, self._labels = arrays
+        self._capacity = capacity
+
+    def _read_meta(self) -> dict | None:
+        try:
+            return json.loads((self.index_dir / "index.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta_locked(self) -> None:
+        meta = {
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "count": self._count,
+            "identity": self._identity,
+            "classes": self._classes,
+        }
+        meta_file = self.index_dir / "index.json"
+        tmp_file = meta_file.with_suffix(".json.tmp")
+        tmp_file.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_file, meta_file)
+        self._meta_written_at = time.monotonic()
+        self._meta_dirty = False
+
+    def _reset_locked(self, identity: str, classes: Sequence[str]) -> None:
+        if self._count:
+            _LOGGER.warning("Model changed; clearing %d entries of embedding index %s", self._count, self.index_dir)
+            self._resets += 1
+        self._count = 0
+        self._rows = {}
+        self._generation += 1
+        self._identity = identity
+        self._classes = list(classes)
+        # Written now: old rows are about to be overwritten under a new identity
+        self._write_meta_locked()
+
+    def add(
+        self, ids: Sequence[str], vectors: np.ndarray, labels: Sequence[int], identity: str, classes: Sequence[str]
+    ) -> int:
+        """Insert embeddings under ``ids`` (already indexed ids are skipped); returns how many were new."""
+        if not self.enabled:
+            return 0
+        vectors = _normalize(np.atleast_2d(vectors))
+        if vectors.shape[1] != self.dim:
+            _LOGGER.warning("Not adding %d-d embeddings to the %d-d index", vectors.shape[1], self.dim)
+            return 0
+        with self._lock:
+            if identity != self._identity:
+                self._reset_locked(identity, classes)
+
+            new = {
+                row_id: (vector, label)
+                for row_id, vector, label in zip(ids, vectors, labels)
+                if row_id not in self._rows
+            }
+            if not new:
+                return 0
+            if self._count + len(new) > self._capacity:
+                capacity = self._capacity
+                while capacity < self._count + len(new):
+                    capacity *= 2
+                self._map_locked(capacity)
+
+            start = self._count
+            for offset, (row_id, (vector, label)) in enumerate(new.items()):
+                self._vectors[start + offset] = vector
+                self._ids[start + offset] = row_id.encode("ascii")
+                self._labels[start + offset] = label
+                self._rows[row_id] = start + offset
+            self._count += len(new)
+            self._meta_dirty = True
+            if time.monotonic() - self._meta_written_at >= self.flush_interval_s:
+                self._write_meta_locked()
+            EMBEDDING_INDEX_ENTRIES.set(self._count)
+            return len(new)
+
+    def get(self, row_id: str, identity: str) -> np.ndarray | None:
+        """Stored (normalized) embedding of ``row_id``, if it is indexed for ``identity``."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._rows.get(row_id)
+            if row is None or identity != self._identity:
+                return None
+            return np.array(self._vectors[row], dtype=np.float32)
+
+    def search(self, query: np.ndarray, k: int, identity: str, exclude: str | None = None) -> List[dict]:
+        """The ``k`` entries most similar to ``query``, best first, as ``{"id", "class", "score"}``."""
+        if not self.enabled or k < 1:
+            return []
+        query = _normalize(query)
+        start = time.perf_counter()
+        with self._lock:
+            if identity != self._identity or not self._count:
+                return []
+            self._searches += 1
+            # Rows below count are never rewritten without a reset, which bumps the generation
+            vectors, count, generation = self._vectors, self._count, self._generation
+
+        # One extra candidate per chunk covers the excluded id
+        wanted = k + (exclude is not None)
+        best_rows, best_scores = [], []
+        for chunk_start in range(0, count, _SEARCH_CHUNK):
+            chunk = vectors[chunk_start:min(count, chunk_start + _SEARCH_CHUNK)]
+            # float16 rows are widened a chunk at a time: BLAS has no half-precision kernels
+            scores = np.asarray(chunk, dtype=np.float32) @ query
+            if len(scores) > wanted:
+                top = np.argpartition(-scores, wanted - 1)[:wanted]
+            else:
+                top = np.arange(len(scores))
+            best_rows.append(top + chunk_start)
+            best_scores.append(scores[top])
+        rows, scores = np.concatenate(best_rows), np.concatenate(best_scores)
+        order = np.argsort(-scores, kind="stable")
+
+        neighbours = []
+        with self._lock:
+            if generation != self._generation:
+                return []
+            for row, score in zip(rows[order].tolist(), scores[order].tolist()):
+                row_id = self._ids[row].decode("ascii")
+                if row_id == exclude:
+                    continue
+                label = int(self._labels[row])
+                neighbours.append({
+                    "id": row_id,
+                    "class": self._classes[label] if 0 <= label < len(self._classes) else None,
+                    "score": score,
+                })
+                if len(neighbours) == k:
+                    break
+        EMBEDDING_SEARCH_SECONDS.observe(time.perf_counter() - start)
+        return neighbours
+
+    def flush(self) -> None:
+        """Record the current count and write mapped pages back to disk now."""
+        with self._lock:
+            if self._vectors is None:
+                return
+            for array in (self._vectors, self._ids, self._labels):
+                array.flush()
+            if self._meta_dirty:
+                self._write_meta_locked()
+
+    def close(self) -> None:
+        """Flush and unmap the files and give up the directory; the next use opens it again."""
+        self.flush()
+        with self._lock:
+            self._vectors = self._ids = self._labels = None
+            self._capacity = 0
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+            self._opened = False
+
+    def stats(self) -> dict:
+        enabled = self.enabled
+        with self._lock:
+            return {
+                "enabled": enabled,
+                "index_dir": str(self.index_dir) if self.index_dir else None,
+                "entries": self._count,
+                "capacity": self._capacity,
+                "dim": self.dim,
+                "dtype": self.dtype,
+                "identity": self._identity,
+                "searches": self._searches,
+                "resets": self._resets,
+            }
@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class InferenceExecutor:
+    """Bounded thread pool for CPU-bound inference work (decode, transform, forward).
+
+    Async handlers ``await executor.run(fn, ...)`` instead of calling blocking code on
+    the event loop; at most ``max_workers`` calls run at once and the rest wait in order.
+    Forward passes are capped separately by ``model_loader.configure_forwards``, since
+    each one already uses the backend's intra-op threads (``num_threads``).
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        self.max_workers = max_workers
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="inference"
+                )
+            return self._pool
+
+    def _tracked(self, fn: Callable[..., Any]) -> Any:
+        with self._lock:
+            self._active += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result."""
+        pool = self._get_pool()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return await loop.run_in_executor(pool, self._tracked, call)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "pending": max(0, self._in_flight - self._active),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
@@ -0,0 +1,56 @@
+import copy
+
+import torch
+from torch import nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from sniffnet.core.resnet_model import Block, ResNet
+
+
+def fuse_resnet(model: ResNet) -> ResNet:
+    """Return an inference-only copy of ``model`` with every BatchNorm folded into its conv.
+
+    The BN modules are replaced by ``nn.Identity`` so ``Block``/``ResNet.forward`` run
+    unchanged, and ReLUs become in-place so they reuse the conv output buffer instead of
+    allocating a new activation. The original model is left untouched.
+    """
+    fused = copy.deepcopy(model).eval()
+
+    fused.conv1 = fuse_conv_bn_eval(fused.conv1, fused.batch_norm)
+    fused.batch_norm = nn.Identity()
+    fused.relu = nn.ReLU(inplace=True)
+
+    for module in list(fused.modules()):
+        if not isinstance(module, Block):
+            continue
+        module.conv1 = fuse_conv_bn_eval(module.conv1, module.bn1)
+        module.bn1 = nn.Identity()
+        module.conv2 = fuse_conv_bn_eval(module.conv2, module.bn2)
+        module.bn2 = nn.Identity()
+        module.relu = nn.ReLU(inplace=True)
+        if module.downsampling is not None:
+            conv, bn = module.downsampling
+            module.downsampling = fuse_conv_bn_eval(conv, bn)
+
+    return fused
+
+
+@torch.no_grad()
+def max_output_difference(
+    reference: nn.Module,
+    candidate: nn.Module,
+    batch_size: int = 2,
+    image_size: int = 224,
+) -> float:
+    """Largest absolute logit difference between two models on a random batch."""
+    device = next(reference.parameters()).device
+    inputs = torch.randn(batch_size, 3, image_size, image_size, device=device)
+    return (reference(inputs) - candidate(inputs)).abs().max().item()
+
+
+def check_equivalence(reference: nn.Module, candidate: nn.Module, atol: float = 1e-3) -> float:
+    """Raise RuntimeError if ``candidate`` does not reproduce ``reference`` within ``atol``."""
+    diff = max_output_difference(reference, candidate)
+    if diff > atol:
+        raise RuntimeError(f"fused model diverges from reference: max abs diff {diff:.2e} > {atol:.0e}")
+    return diff
@@ -0,0 +1,90 @@
+import tarfile
+import zipfile
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, Tuple
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+
+def _is_image_name(name: str) -> bool:
+    path = PurePosixPath(name)
+    if any(part.startswith(".") or part == "__MACOSX" for part in path.parts):
+        return False
+    return path.suffix.lower() in IMAGE_EXTENSIONS
+
+
+def is_archive(data: bytes) -> bool:
+    """Return True if ``data`` looks like a zip or tar archive."""
+    buffer = BytesIO(data)
+    if zipfile.is_zipfile(buffer):
+        return True
+    buffer.seek(0)
+    try:
+        with tarfile.open(fileobj=buffer, mode="r:*"):
+            return True
+    except tarfile.TarError:
+        return False
+
+
+def _iter_archive_file(fileobj: BinaryIO) -> Iterator[Tuple[str, bytes]]:
+    if zipfile.is_zipfile(fileobj):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_image_name(info.filename):
+                    continue
+                yield info.filename, archive.read(info)
+        return
+
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode="r:*")
+    except tarfile.TarError as exc:
+        raise ValueError("Unsupported archive format: expected zip or tar") from exc
+
+    with archive:
+        for member in archive:
+            if not member.isfile() or not _is_image_name(member.name):
+                continue
+            extracted = archive.extractfile(member)
+            if extracted is not None:
+                yield member.name, extracted.read()
+
+
+def iter_archive_images(data: bytes) -> Iterator[Tuple[str, bytes]]:
+    """Yield ``(member_name, raw_bytes)`` for every image file in a zip/tar archive."""
+    yield from _iter_archive_file(BytesIO(data))
+
+
+def iter_path_images(path: Path) -> Iterator[Tuple[str, bytes]]:
+    """Yield ``(relative_name, raw_bytes)`` for every image under a directory or in an archive file.
+
+    Files are read one at a time, so arbitrarily large sources stream in constant memory.
+    """
+    path = Path(path)
+    if path.is_dir():
+        for file in sorted(path.rglob("*")):
+            name = file.relative_to(path).as_posix()
+            if file.is_file() and _is_image_name(name):
+                yield name, file.read_bytes()
+        return
+
+    with open(path, "rb") as fh:
+        yield from _iter_archive_file(fh)
+
+
+def count_path_images(path: Path) -> int:
+    """Number of images ``iter_path_images`` yields for ``path``, without reading them."""
+    path = Path(path)
+    if path.is_dir():
+        return sum(
+            1 for file in path.rglob("*") if file.is_file() and _is_image_name(file.relative_to(path).as_posix())
+        )
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return sum(1 for info in archive.infolist() if not info.is_dir() and _is_image_name(info.filename))
+    try:
+        with tarfile.open(path, mode="r:*") as archive:
+            return sum(1 for member in archive if member.isfile() and _is_image_name(member.name))
+    except tarfile.TarError as exc:
+        raise ValueError("Unsupported archive format: expected zip or tar") from exc
@@ -1,169 +1,823 @@
+import hashlib
 import logging
 import threading
+import time
 import traceback
+import weakref
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Tuple
-
-import torch
-from torchvision import transforms
-
-from sniffnet.core.resnet_model import create_resnet18
-
-_MODEL = None
-_TRANSFORM = None
-_DEFAULT_CLASSES = ["Fresh", "Bad"]
-_DEFAULT_CLASS_TO_IDX = {"Fresh": 0, "Bad": 1}
-_CLASSES = list(_DEFAULT_CLASSES)
-_CLASS_TO_IDX = dict(_DEFAULT_CLASS_TO_IDX)
-_LOAD_THREAD = None
-_LOAD_ERROR = None
-_MODEL_HEALTH = None
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+
+from sniffnet.core.checkpoints import DEFAULT_CLASS_TO_IDX, DEFAULT_CLASSES
+from sniffnet.core.checkpoints import extract_state_dict  # noqa: F401 (re-exported)
+from sniffnet.core.preprocessing import ImagePreprocessor
+from sniffnet.core.runners import benchmark, resident_memory_mb, softmax, warmup
+from sniffnet.core.telemetry import (
+    CASCADE_AUDITS,
+    CASCADE_IMAGES,
+    FORWARD_BATCH_SIZE,
+    FORWARD_SECONDS,
+    MODEL_LOAD_SECONDS,
+    MODEL_LOADS,
+)
+
+BACKENDS = ("torch", "onnxruntime")
+DEFAULT_KEY = "default"
+
 _LOCK = threading.Lock()
 _LOGGER = logging.getLogger(__name__)
 
 
-def extract_state_dict(checkpoint) -> tuple[dict, str]:
-    """Normalize checkpoint formats to a state_dict and return its source tag."""
-    if isinstance(checkpoint, dict):
-        if "model_state" in checkpoint:
-            return checkpoint["model_state"], "model_state"
-        if "state_dict" in checkpoint:
-            return checkpoint["state_dict"], "state_dict"
-        return checkpoint, "state_dict_direct"
-    raise RuntimeError("Unsupported checkpoint format: expected dict or state_dict")
-
-
-def start_load(weights_path: str, device: str) -> bool:
-    """Kick off background weight loading if not already in progress or loaded."""
-    global _LOAD_THREAD, _LOAD_ERROR
+class _ModelEntry:
+    """One registry slot: the loader thread, the served runner and its metadata."""
+
+    def __init__(self, key: str, weights_path: str, device: str, options: dict, pinned: bool) -> None:
+        self.key = key
+        self.weights_path = weights_path
+        self.device = device
+        self.options = options
+        self.pinned = pinned
+
+        self.runner = None
+        self.transform = None
+        self.classes = list(DEFAULT_CLASSES)
+        self.class_to_idx = dict(DEFAULT_CLASS_TO_IDX)
+        self.health = None
+        self.quantization_report = None
+        self.size_bytes = 0
+        self.identity = None
+        self.error = None
+        self.thread = None
+        self.last_used = time.monotonic()
+        # Bumped on every hot swap; identifies which weights produced a prediction
+        self.generation = 0
+        self.reload_thread = None
+        self.reload_error = None
+
+    def is_loading(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def is_reloading(self) -> bool:
+        return self.reload_thread is not None and self.reload_thread.is_alive()
+
+    def state(self) -> str:
+        if self.is_reloading():
+            return "reloading"
+        if self.runner is not None:
+            return "loaded"
+        if self.is_loading():
+            return "loading"
+        return "error" if self.error else "idle"
+
+
+# Least recently used first; the default model is pinned and never evicted
+_ENTRIES: "OrderedDict[str, _ModelEntry]" = OrderedDict()
+_MAX_MODELS = None
+_MAX_BYTES = None
+# Forward passes running at once, whoever calls them; each may use all intra-op threads
+_FORWARD_SLOTS = threading.BoundedSemaphore(2)
+
+
+def configure_registry(max_models: int | None = None, max_bytes: int | None = None) -> None:
+    """Cap how many models (and bytes of weights) stay resident; ``None`` or 0 means unlimited."""
+    global _MAX_MODELS, _MAX_BYTES
     with _LOCK:
-        if _MODEL is not None:
-            return False
-        if _LOAD_THREAD is not None and _LOAD_THREAD.is_alive():
+        _MAX_MODELS = max_models or None
+        _MAX_BYTES = max_bytes or None
+        _evict_locked()
+
+
+def configure_forwards(max_concurrent: int) -> None:
+    """Cap how many forward passes (micro-batcher, bulk routes, jobs, video) run at once."""
+    global _FORWARD_SLOTS
+    if max_concurrent < 1:
+        raise ValueError("max_concurrent must be >= 1")
+    _FORWARD_SLOTS = threading.BoundedSemaphore(max_concurrent)
+
+
+def start_load(
+    weights_path: str,
+    device: str,
+    fuse: bool = True,
+    serving_mode: str = "eager",
+    warmup_batch_sizes: Sequence[int] = (),
+    quantization: str = "none",
+    calibration_dir: str | None = None,
+    backend: str = "torch",
+    onnx_path: str | None = None,
+    num_threads: int | None = None,
+    mmap_weights: bool = False,
+    health_batch_sizes: Sequence[int] = (),
+    key: str = DEFAULT_KEY,
+    pinned: bool = False,
+) -> bool:
+    """Kick off background weight loading if not already in progress or loaded.
+
+    With ``fuse`` the served model has BatchNorm folded into the convolutions.
+    ``serving_mode`` selects eager, TorchScript or torch.compile execution, and the
+    model only reports as loaded after warmup forwards at ``warmup_batch_sizes``.
+    ``quantization`` ("dynamic" or "static") serves an INT8 CPU model instead;
+    static quantization is calibrated on the images under ``calibration_dir``.
+    ``backend="onnxruntime"`` serves ``onnx_path`` without importing torch; by default
+    that is an export next to the checkpoint, keyed on its size and mtime and made on
+    first use of each version of the weights.
+    ``num_threads`` caps the backend's intra-op threads. ``.safetensors`` checkpoints are
+    always memory-mapped; ``mmap_weights`` maps ``.pth`` checkpoints too. Mapped weights
+    are served in place (and shared between processes) only by the eager or compiled,
+    unquantized torch model, so ``fuse`` is ignored for them; TorchScript freezing and
+    quantization copy them.
+    After warmup, a short self-benchmark at ``health_batch_sizes`` becomes the health payload.
+    Every ``key`` is its own registry slot; once it is loaded, the least recently
+    used models are evicted if the registry limits are exceeded, except ``pinned``
+    ones and the default model.
+    """
+    options = {
+        "fuse": fuse,
+        "serving_mode": serving_mode,
+        "warmup_batch_sizes": tuple(warmup_batch_sizes),
+        "quantization": quantization,
+        "calibration_dir": calibration_dir,
+        "backend": backend,
+        "onnx_path": onnx_path,
+        "num_threads": num_threads,
+        "mmap_weights": mmap_weights,
+        "health_batch_sizes": tuple(health_batch_sizes),
+    }
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is not None and (entry.runner is not None or entry.is_loading()):
             return False
 
-        _LOAD_ERROR = None
-        _LOAD_THREAD = threading.Thread(
-            target=_load_worker, args=(weights_path, device), daemon=True
-        )
-        _LOAD_THREAD.start()
+        entry = _ModelEntry(key, weights_path, device, options, pinned=pinned or key == DEFAULT_KEY)
+        entry.thread = threading.Thread(target=_load_worker, args=(entry,), daemon=True)
+        _ENTRIES[key] = entry
+        entry.thread.start()
         return True
 
 
-def _load_worker(weights_path: str, device: str) -> None:
+def _load_runner(
+    weights_file: Path,
+    device: str,
+    fuse: bool,
+    serving_mode: str,
+    quantization: str,
+    calibration_dir: str | None,
+    backend: str,
+    onnx_path: str | None,
+    num_threads: int | None,
+    mmap_weights: bool = False,
+) -> Tuple[Any, list, dict, dict]:
+    # Backends are imported lazily so that onnxruntime workers never import torch
+    if backend == "onnxruntime":
+        if device != "cpu":
+            raise RuntimeError(f"onnxruntime backend is CPU-only, got device {device}")
+        from sniffnet.core.onnx_backend import load_onnx_runner, onnx_cache_path
+
+        onnx_file = Path(onnx_path).expanduser().resolve() if onnx_path else onnx_cache_path(weights_file)
+        if not onnx_file.exists():
+            _LOGGER.warning("%s not found; exporting it from %s (this imports torch once)", onnx_file, weights_file)
+            from sniffnet.core.onnx_export import export_onnx
+
+            export_onnx(weights_file, onnx_file)
+        return load_onnx_runner(onnx_file, num_threads=num_threads)
+
+    if backend == "torch":
+        from sniffnet.core.torch_backend import load_torch_runner
+
+        return load_torch_runner(
+            weights_file,
+            device,
+            fuse=fuse,
+            serving_mode=serving_mode,
+            quantization=quantization,
+            calibration_dir=calibration_dir,
+            num_threads=num_threads,
+            mmap_weights=mmap_weights,
+        )
+
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+
+
+def _build_entry_model(weights_path: str, device: str, options: dict) -> dict:
+    """Load, warm up and benchmark the runner for a registry entry without publishing it."""
+    start = time.perf_counter()
+    weights_file = Path(weights_path).expanduser().resolve()
+
+    runner, classes, class_to_idx, info = _load_runner(
+        weights_file,
+        device,
+        options["fuse"],
+        options["serving_mode"],
+        options["quantization"],
+        options["calibration_dir"],
+        options["backend"],
+        options["onnx_path"],
+        options["num_threads"],
+        options["mmap_weights"],
+    )
+    transform = ImagePreprocessor()
+
+    if options["warmup_batch_sizes"]:
+        warmup(runner, options["warmup_batch_sizes"], image_size=transform.size)
+    load_seconds = time.perf_counter() - start
+
+    stat = weights_file.stat() if weights_file.exists() else None
+    # An explicit ONNX file is served instead of the checkpoint, so it is fingerprinted too
+    onnx_stat = None
+    if options["backend"] == "onnxruntime" and options["onnx_path"]:
+        onnx_file = Path(options["onnx_path"]).expanduser()
+        onnx_stat = onnx_file.stat() if onnx_file.exists() else None
+    fingerprint = (
+        str(weights_file),
+        stat.st_size if stat else None,
+        stat.st_mtime_ns if stat else None,
+        options["backend"],
+        options["onnx_path"],
+        onnx_stat.st_size if onnx_stat else None,
+        onnx_stat.st_mtime_ns if onnx_stat else None,
+        options["quantization"],
+        options["fuse"],
+    )
+
+    return {
+        "weights_path": weights_path,
+        "runner": runner,
+        "transform": transform,
+        "classes": classes,
+        "class_to_idx": class_to_idx,
+        "quantization_report": info.get("quantization_report"),
+        # The checkpoint size is a good proxy for the resident weights
+        "size_bytes": stat.st_size if stat else 0,
+        # Same weights (and ONNX) files and build options -> same predictions
+        "identity": hashlib.sha256(repr(fingerprint).encode()).hexdigest()[:16],
+        "health": {
+            "backend": runner.backend,
+            "device": str(runner.device),
+            "checkpoint_format": info.get("checkpoint_format"),
+            "serving_mode": info.get("serving_mode"),
+            "fused": info.get("fused"),
+            "weights_mapped": info.get("weights_mapped", False),
+            "quantization": info.get("quantization", "none"),
+            "parameters": info.get("parameters"),
+            "threads": info.get("threads"),
+            "embeddings": getattr(runner, "supports_features", False),
+            "load_seconds": load_seconds,
+            # Measured after warmup, so one-off allocations and compilation are excluded
+            "latency_ms": benchmark(runner, options["health_batch_sizes"], image_size=transform.size),
+            "resident_memory_mb": resident_memory_mb(),
+            "benchmarked_at": datetime.now(timezone.utc).isoformat(),
+        },
+    }
+
+
+def _publish_locked(entry: _ModelEntry, built: dict) -> None:
+    """Point ``entry`` at a freshly built model; caller holds ``_LOCK``."""
+    for name, value in built.items():
+        setattr(entry, name, value)
+    entry.error = None
+    entry.last_used = time.monotonic()
+    _evict_locked(keep=entry.key)
+
+
+def _load_worker(entry: _ModelEntry) -> None:
     """Load model weights and preprocessing pipeline in a background thread."""
-    global _MODEL, _TRANSFORM, _LOAD_ERROR, _MODEL_HEALTH
+    start = time.perf_counter()
     try:
-        torch_device = torch.device(device)
-        weights_file = Path(weights_path).expanduser().resolve()
-
-        model = create_resnet18(num_classes=2)
-        checkpoint = torch.load(weights_file, map_location=torch_device)
-
-        state_dict, checkpoint_format = extract_state_dict(checkpoint)
-        _LOGGER.info("Checkpoint format detected: %s", checkpoint_format)
-
-        classes = None
-        class_to_idx = None
-        if isinstance(checkpoint, dict):
-            classes = checkpoint.get("classes")
-            class_to_idx = checkpoint.get("class_to_idx")
-            if classes is not None and not isinstance(classes, list):
-                _LOGGER.warning("Invalid classes type in checkpoint (%s); ignoring", type(classes))
-                classes = None
-            if class_to_idx is not None and not isinstance(class_to_idx, dict):
-                _LOGGER.warning("Invalid class_to_idx type in checkpoint (%s); ignoring", type(class_to_idx))
-                class_to_idx = None
-
-        try:
-            model.load_state_dict(state_dict, strict=True)
-        except Exception as exc:
-            raise RuntimeError(f"load_state_dict failed with strict=True: {exc}") from exc
-        model.to(torch_device)
-        model.eval()
-
-        loaded_classes = classes if classes else list(_DEFAULT_CLASSES)
-        loaded_class_to_idx = class_to_idx if class_to_idx else dict(_DEFAULT_CLASS_TO_IDX)
-        if classes is None:
-            _LOGGER.warning("classes not found in checkpoint; using fallback order %s", loaded_classes)
-        if class_to_idx is None:
-            _LOGGER.warning("class_to_idx not found in checkpoint; using fallback mapping %s", loaded_class_to_idx)
-
-        transform = transforms.Compose(
-            [
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225],
-                ),
-            ]
-        )
+        built = _build_entry_model(entry.weights_path, entry.device, entry.options)
+        with _LOCK:
+            _publish_locked(entry, built)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start, entry.key)
+        MODEL_LOADS.inc(entry.key, "loaded")
 
+    except Exception:
+        _LOGGER.exception("Failed to load model %s from %s", entry.key, entry.weights_path)
+        MODEL_LOADS.inc(entry.key, "failed")
         with _LOCK:
-            _MODEL = model
-            _TRANSFORM = transform
-            _LOAD_ERROR = None
-            _CLASSES = loaded_classes
-            _CLASS_TO_IDX = loaded_class_to_idx
+            entry.runner = None
+            entry.transform = None
+            entry.error = traceback.format_exc()
 
+
+def _reload_worker(entry: _ModelEntry, weights_path: str) -> None:
+    """Build the replacement model while the current one keeps serving, then swap it in."""
+    start = time.perf_counter()
+    try:
+        built = _build_entry_model(weights_path, entry.device, entry.options)
     except Exception:
-        _LOGGER.exception("Failed to load model from %s", weights_path)
+        _LOGGER.exception("Failed to reload model %s from %s; keeping the current one", entry.key, weights_path)
+        MODEL_LOADS.inc(entry.key, "reload_failed")
         with _LOCK:
-            _MODEL = None
-            _TRANSFORM = None
-            _LOAD_ERROR = traceback.format_exc()
+            entry.reload_error = traceback.format_exc()
+        return
+
+    with _LOCK:
+        if _ENTRIES.get(entry.key) is not entry:
+            _LOGGER.info("Model %s was unloaded during reload; discarding the new weights", entry.key)
+            return
+        previous = entry.runner
+        _publish_locked(entry, built)
+        entry.generation += 1
+        entry.reload_error = None
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - start, entry.key)
+    MODEL_LOADS.inc(entry.key, "reloaded")
+
+    # Batches already running hold their own reference and finish on the previous model;
+    # its memory is released once the last of them drops it
+    weakref.finalize(previous, _LOGGER.info, "Previous model %s drained and released", entry.key)
+    _LOGGER.info("Hot-swapped model %s to generation %d from %s", entry.key, entry.generation, weights_path)
+
+
+def reload(weights_path: str | None = None, key: str = DEFAULT_KEY) -> bool:
+    """Load new weights for an already loaded model in the background and swap them in atomically.
+
+    ``weights_path`` defaults to the entry's current checkpoint. Returns False if a reload
+    is already running; raises RuntimeError if the model is not loaded yet.
+    """
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None or entry.runner is None:
+            raise RuntimeError("model not loaded")
+        if entry.is_reloading():
+            return False
+
+        entry.reload_error = None
+        entry.reload_thread = threading.Thread(
+            target=_reload_worker, args=(entry, weights_path or entry.weights_path), daemon=True
+        )
+        entry.reload_thread.start()
+        return True
 
 
-def get_model_blocking(timeout: float | None = None) -> Tuple[torch.nn.Module, transforms.Compose, List[str]]:
+def wait_for_reload(timeout: float | None = None, key: str = DEFAULT_KEY) -> None:
+    """Block until a running reload of ``key`` has finished; raise if it failed."""
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        thread = entry.reload_thread if entry is not None else None
+
+    if thread is not None:
+        thread.join(timeout=timeout)
+    with _LOCK:
+        if entry is not None and entry.reload_error:
+            raise RuntimeError(entry.reload_error)
+
+
+def _evict_locked(keep: str | None = None) -> None:
+    """Drop least recently used models until the registry limits hold; caller holds ``_LOCK``.
+
+    Batches already running keep their own reference to an evicted runner and finish normally.
+    """
+    while True:
+        loaded = [entry for entry in _ENTRIES.values() if entry.runner is not None]
+        over_count = _MAX_MODELS is not None and len(loaded) > _MAX_MODELS
+        over_bytes = _MAX_BYTES is not None and sum(entry.size_bytes for entry in loaded) > _MAX_BYTES
+        if not (over_count or over_bytes):
+            return
+
+        victim = next((entry for entry in loaded if not entry.pinned and entry.key != keep), None)
+        if victim is None:
+            return
+        del _ENTRIES[victim.key]
+        _LOGGER.info("Evicted model %s (%.1f MB) from the registry", victim.key, victim.size_bytes / 1e6)
+
+
+def _touch_locked(key: str) -> _ModelEntry:
+    """Return the loaded entry for ``key`` and mark it most recently used; caller holds ``_LOCK``."""
+    entry = _ENTRIES.get(key)
+    if entry is None:
+        raise RuntimeError("model not loaded")
+    if entry.error:
+        raise RuntimeError(entry.error)
+    if entry.runner is None:
+        if entry.is_loading():
+            raise RuntimeError("loading in progress")
+        raise RuntimeError("model not loaded")
+
+    entry.last_used = time.monotonic()
+    _ENTRIES.move_to_end(key)
+    return entry
+
+
+def get_model_blocking(
+    timeout: float | None = None, key: str = DEFAULT_KEY
+) -> Tuple[Any, ImagePreprocessor, List[str]]:
     """Wait for model to finish loading (up to timeout) and return it."""
     thread = None
     with _LOCK:
-        thread = _LOAD_THREAD
-        model_ready = _MODEL is not None
+        entry = _ENTRIES.get(key)
+        if entry is not None and entry.runner is None:
+            thread = entry.thread
 
-    if not model_ready and thread is not None and thread.is_alive():
+    if thread is not None and thread.is_alive():
         thread.join(timeout=timeout)
 
     with _LOCK:
-        if _LOAD_ERROR:
-            raise RuntimeError(_LOAD_ERROR)
+        entry = _touch_locked(key)
+        return entry.runner, entry.transform, entry.classes
+
+
+def _forward(batch: np.ndarray, key: str, features: bool = False) -> np.ndarray | Tuple[np.ndarray, np.ndarray]:
+    """Softmax probabilities of one forward pass of the model under ``key``.
+
+    With ``features`` the pooled features of the same pass are returned as well.
+    """
+    with _LOCK:
+        model = _touch_locked(key).runner
+
+    # Bound to a local: a reconfiguration must not release a semaphore this call did not take
+    slots = _FORWARD_SLOTS
+    with slots:
+        start = time.perf_counter()
+        if features:
+            logits, pooled = model.forward_features(batch)
+        else:
+            logits = model(batch)
+        FORWARD_SECONDS.observe(time.perf_counter() - start, key)
+    FORWARD_BATCH_SIZE.observe(len(batch), key)
+    return (softmax(logits), pooled) if features else softmax(logits)
+
+
+def predict_batch(
+    arrays: List[np.ndarray] | np.ndarray,
+    key: str = DEFAULT_KEY,
+    embeddings: bool = False,
+    required: np.ndarray | None = None,
+) -> List[np.ndarray] | List[Tuple[np.ndarray, np.ndarray | None]]:
+    """Run one stacked forward pass and return a softmax row per preprocessed image.
+
+    ``arrays`` may also be an already stacked ``(N, 3, H, W)`` batch. Models with a
+    cascade (see ``configure_cascade``) answer through it. With ``embeddings`` every
+    row comes as ``(probs, embedding)``, the embedding from the full model's forward
+    pass; check ``supports_embeddings`` first. Behind a cascade only images that reach
+    the full model (escalated, audited, or flagged in the boolean mask ``required``)
+    get an embedding and the others get None, so asking for embeddings never turns
+    the cascade off.
+    """
+    batch = arrays if isinstance(arrays, np.ndarray) else np.stack(arrays)
+    cascade = _CASCADES.get(key)
+    if cascade is not None:
+        probs, pooled = _predict_cascade(batch, key, cascade, embeddings, required)
+    elif embeddings:
+        probs, pooled = _forward(batch, key, features=True)
+    else:
+        return list(_forward(batch, key))
+    return list(zip(probs, pooled)) if embeddings else list(probs)
+
+
+class _Cascade:
+    """A cheap model answering in front of a full one, with escalation statistics."""
+
+    def __init__(
+        self,
+        small_key: str,
+        weights_path: str,
+        device: str,
+        options: dict | None,
+        threshold: float,
+        input_stride: int,
+        audit_rate: float,
+    ) -> None:
+        self.small_key = small_key
+        self.weights_path = weights_path
+        self.device = device
+        self.options = options
+        self.threshold = threshold
+        self.input_stride = input_stride
+        self.audit_rate = audit_rate
+
+        self.lock = threading.Lock()
+        self.rng = np.random.default_rng()
+        self.images = 0
+        self.escalated = 0
+        self.bypassed = 0
+        self.audited = 0
+        self.agreed = 0
+        # Confident images sent to the full model only because their embedding was required
+        self.embedded = 0
+        self.small_seconds = 0.0
+        self.full_seconds = 0.0
+        # The small model is loaded once per cascade; a failure is kept here and not retried
+        self.load_started = False
+        self.load_error: str | None = None
+
+
+# Full model key -> its cascade
+_CASCADES: dict = {}
+
+
+def configure_cascade(
+    weights_path: str | None,
+    device: str = "cpu",
+    threshold: float = 0.9,
+    input_stride: int = 1,
+    audit_rate: float = 0.0,
+    options: dict | None = None,
+    key: str = DEFAULT_KEY,
+) -> None:
+    """Answer ``key`` with the small model at ``weights_path`` when it is confident enough.
+
+    Each batch goes through the small model first; only images whose top softmax
+    probability is below ``threshold`` are escalated to the full model, in one
+    smaller batch. With ``input_stride`` 2 the small model sees the input average-pooled
+    to half resolution. ``audit_rate`` sends that fraction of confident answers through
+    the full model as well, to measure how often the two agree. The small model loads
+    in the background on first use, pinned in the registry, with the ``start_load``
+    keyword arguments in ``options`` or, by default, those the full model was loaded
+    with (its ONNX file is always the one next to ``weights_path``). Until then the
+    full model answers alone. If that load fails the full model keeps answering alone
+    and the error is reported by ``get_cascade_stats``; configuring the cascade again
+    retries the load.
+    ``weights_path=None`` removes the cascade.
+    """
+    with _LOCK:
+        if weights_path is None:
+            _CASCADES.pop(key, None)
+            return
+        _CASCADES[key] = _Cascade(
+            f"{key}:cascade", weights_path, device, options, threshold, input_stride, audit_rate
+        )
+
+
+def _pool_input(batch: np.ndarray, stride: int) -> np.ndarray:
+    """Average-pool an ``(N, C, H, W)`` batch by ``stride`` in both spatial axes."""
+    n, c, h, w = batch.shape
+    h, w = h // stride * stride, w // stride * stride
+    pooled = batch[:, :, :h, :w].reshape(n, c, h // stride, stride, w // stride, stride)
+    return pooled.mean(axis=(3, 5), dtype=np.float32)
+
+
+def _ensure_small_model(cascade: _Cascade, key: str) -> None:
+    """Start loading the cascade's small model unless it is loading or already failed to."""
+    with _LOCK:
+        entry = _ENTRIES.get(cascade.small_key)
+        failed = entry is not None and entry.error is not None and not entry.is_loading()
+        if entry is not None and not failed:
+            return
+        full = _ENTRIES.get(key)
+        options = cascade.options if cascade.options is not None else full.options if full is not None else {}
+    with cascade.lock:
+        if failed and cascade.load_started:
+            if cascade.load_error is None:
+                _LOGGER.error("Cascade model %s failed to load; the full model answers alone", cascade.small_key)
+                cascade.load_error = entry.error
+            return
+        cascade.load_started = True
+    options = {**options, "onnx_path": None}
+    start_load(cascade.weights_path, cascade.device, **options, key=cascade.small_key, pinned=True)
+
+
+def _predict_cascade(
+    batch: np.ndarray, key: str, cascade: _Cascade, features: bool = False, required: np.ndarray | None = None
+) -> Tuple[np.ndarray, list | None]:
+    """Probabilities through the cascade, plus per-row full-model features (or None) with ``features``."""
+    if not is_loaded(cascade.small_key):
+        _ensure_small_model(cascade, key)
+        with cascade.lock:
+            cascade.images += len(batch)
+            cascade.bypassed += len(batch)
+        CASCADE_IMAGES.inc(key, "bypassed", amount=len(batch))
+        if features:
+            probs, pooled = _forward(batch, key, features=True)
+            return probs, list(pooled)
+        return _forward(batch, key), None
+
+    start = time.perf_counter()
+    small_input = _pool_input(batch, cascade.input_stride) if cascade.input_stride > 1 else batch
+    probs = _forward(small_input, cascade.small_key)
+    small_seconds = time.perf_counter() - start
+
+    uncertain = probs.max(axis=1) < cascade.threshold
+    with cascade.lock:
+        audit = ~uncertain & (cascade.rng.random(len(batch)) < cascade.audit_rate)
+    forced = np.zeros(len(batch), dtype=bool)
+    if features and required is not None:
+        forced = required & ~uncertain & ~audit
+    full_rows = uncertain | audit | forced
+
+    pooled = [None] * len(batch) if features else None
+    full_seconds = 0.0
+    agreed = 0
+    if full_rows.any():
+        start = time.perf_counter()
+        full = _forward(batch[full_rows], key, features=features)
+        full_probs, full_pooled = full if features else (full, None)
+        full_seconds = time.perf_counter() - start
+
+        audited_small = probs[audit].argmax(axis=1)
+        agreed = int((audited_small == full_probs[audit[full_rows]].argmax(axis=1)).sum())
+        probs[uncertain] = full_probs[uncertain[full_rows]]
+        if features:
+            for row, embedding in zip(np.flatnonzero(full_rows), full_pooled):
+                pooled[row] = embedding
+
+    escalations, audits, embedded = int(uncertain.sum()), int(audit.sum()), int(forced.sum())
+    with cascade.lock:
+        cascade.images += len(batch)
+        cascade.escalated += escalations
+        cascade.audited += audits
+        cascade.agreed += agreed
+        cascade.embedded += embedded
+        cascade.small_seconds += small_seconds
+        cascade.full_seconds += full_seconds
+    CASCADE_IMAGES.inc(key, "answered", amount=len(batch) - escalations)
+    CASCADE_IMAGES.inc(key, "escalated", amount=escalations)
+    if audits:
+        CASCADE_AUDITS.inc(key, "agreed", amount=agreed)
+        CASCADE_AUDITS.inc(key, "disagreed", amount=audits - agreed)
+    return probs, pooled
+
+
+def get_cascade_stats(key: str = DEFAULT_KEY) -> dict | None:
+    """Escalation rate, audit agreement and per-stage latency of ``key``'s cascade."""
+    cascade = _CASCADES.get(key)
+    if cascade is None:
+        return None
+    with _LOCK:
+        entry = _ENTRIES.get(cascade.small_key)
+        loaded = entry is not None and entry.runner is not None
+        # A failed load counts once this cascade started it, even before a batch noticed
+        error = entry.error if entry is not None and cascade.load_started and not entry.is_loading() else None
+    with cascade.lock:
+        cascaded = cascade.images - cascade.bypassed
+        escalated = cascade.escalated
+        full_images = escalated + cascade.audited + cascade.embedded
+        error = None if loaded else cascade.load_error or error
+        return {
+            "small_model": cascade.small_key,
+            "small_model_state": "loaded" if loaded else "error" if error else "loading",
+            "small_model_error": error,
+            "threshold": cascade.threshold,
+            "input_stride": cascade.input_stride,
+            "images": cascade.images,
+            "bypassed": cascade.bypassed,
+            "escalated": escalated,
+            "escalation_rate": escalated / cascaded if cascaded else 0.0,
+            "audited": cascade.audited,
+            "audit_agreement": cascade.agreed / cascade.audited if cascade.audited else None,
+            # Small-model time is spent on every cascaded image, full-model time on the rows sent to it
+            "small_ms_per_image": cascade.small_seconds * 1000.0 / cascaded if cascaded else 0.0,
+            "embedded": cascade.embedded,
+            "full_ms_per_image": cascade.full_seconds * 1000.0 / full_images if full_images else 0.0,
+        }
+
+
+# Third element of a ``predict_keyed_batch`` item: when to return the image's embedding
+EMBEDDING_REQUIRED = "required"
+EMBEDDING_IF_COMPUTED = "if_computed"
+
+
+def predict_keyed_batch(items: List[tuple]) -> List[np.ndarray | Tuple[np.ndarray, np.ndarray | None]]:
+    """``predict_batch`` over ``(key, array)`` pairs, one forward pass per distinct model.
+
+    An item may be ``(key, array, EMBEDDING_REQUIRED)`` to get ``(probs, embedding)``
+    back, or ``(key, array, EMBEDDING_IF_COMPUTED)`` to get the embedding only if the
+    full model runs on the image anyway (None otherwise, behind a cascade). The other
+    images of its model still share that forward pass.
+    """
+    groups = {}
+    for index, (key, array, *embedding) in enumerate(items):
+        groups.setdefault(key, []).append((index, array, embedding[0] if embedding else None))
+
+    rows = [None] * len(items)
+    for key, group in groups.items():
+        embeddings = any(wanted for _, _, wanted in group)
+        required = np.array([wanted == EMBEDDING_REQUIRED for _, _, wanted in group])
+        results = predict_batch(
+            [array for _, array, _ in group], key=key, embeddings=embeddings, required=required
+        )
+        for (index, _, wanted), result in zip(group, results):
+            rows[index] = result if wanted or not embeddings else result[0]
+    return rows
+
+
+def unload(key: str = DEFAULT_KEY) -> bool:
+    """Remove a model from the registry; False if it was not there."""
+    with _LOCK:
+        return _ENTRIES.pop(key, None) is not None
 
-        if _MODEL is None:
-            if _LOAD_THREAD is not None and _LOAD_THREAD.is_alive():
-                raise RuntimeError("loading in progress")
-            raise RuntimeError("model not loaded")
 
-        return _MODEL, _TRANSFORM, _CLASSES
+def list_models() -> List[dict]:
+    """Describe every registry slot, least recently used first."""
+    now = time.monotonic()
+    with _LOCK:
+        return [
+            {
+                "key": entry.key,
+                "weights_path": entry.weights_path,
+                "backend": entry.options["backend"],
+                "state": entry.state(),
+                "size_bytes": entry.size_bytes,
+                "identity": entry.identity,
+                "generation": entry.generation,
+                "reload_error": entry.reload_error,
+                "idle_seconds": round(now - entry.last_used, 3),
+                "pinned": entry.pinned,
+            }
+            for entry in _ENTRIES.values()
+        ]
+
+
+def get_model_identity(key: str = DEFAULT_KEY, cascade: bool = True) -> str | None:
+    """Fingerprint of the weights and build options currently served under ``key``.
+
+    With a cascade it also covers the small model and threshold, which change the answers;
+    ``cascade=False`` fingerprints the full model alone (what embeddings come from).
+    """
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None or entry.runner is None:
+            return None
+        if not cascade:
+            return entry.identity
+        cascade = _CASCADES.get(key)
+        small = _ENTRIES.get(cascade.small_key) if cascade is not None else None
+        if small is None or small.runner is None:
+            return entry.identity
+        parts = (entry.identity, small.identity, cascade.threshold, cascade.input_stride)
+        return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+
+def supports_embeddings(key: str = DEFAULT_KEY) -> bool:
+    """Whether the runner under ``key`` can return pooled features with its predictions."""
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        return entry is not None and getattr(entry.runner, "supports_features", False)
 
 
-def is_loaded() -> bool:
+def get_device(key: str = DEFAULT_KEY) -> str | None:
     with _LOCK:
-        return _MODEL is not None
+        entry = _ENTRIES.get(key)
+        return entry.runner.device if entry is not None and entry.runner is not None else None
 
 
-def is_loading() -> bool:
+def is_loaded(key: str = DEFAULT_KEY) -> bool:
     with _LOCK:
-        return _LOAD_THREAD is not None and _LOAD_THREAD.is_alive()
+        entry = _ENTRIES.get(key)
+        return entry is not None and entry.runner is not None
 
 
-def get_model_health() -> dict:
+def is_loading(key: str = DEFAULT_KEY) -> bool:
     with _LOCK:
-        if _LOAD_ERROR:
-            raise RuntimeError(_LOAD_ERROR)
-        if _MODEL is None or _MODEL_HEALTH is None:
-            if _LOAD_THREAD is not None and _LOAD_THREAD.is_alive():
-                raise RuntimeError("loading in progress")
+        entry = _ENTRIES.get(key)
+        return entry is not None and entry.is_loading()
+
+
+def get_model_health(key: str = DEFAULT_KEY) -> dict:
+    with _LOCK:
+        entry = _touch_locked(key)
+        if entry.health is None:
             raise RuntimeError("model not loaded")
-        return dict(_MODEL_HEALTH)
+        return dict(entry.health)
+
+
+def refresh_health(key: str = DEFAULT_KEY, **options) -> dict:
+    """Run the health self-benchmark of loaded model ``key`` again and return the new payload.
+
+    ``options`` (``start_load`` keyword arguments) replace the model's own for this
+    benchmark and later reloads; pre-forked workers pass their thread count and the
+    benchmark batch sizes for the model their parent loaded.
+    """
+    with _LOCK:
+        entry = _touch_locked(key)
+        entry.options = {**entry.options, **options}
+        runner, transform, health = entry.runner, entry.transform, entry.health
+        batch_sizes = entry.options["health_batch_sizes"]
+
+    threads = health.get("threads")
+    if runner.backend == "torch":
+        import torch
+
+        threads = {"intra_op": torch.get_num_threads(), "inter_op": torch.get_num_interop_threads()}
+    health = {
+        **health,
+        "threads": threads,
+        "latency_ms": benchmark(runner, batch_sizes, image_size=transform.size),
+        "resident_memory_mb": resident_memory_mb(),
+        "benchmarked_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with _LOCK:
+        # A reload that swapped the runner in the meantime brought its own payload
+        if _ENTRIES.get(key) is entry and entry.runner is runner:
+            entry.health = health
+    return dict(health)
+
+
+def get_quantization_report(key: str = DEFAULT_KEY) -> dict | None:
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        report = entry.quantization_report if entry is not None else None
+        return dict(report) if report is not None else None
 
 
-def get_classes() -> List[str]:
+def get_classes(key: str = DEFAULT_KEY) -> List[str]:
     with _LOCK:
-        return list(_CLASSES)
+        entry = _ENTRIES.get(key)
+        return list(entry.classes) if entry is not None else list(DEFAULT_CLASSES)
 
 
-def get_class_to_idx() -> dict:
+def get_class_to_idx(key: str = DEFAULT_KEY) -> dict:
     with _LOCK:
-        return dict(_CLASS_TO_IDX)
+        entry = _ENTRIES.get(key)
+        return dict(entry.class_to_idx) if entry is not None else dict(DEFAULT_CLASS_TO_IDX)
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+from sniffnet.core.checkpoints import DEFAULT_CLASS_TO_IDX, DEFAULT_CLASSES
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def onnx_cache_path(weights_file: Path) -> Path:
+    """Default location of the ONNX export of a checkpoint.
+
+    The name embeds the checkpoint size/mtime, like ``serving.scripted_cache_path``, so
+    new weights at the same path are exported again instead of serving a stale graph.
+    """
+    stat = weights_file.stat()
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+    return weights_file.with_name(f"{weights_file.stem}.{digest}.onnx")
+
+
+class OnnxRunner:
+    """Serve an exported ONNX graph through onnxruntime on CPU, without importing torch."""
+
+    backend = "onnxruntime"
+    device = "cpu"
+
+    def __init__(self, session: ort.InferenceSession) -> None:
+        self.session = session
+        self._input_name = session.get_inputs()[0].name
+        self._output_name = session.get_outputs()[0].name
+        # Graphs exported before the embedding output was added only have logits
+        self.supports_features = "embedding" in {output.name for output in session.get_outputs()}
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self.session.run([self._output_name], {self._input_name: batch})[0]
+
+    def forward_features(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.supports_features:
+            raise RuntimeError("this ONNX graph has no embedding output; export it again")
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        logits, features = self.session.run([self._output_name, "embedding"], {self._input_name: batch})
+        return logits, features
+
+
+def load_onnx_runner(onnx_file: Path, num_threads: int | None = None) -> Tuple[OnnxRunner, list, dict, dict]:
+    """Open an ONNX model produced by ``onnx_export.export_onnx``.
+
+    Returns ``(runner, classes, class_to_idx, info)`` like ``load_torch_runner``; the class
+    metadata comes from the graph's custom metadata.
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(str(onnx_file), options, providers=["CPUExecutionProvider"])
+
+    metadata = session.get_modelmeta().custom_metadata_map
+    classes = json.loads(metadata["classes"]) if "classes" in metadata else list(DEFAULT_CLASSES)
+    class_to_idx = (
+        json.loads(metadata["class_to_idx"]) if "class_to_idx" in metadata else dict(DEFAULT_CLASS_TO_IDX)
+    )
+    if "classes" not in metadata:
+        _LOGGER.warning("classes not found in ONNX metadata; using fallback order %s", classes)
+
+    info = {
+        "checkpoint_format": "onnx",
+        "onnx_file": str(onnx_file),
+        "parameters": int(metadata["parameters"]) if "parameters" in metadata else None,
+        # 0 lets onnxruntime use one thread per physical core
+        "threads": {"intra_op": options.intra_op_num_threads, "inter_op": options.inter_op_num_threads},
+    }
+    return OnnxRunner(session), classes, class_to_idx, info
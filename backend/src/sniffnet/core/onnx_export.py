@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import onnx
+import torch
+
+from sniffnet.core.checkpoints import extract_class_metadata, extract_state_dict, load_checkpoint
+from sniffnet.core.fusion import fuse_resnet
+from sniffnet.core.resnet_model import create_resnet18, resnet_width
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _WithEmbedding(torch.nn.Module):
+    """Export wrapper returning the pooled features as a second graph output."""
+
+    def __init__(self, model: torch.nn.Module) -> None:
+        super().__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        return self.model.forward_features(x)
+
+
+def export_onnx(weights_file: Path, output_file: Path, image_size: int = 224, opset: int = 17) -> Path:
+    """Export a checkpoint to ONNX with a dynamic batch dimension.
+
+    BatchNorm is folded before export and the ``classes``/``class_to_idx`` metadata is
+    stored in the graph, so the onnxruntime backend needs nothing but the ``.onnx`` file.
+    Besides ``logits`` the graph outputs the pooled features as ``embedding``.
+    """
+    weights_file = Path(weights_file)
+    output_file = Path(output_file)
+
+    checkpoint = load_checkpoint(weights_file)
+    state_dict, _ = extract_state_dict(checkpoint)
+    classes, class_to_idx = extract_class_metadata(checkpoint)
+
+    model = create_resnet18(num_classes=len(classes), width=resnet_width(state_dict))
+    model.load_state_dict(state_dict, strict=True)
+    model = fuse_resnet(model.eval())
+
+    tmp_file = output_file.with_suffix(".tmp")
+    example = torch.randn(1, 3, image_size, image_size)
+    torch.onnx.export(
+        _WithEmbedding(model),
+        (example,),
+        str(tmp_file),
+        input_names=["input"],
+        output_names=["logits", "embedding"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}, "embedding": {0: "batch"}},
+        opset_version=opset,
+        dynamo=False,
+    )
+
+    graph = onnx.load(str(tmp_file))
+    parameters = sum(int(np.prod(initializer.dims)) for initializer in graph.graph.initializer)
+    for key, value in (("classes", classes), ("class_to_idx", class_to_idx), ("parameters", parameters)):
+        entry = graph.metadata_props.add()
+        entry.key = key
+        entry.value = json.dumps(value)
+    onnx.save(graph, str(tmp_file))
+    os.replace(tmp_file, output_file)
+
+    _LOGGER.info("Exported %s to %s", weights_file, output_file)
+    return output_file
@@ -0,0 +1,92 @@
+import threading
+from typing import Any
+
+import numpy as np
+
+
+def dhash(pixels: np.ndarray, hash_size: int = 8) -> int:
+    """64-bit difference hash of a preprocessed ``(3, H, W)`` image.
+
+    The already resized and normalized model input is averaged over channels and
+    pooled to ``hash_size x (hash_size + 1)`` blocks; each bit records whether a block
+    is brighter than its right neighbour. Small lighting and JPEG changes keep most bits.
+    """
+    gray = pixels.mean(axis=0)
+    height, width = gray.shape
+    rows = np.linspace(0, height, hash_size + 1).astype(int)[:-1]
+    cols = np.linspace(0, width, hash_size + 2).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    blocks = sums / np.outer(np.diff(rows, append=height), np.diff(cols, append=width))
+
+    bits = (blocks[:, 1:] > blocks[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class PerceptualIndex:
+    """Predictions of recent images, looked up by Hamming distance between their hashes.
+
+    Every entry records the model identity that produced it and only matches lookups
+    for that identity, so new weights never reuse stale predictions. Lookups are a
+    vectorized scan over at most ``max_entries`` hashes in a ring buffer, with the
+    oldest entries overwritten first.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_distance: int = 4) -> None:
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+
+        self._lock = threading.Lock()
+        self._identity_ids: dict = {}
+        self._hashes = np.zeros(max_entries, dtype=np.uint64)
+        self._owners = np.full(max_entries, -1, dtype=np.int64)
+        self._values: list = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _identity_id_locked(self, identity: str) -> int:
+        if identity not in self._identity_ids:
+            # Identities no longer owning any entry are forgotten
+            live = set(self._owners[:self._size].tolist())
+            self._identity_ids = {key: value for key, value in self._identity_ids.items() if value in live}
+            self._identity_ids[identity] = max(self._identity_ids.values(), default=-1) + 1
+        return self._identity_ids[identity]
+
+    def get(self, image_hash: int, identity: str) -> Any | None:
+        """Prediction of the closest indexed image within ``max_distance`` bits, if any."""
+        with self._lock:
+            owner = self._identity_ids.get(identity)
+            if owner is not None and self._size:
+                distances = np.bitwise_count(self._hashes[:self._size] ^ np.uint64(image_hash))
+                distances[self._owners[:self._size] != owner] = 64
+                best = int(distances.argmin())
+                if distances[best] <= self.max_distance:
+                    self._hits += 1
+                    return self._values[best]
+            self._misses += 1
+            return None
+
+    def put(self, image_hash: int, identity: str, value: Any) -> None:
+        with self._lock:
+            self._owners[self._next] = self._identity_id_locked(identity)
+            self._hashes[self._next] = image_hash
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
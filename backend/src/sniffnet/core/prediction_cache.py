@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# Age after which a leftover temporary file of the disk tier is deleted by a sweep
+_TMP_GRACE_S = 3600.0
+
+
+def cache_key(data: bytes, model_identity: str) -> str:
+    """Content address of an upload for one model version."""
+    digest = hashlib.sha256(model_identity.encode())
+    digest.update(b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Bounded in-process LRU of predictions with a TTL, optionally backed by a shared directory.
+
+    Keys come from ``cache_key``, which includes the model identity, so loading
+    different weights invalidates every older entry: they can no longer be hit
+    and age out of the LRU. The on-disk tier (``disk_dir``) stores one JSON file per
+    key and can be shared by several API workers. Each file's mtime is its expiry time;
+    a ``put`` at least ``sweep_interval_s`` (default: the TTL) after the last sweep
+    deletes the expired files, so the directory holds about one TTL of entries.
+    With a disk tier, ``get`` and ``put`` do file I/O: call them off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 600.0,
+        disk_dir: Path | None = None,
+        sweep_interval_s: float | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.disk_dir = Path(disk_dir).expanduser() if disk_dir else None
+        self.sweep_interval_s = ttl_s if sweep_interval_s is None else sweep_interval_s
+
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._next_sweep = 0.0
+        self._sweeping = False
+        self._swept = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+        value, expires_at = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._store_locked(key, value, expires_at)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            self._store_locked(key, value, expires_at)
+        self._write_disk(key, value, expires_at)
+        if self.disk_dir is not None and time.monotonic() >= self._next_sweep:
+            self.sweep_disk()
+
+    def sweep_disk(self) -> int:
+        """Delete the expired files of the disk tier; returns how many were removed."""
+        with self._lock:
+            if self.disk_dir is None or self._sweeping:
+                return 0
+            self._sweeping = True
+            self._next_sweep = time.monotonic() + self.sweep_interval_s
+        now = time.time()
+        removed = 0
+        try:
+            for path in self.disk_dir.glob("*/*"):
+                try:
+                    # Temporary files are dated when written; give their writer time to finish
+                    expires_at = path.stat().st_mtime + (_TMP_GRACE_S if path.suffix == ".tmp" else 0)
+                    if expires_at <= now:
+                        path.unlink()
+                        removed += 1
+                except OSError:
+                    # Removed by another worker's sweep or read in the meantime
+                    continue
+        finally:
+            with self._lock:
+                self._sweeping = False
+                self._swept += removed
+        if removed:
+            _LOGGER.info("Removed %d expired prediction cache files from %s", removed, self.disk_dir)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "disk_dir": str(self.disk_dir) if self.disk_dir else None,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "disk_swept": self._swept,
+                "hit_rate": (self._hits + self._disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _store_locked(self, key: str, value: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str, now: float):
+        if self.disk_dir is None:
+            return None, None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                record = json.load(fh)
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError):
+            _LOGGER.warning("Ignoring unreadable prediction cache file %s", path)
+            return None, None
+
+        if record.get("expires_at", 0) <= now:
+            path.unlink(missing_ok=True)
+            return None, None
+        return record["value"], record["expires_at"]
+
+    def _write_disk(self, key: str, value: Any, expires_at: float) -> None:
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump({"expires_at": expires_at, "value": value}, fh)
+            os.utime(tmp_path, (expires_at, expires_at))
+            os.replace(tmp_path, path)
+        except OSError:
+            _LOGGER.warning("Could not write prediction cache file %s", path, exc_info=True)
@@ -0,0 +1,87 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = 224
+IMAGE_MEAN = (0.485, 0.456, 0.406)
+IMAGE_STD = (0.229, 0.224, 0.225)
+NPY_MAGIC = b"\x93NUMPY"
+
+
+def decode_image(data: bytes, size: int = IMAGE_SIZE) -> Image.Image:
+    """Decode raw bytes to an RGB image, using JPEG draft mode to skip full-resolution decode.
+
+    For JPEGs, ``draft`` lets libjpeg decode at 1/2, 1/4 or 1/8 scale while keeping
+    both sides >= ``size``, so a 12 MP photo never materializes at full resolution.
+    """
+    image = Image.open(BytesIO(data))
+    if image.format == "JPEG":
+        image.draft("RGB", (size, size))
+    return image.convert("RGB")
+
+
+def pixels_from_buffer(data: bytes, shape: tuple | None = None) -> np.ndarray:
+    """View raw uint8 RGB pixels as an ``(H, W, 3)`` array without copying them.
+
+    ``data`` is either a ``.npy`` file (shape and dtype come from its header) or bare
+    HWC bytes of the declared ``shape``. A leading batch axis of 1 is dropped.
+    Raises ValueError when the payload does not match.
+    """
+    offset = 0
+    if data.startswith(NPY_MAGIC):
+        buffer = BytesIO(data)
+        version = np.lib.format.read_magic(buffer)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(buffer)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(buffer)
+        else:
+            raise ValueError(f"unsupported .npy format version {version}")
+        if dtype != np.uint8 or fortran_order:
+            raise ValueError(f"expected a C-ordered uint8 array, got {dtype} (fortran_order={fortran_order})")
+        offset = buffer.tell()
+    elif shape is None:
+        raise ValueError("raw pixels need a declared shape")
+
+    shape = tuple(int(dim) for dim in shape)
+    if len(shape) == 4 and shape[0] == 1:
+        shape = shape[1:]
+    if len(shape) != 3 or shape[2] != 3:
+        raise ValueError(f"expected (height, width, 3) RGB pixels, got shape {shape}")
+    expected = shape[0] * shape[1] * 3
+    if len(data) - offset != expected:
+        raise ValueError(f"shape {shape} needs {expected} bytes of pixels, got {len(data) - offset}")
+    return np.frombuffer(data, dtype=np.uint8, count=expected, offset=offset).reshape(shape)
+
+
+class ImagePreprocessor:
+    """Resize + ToTensor + Normalize in one pass, equivalent to the torchvision pipeline.
+
+    Normalization is fused into a single multiply-subtract over the uint8 pixels:
+    ``x * 1 / (255 * std) - mean / std``. The result is a float32 CHW NumPy array;
+    callers that batch can pass ``out`` (a ``(3, size, size)`` view into a preallocated
+    batch) to avoid extra copies.
+    """
+
+    def __init__(self, size: int = IMAGE_SIZE, mean=IMAGE_MEAN, std=IMAGE_STD) -> None:
+        self.size = size
+        mean = np.asarray(mean, dtype=np.float32).reshape(3, 1, 1)
+        std = np.asarray(std, dtype=np.float32).reshape(3, 1, 1)
+        self._scale = 1.0 / (255.0 * std)
+        self._shift = mean / std
+
+    def __call__(self, image: Image.Image, out: np.ndarray | None = None) -> np.ndarray:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if image.size != (self.size, self.size):
+            image = image.resize((self.size, self.size), Image.BILINEAR)
+        return self.normalize(np.asarray(image), out=out)
+
+    def normalize(self, pixels: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Normalize already resized ``(size, size, 3)`` uint8 RGB pixels into a CHW float32 array."""
+        if out is None:
+            out = np.empty((3, self.size, self.size), dtype=np.float32)
+        np.multiply(pixels.transpose(2, 0, 1), self._scale, out=out)
+        np.subtract(out, self._shift, out=out)
+        return out
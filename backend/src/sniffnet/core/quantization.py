@@ -0,0 +1,155 @@
+import copy
+import logging
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import torch
+from PIL import Image
+from torch import nn
+from torch.ao.quantization import default_dynamic_qconfig, get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+from sniffnet.core.image_sources import IMAGE_EXTENSIONS
+from sniffnet.core.preprocessing import ImagePreprocessor
+
+QUANTIZATION_MODES = ("none", "dynamic", "static")
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def load_calibration_images(
+    folder: Path,
+    preprocess: ImagePreprocessor,
+    classes: List[str],
+    limit: int = 256,
+) -> Tuple[torch.Tensor, torch.Tensor | None]:
+    """Preprocess up to ``limit`` images found under ``folder``.
+
+    If every image sits in a directory named after one of ``classes`` (the
+    ``<root>/<class>/<image>`` layout used for training), their labels are returned
+    too, so the quantized model's accuracy can be compared with the float one.
+    """
+    paths = sorted(
+        path for path in Path(folder).expanduser().rglob("*")
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    )[:limit]
+    if not paths:
+        raise RuntimeError(f"No calibration images found in {folder}")
+
+    images = torch.empty((len(paths), 3, preprocess.size, preprocess.size))
+    labels = []
+    for i, path in enumerate(paths):
+        with Image.open(path) as image:
+            preprocess(image.convert("RGB"), out=images[i].numpy())
+        labels.append(classes.index(path.parent.name) if path.parent.name in classes else None)
+
+    if any(label is None for label in labels):
+        return images, None
+    return images, torch.tensor(labels)
+
+
+def quantize_dynamic_fc(model: nn.Module) -> nn.Module:
+    """Dynamic INT8 quantization of the classifier head only."""
+    return quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model: nn.Module, calibration_images: torch.Tensor, batch_size: int = 32) -> nn.Module:
+    """Static post-training INT8 quantization of the conv stack, dynamic INT8 for ``fc``.
+
+    FX graph mode fuses Conv+BN+ReLU and the residual Add+ReLU itself, so ``model``
+    should be the plain (unfused) float ResNet.
+    """
+    engine = torch.backends.quantized.engine
+    qconfig_mapping = get_default_qconfig_mapping(engine).set_module_name("fc", default_dynamic_qconfig)
+    example = calibration_images[:1]
+    prepared = prepare_fx(copy.deepcopy(model).eval(), qconfig_mapping, example_inputs=(example,))
+
+    with torch.no_grad():
+        for start in range(0, len(calibration_images), batch_size):
+            prepared(calibration_images[start:start + batch_size])
+
+    return convert_fx(prepared)
+
+
+@torch.no_grad()
+def _per_image_latency_ms(model: nn.Module, images: torch.Tensor, samples: int = 32) -> float:
+    images = images[:samples]
+    model(images[:1])
+    start = time.perf_counter()
+    for i in range(len(images)):
+        model(images[i:i + 1])
+    return (time.perf_counter() - start) / len(images) * 1000.0
+
+
+@torch.no_grad()
+def _predictions(model: nn.Module, images: torch.Tensor, batch_size: int = 32) -> torch.Tensor:
+    return torch.cat(
+        [model(images[start:start + batch_size]).argmax(dim=1) for start in range(0, len(images), batch_size)]
+    )
+
+
+def evaluate_quantization(
+    float_model: nn.Module,
+    quantized_model: nn.Module,
+    images: torch.Tensor,
+    labels: torch.Tensor | None = None,
+) -> dict:
+    """Compare a quantized model with its float original on the same images."""
+    float_pred = _predictions(float_model, images)
+    quant_pred = _predictions(quantized_model, images)
+    float_ms = _per_image_latency_ms(float_model, images)
+    quant_ms = _per_image_latency_ms(quantized_model, images)
+
+    report = {
+        "images": len(images),
+        "top1_agreement": (float_pred == quant_pred).float().mean().item(),
+        "float_latency_ms": float_ms,
+        "quantized_latency_ms": quant_ms,
+        "speedup": float_ms / quant_ms if quant_ms else None,
+        "float_accuracy": None,
+        "quantized_accuracy": None,
+        "accuracy_delta": None,
+    }
+    if labels is not None:
+        float_acc = (float_pred == labels).float().mean().item()
+        quant_acc = (quant_pred == labels).float().mean().item()
+        report.update(float_accuracy=float_acc, quantized_accuracy=quant_acc, accuracy_delta=quant_acc - float_acc)
+    return report
+
+
+def build_quantized_model(
+    model: nn.Module,
+    mode: str,
+    preprocess: ImagePreprocessor,
+    classes: List[str],
+    calibration_dir: str | None = None,
+    calibration_limit: int = 256,
+) -> Tuple[nn.Module, dict]:
+    """Quantize an eval-mode float ResNet on CPU and return it with its evaluation report."""
+    if mode not in QUANTIZATION_MODES or mode == "none":
+        raise ValueError(f"Unknown quantization mode {mode!r}; expected 'dynamic' or 'static'")
+
+    images, labels = None, None
+    if calibration_dir:
+        images, labels = load_calibration_images(Path(calibration_dir), preprocess, classes, calibration_limit)
+    elif mode == "static":
+        raise RuntimeError("Static quantization needs a calibration image folder")
+
+    if mode == "dynamic":
+        quantized = quantize_dynamic_fc(model)
+    else:
+        quantized = quantize_static(model, images)
+
+    report = {"mode": mode, "engine": torch.backends.quantized.engine}
+    if images is not None:
+        report.update(evaluate_quantization(model, quantized, images, labels))
+        _LOGGER.info(
+            "INT8 %s quantization: %.2f -> %.2f ms/image, top-1 agreement %.3f, accuracy delta %s",
+            mode,
+            report["float_latency_ms"],
+            report["quantized_latency_ms"],
+            report["top1_agreement"],
+            report["accuracy_delta"],
+        )
+    return quantized, report
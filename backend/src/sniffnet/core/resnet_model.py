@@ -49,30 +49,34 @@ class Block(nn.Module):
 
 
 class ResNet(nn.Module):
-    """Minimal ResNet implementation tailored for 224x224 inputs."""
+    """Minimal ResNet implementation tailored for 224x224 inputs.
 
-    def __init__(self, blocks_num_list: list[int], num_classes: int = 2) -> None:
+    ``width`` is the channel count of the stem and first stage (doubled in every later
+    stage); the standard 64 can be reduced for cheaper variants.
+    """
+
+    def __init__(self, blocks_num_list: list[int], num_classes: int = 2, width: int = 64) -> None:
         super().__init__()
-        self.in_channels = 64
+        self.in_channels = width
 
         self.conv1 = nn.Conv2d(
             in_channels=3,
-            out_channels=64,
+            out_channels=width,
             kernel_size=7,
             stride=2,
             padding=3,
         )
-        self.batch_norm = nn.BatchNorm2d(64)
+        self.batch_norm = nn.BatchNorm2d(width)
         self.relu = nn.ReLU()
         self.pooling = nn.MaxPool2d(kernel_size=3, stride=2, padding=1)
 
-        self.layer1 = self.create_layer(out_channels=64, num_blocks=blocks_num_list[0])
-        self.layer2 = self.create_layer(out_channels=128, num_blocks=blocks_num_list[1], stride=2)
-        self.layer3 = self.create_layer(out_channels=256, num_blocks=blocks_num_list[2], stride=2)
-        self.layer4 = self.create_layer(out_channels=512, num_blocks=blocks_num_list[3], stride=2)
+        self.layer1 = self.create_layer(out_channels=width, num_blocks=blocks_num_list[0])
+        self.layer2 = self.create_layer(out_channels=width * 2, num_blocks=blocks_num_list[1], stride=2)
+        self.layer3 = self.create_layer(out_channels=width * 4, num_blocks=blocks_num_list[2], stride=2)
+        self.layer4 = self.create_layer(out_channels=width * 8, num_blocks=blocks_num_list[3], stride=2)
 
         self.avgpool = nn.AdaptiveAvgPool2d((1, 1))
-        self.fc = nn.Linear(512, num_classes)
+        self.fc = nn.Linear(width * 8, num_classes)
 
     def create_layer(self, out_channels: int, num_blocks: int, stride: int = 1) -> nn.Sequential:
         downsampling = None
@@ -103,7 +107,8 @@ class ResNet(nn.Module):
 
         return nn.Sequential(*blocks)
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
+    def forward_features(self, x: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        """Logits and the pooled ``width * 8`` features the classifier head sees."""
         out = self.batch_norm(self.conv1(x))
         out = self.relu(out)
         out = self.pooling(out)
@@ -114,12 +119,19 @@ class ResNet(nn.Module):
         out = self.layer4(out)
 
         out = self.avgpool(out)
-        out = torch.flatten(out, 1)
-        out = self.fc(out)
+        features = torch.flatten(out, 1)
 
-        return out
+        return self.fc(features), features
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.forward_features(x)[0]
+
+
+def create_resnet18(num_classes: int = 2, width: int = 64) -> ResNet:
+    """Factory for a ResNet-18 style model; ``width < 64`` gives a reduced-width variant."""
+    return ResNet([2, 2, 2, 2], num_classes=num_classes, width=width)
 
 
-def create_resnet18(num_classes: int = 2) -> ResNet:
-    """Factory for a ResNet-18 style model."""
-    return ResNet([2, 2, 2, 2], num_classes=num_classes)
+def resnet_width(state_dict: dict) -> int:
+    """Width of the ResNet a state dict was saved from (64 for the standard ResNet-18)."""
+    return int(state_dict["conv1.weight"].shape[0]) if "conv1.weight" in state_dict else 64
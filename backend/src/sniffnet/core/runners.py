@@ -0,0 +1,91 @@
+"""Backend-neutral helpers for the runners served by ``model_loader``.
+
+A runner is a callable that takes a float32 ``(N, 3, H, W)`` NumPy batch and returns
+float32 logits of shape ``(N, num_classes)``. It also exposes ``backend`` and
+``device`` strings. Keeping the interface in NumPy lets backends that do not need
+torch (onnxruntime) serve without importing it. Runners whose ``supports_features``
+is true also have ``forward_features(batch)``, returning the logits together with the
+pooled ``(N, D)`` features of the same forward pass.
+"""
+import logging
+import os
+import time
+from typing import Callable, Iterable, List
+
+import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    np.exp(shifted, out=shifted)
+    shifted /= shifted.sum(axis=1, keepdims=True)
+    return shifted
+
+
+def format_prediction(probs_row: np.ndarray, classes: List[str]) -> dict:
+    """API response for one row of class probabilities."""
+    probs = probs_row.tolist()
+    pred_idx = int(probs_row.argmax())
+
+    probs_by_class = {classes[i]: float(probs[i]) for i in range(min(len(classes), len(probs)))}
+
+    return {
+        "class": classes[pred_idx] if pred_idx < len(classes) else str(pred_idx),
+        "confidence": float(probs[pred_idx]),
+        "probs": probs_by_class,
+    }
+
+
+def warmup(
+    runner: Callable[[np.ndarray], np.ndarray],
+    batch_sizes: Iterable[int],
+    image_size: int = 224,
+    iterations: int = 2,
+) -> dict:
+    """Run forwards at each batch size so allocator growth and kernel selection happen now.
+
+    Returns the last forward latency in milliseconds per batch size.
+    """
+    rng = np.random.default_rng(0)
+    timings = {}
+    for batch_size in batch_sizes:
+        inputs = rng.standard_normal((batch_size, 3, image_size, image_size), dtype=np.float32)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            runner(inputs)
+            timings[batch_size] = (time.perf_counter() - start) * 1000.0
+        _LOGGER.info("Warmup batch=%d: %.1f ms", batch_size, timings[batch_size])
+    return timings
+
+
+def benchmark(
+    runner: Callable[[np.ndarray], np.ndarray],
+    batch_sizes: Iterable[int],
+    image_size: int = 224,
+    iterations: int = 3,
+) -> dict:
+    """Median forward latency per batch size, for a runner that has already been warmed up."""
+    rng = np.random.default_rng(0)
+    results = {}
+    for batch_size in batch_sizes:
+        inputs = rng.standard_normal((batch_size, 3, image_size, image_size), dtype=np.float32)
+        samples = []
+        for _ in range(max(1, iterations)):
+            start = time.perf_counter()
+            runner(inputs)
+            samples.append((time.perf_counter() - start) * 1000.0)
+        batch_ms = float(np.median(samples))
+        results[str(batch_size)] = {"ms_per_batch": batch_ms, "ms_per_image": batch_ms / batch_size}
+    return results
+
+
+def resident_memory_mb() -> float | None:
+    """Current resident set size of this process (Linux), or None if unavailable."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import torch
+from torch import nn
+
+SERVING_MODES = ("eager", "torchscript", "compile")
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def scripted_cache_path(weights_file: Path, fused: bool) -> Path:
+    """Location of the cached TorchScript module for a checkpoint.
+
+    The name embeds the checkpoint size/mtime, the torch version and the fusion flag,
+    so a new checkpoint or torch upgrade never picks up a stale artifact.
+    """
+    stat = weights_file.stat()
+    key = f"{stat.st_size}:{stat.st_mtime_ns}:{torch.__version__}:{int(fused)}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return weights_file.with_name(f"{weights_file.stem}.{digest}.torchscript.pt")
+
+
+def _script(model: nn.Module, device: torch.device, image_size: int) -> torch.jit.ScriptModule:
+    example = torch.randn(1, 3, image_size, image_size, device=device)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    # Freezing inlines weights as constants, which is what lets the JIT fuse Conv+ReLU/Add
+    return torch.jit.freeze(traced.eval())
+
+
+def _optimize(scripted: torch.jit.ScriptModule) -> torch.jit.ScriptModule:
+    # The oneDNN-specific graph does not serialize, so it is rebuilt after every load
+    return torch.jit.optimize_for_inference(scripted)
+
+
+def _load_or_script(
+    model: nn.Module, device: torch.device, weights_file: Path, fused: bool, image_size: int
+) -> torch.jit.ScriptModule:
+    cache_path = scripted_cache_path(weights_file, fused)
+    if cache_path.exists():
+        try:
+            scripted = torch.jit.load(str(cache_path), map_location=device)
+            _LOGGER.info("Loaded cached TorchScript model from %s", cache_path)
+            return _optimize(scripted)
+        except Exception:
+            _LOGGER.exception("Cached TorchScript model %s is unusable; rebuilding", cache_path)
+
+    scripted = _script(model, device, image_size)
+    tmp_path = cache_path.with_suffix(".tmp")
+    try:
+        torch.jit.save(scripted, str(tmp_path))
+        os.replace(tmp_path, cache_path)
+        _LOGGER.info("Cached TorchScript model at %s", cache_path)
+    except OSError:
+        _LOGGER.warning("Could not cache TorchScript model at %s", cache_path, exc_info=True)
+    return _optimize(scripted)
+
+
+def build_serving_model(
+    model: nn.Module,
+    mode: str,
+    device: torch.device,
+    weights_file: Path,
+    fused: bool = False,
+    image_size: int = 224,
+) -> nn.Module:
+    """Turn an eval-mode model into the module that will actually serve requests."""
+    if mode == "eager":
+        return model
+    if mode == "torchscript":
+        return _load_or_script(model, device, weights_file, fused, image_size)
+    if mode == "compile":
+        # Inductor keeps its own on-disk kernel cache; warmup triggers the compilation
+        return torch.compile(model, dynamic=True)
+    raise ValueError(f"Unknown serving mode {mode!r}; expected one of {SERVING_MODES}")
+
@@ -0,0 +1,169 @@
+"""In-process counters, gauges and histograms rendered in the Prometheus text format.
+
+Stdlib only, so any router can import it. Recording is a dict lookup, a bisect and an
+uncontended lock per observation; rendering happens only when the endpoint is scraped.
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self._samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf)], sum
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+PREDICT_REQUESTS = Counter(
+    "sniffnet_predict_requests_total", "Prediction requests by endpoint and outcome.", ("endpoint", "outcome")
+)
+PREDICT_IN_FLIGHT = Gauge("sniffnet_predict_in_flight", "Prediction requests being handled.", ("endpoint",))
+PREDICT_STAGE_SECONDS = Histogram(
+    "sniffnet_predict_stage_seconds",
+    "Time spent per prediction stage: read, model, decode, transform, cache, batch (queue + forward).",
+    ("stage",),
+)
+FORWARD_SECONDS = Histogram("sniffnet_model_forward_seconds", "Model forward pass time per batch.", ("model",))
+FORWARD_BATCH_SIZE = Histogram(
+    "sniffnet_model_forward_batch_size",
+    "Images per model forward pass.",
+    ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "sniffnet_model_load_seconds", "Duration of the last successful (re)load, warmup included.", ("model",)
+)
+MODEL_LOADS = Counter("sniffnet_model_loads_total", "Model loads and hot swaps by outcome.", ("model", "outcome"))
+ADMISSION_PENDING = Gauge(
+    "sniffnet_admission_pending", "Inference requests admitted and not answered yet.", ("queue",)
+)
+ADMISSION_REJECTED = Counter(
+    "sniffnet_admission_rejected_total",
+    "Inference requests shed before reaching the model, by reason (queue_full, deadline).",
+    ("endpoint", "reason"),
+)
+CASCADE_IMAGES = Counter(
+    "sniffnet_cascade_images_total",
+    "Images through a model cascade: answered by the small model, escalated, or bypassed while it loads.",
+    ("model", "outcome"),
+)
+CASCADE_AUDITS = Counter(
+    "sniffnet_cascade_audits_total",
+    "Confident small-model answers re-checked by the full model, by agreement.",
+    ("model", "result"),
+)
+EMBEDDING_INDEX_ENTRIES = Gauge("sniffnet_embedding_index_entries", "Image embeddings in the nearest-neighbour index.")
+EMBEDDING_SEARCH_SECONDS = Histogram("sniffnet_embedding_search_seconds", "Nearest-neighbour search time.")
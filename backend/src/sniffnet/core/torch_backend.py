@@ -0,0 +1,157 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import torch
+
+from sniffnet.core.checkpoints import (
+    SAFETENSORS_SUFFIX,
+    extract_class_metadata,
+    extract_state_dict,
+    load_checkpoint,
+)
+from sniffnet.core.fusion import check_equivalence, fuse_resnet
+from sniffnet.core.preprocessing import ImagePreprocessor
+from sniffnet.core.quantization import build_quantized_model
+from sniffnet.core.resnet_model import create_resnet18, resnet_width
+from sniffnet.core.serving import build_serving_model
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TorchRunner:
+    """Serve a PyTorch module behind the NumPy runner interface.
+
+    With ``features_module`` (the served model's ``avgpool``), ``forward_features`` also
+    returns that module's output, captured by a forward hook during the same pass.
+    """
+
+    backend = "torch"
+
+    def __init__(
+        self, model: torch.nn.Module, device: torch.device, features_module: torch.nn.Module | None = None
+    ) -> None:
+        self.model = model
+        self._device = device
+        self.supports_features = features_module is not None
+        # Per thread, so concurrent forwards never see each other's features
+        self._captured = threading.local()
+        if features_module is not None:
+            features_module.register_forward_hook(self._capture)
+
+    @property
+    def device(self) -> str:
+        return str(self._device)
+
+    def _capture(self, module: torch.nn.Module, inputs: tuple, output: torch.Tensor) -> None:
+        if getattr(self._captured, "active", False):
+            self._captured.features = output
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        inputs = torch.from_numpy(batch).to(self._device)
+        with torch.no_grad():
+            return self.model(inputs).float().cpu().numpy()
+
+    def forward_features(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.supports_features:
+            raise RuntimeError("this serving mode does not expose pooled features")
+        inputs = torch.from_numpy(batch).to(self._device)
+        self._captured.active = True
+        try:
+            with torch.no_grad():
+                logits = self.model(inputs)
+            features = self._captured.features
+        finally:
+            self._captured.active = False
+            self._captured.features = None
+        if features.is_quantized:
+            features = features.dequantize()
+        return logits.float().cpu().numpy(), torch.flatten(features, 1).float().cpu().numpy()
+
+
+def _fuse_if_equivalent(model: torch.nn.Module) -> torch.nn.Module:
+    """Return the Conv+BN folded model, or ``model`` itself if the folded one diverges."""
+    try:
+        fused = fuse_resnet(model)
+        diff = check_equivalence(model, fused)
+    except Exception:
+        _LOGGER.exception("Conv+BN fusion failed; serving the unfused model")
+        return model
+    _LOGGER.info("Serving Conv+BN fused model (max abs logit diff %.2e)", diff)
+    return fused
+
+
+def load_torch_runner(
+    weights_file: Path,
+    device: str,
+    fuse: bool = True,
+    serving_mode: str = "eager",
+    quantization: str = "none",
+    calibration_dir: str | None = None,
+    num_threads: int | None = None,
+    mmap_weights: bool = False,
+) -> Tuple[TorchRunner, list, dict, dict]:
+    """Load a checkpoint into the ResNet and build the module that will serve it.
+
+    Returns ``(runner, classes, class_to_idx, info)``; ``info`` describes how the model
+    was built (checkpoint format, fusion, serving mode, quantization report).
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    torch_device = torch.device(device)
+    checkpoint = load_checkpoint(weights_file, map_location=torch_device, mmap=mmap_weights)
+    mapped = torch_device.type == "cpu" and (Path(weights_file).suffix == SAFETENSORS_SUFFIX or mmap_weights)
+
+    state_dict, checkpoint_format = extract_state_dict(checkpoint)
+    _LOGGER.info("Checkpoint format detected: %s", checkpoint_format)
+    classes, class_to_idx = extract_class_metadata(checkpoint)
+
+    model = create_resnet18(num_classes=len(classes), width=resnet_width(state_dict))
+    try:
+        # assign=True keeps the memory-mapped checkpoint tensors instead of copying them
+        model.load_state_dict(state_dict, strict=True, assign=True)
+    except Exception as exc:
+        raise RuntimeError(f"load_state_dict failed with strict=True: {exc}") from exc
+    model.to(torch_device)
+    model.eval()
+
+    info = {
+        "checkpoint_format": checkpoint_format,
+        "parameters": sum(parameter.numel() for parameter in model.parameters()),
+        "fused": False,
+        "serving_mode": serving_mode,
+        "quantization": quantization,
+        "quantization_report": None,
+        "weights_mapped": False,
+    }
+    if mapped and fuse and quantization == "none":
+        # Folding BN writes new conv weights: every worker would hold a private copy
+        _LOGGER.info("Serving memory-mapped weights unfused so they stay shared in the page cache")
+        fuse = False
+    if quantization != "none":
+        if torch_device.type != "cpu":
+            raise RuntimeError(f"INT8 quantization is CPU-only, got device {device}")
+        # Quantized graphs do their own Conv+BN+ReLU fusion and run eagerly
+        model, info["quantization_report"] = build_quantized_model(
+            model, quantization, ImagePreprocessor(), classes, calibration_dir
+        )
+        info["serving_mode"] = "eager"
+    else:
+        if fuse:
+            served = _fuse_if_equivalent(model)
+            info["fused"] = served is not model
+            model = served
+        model = build_serving_model(model, serving_mode, torch_device, weights_file, fused=info["fused"])
+
+    # Freezing (TorchScript) and quantization copy every weight out of the mapping
+    info["weights_mapped"] = mapped and info["serving_mode"] != "torchscript" and quantization == "none"
+    if mapped and not info["weights_mapped"]:
+        _LOGGER.warning("%s serving copies the memory-mapped weights; only loading is faster", info["serving_mode"])
+
+    info["threads"] = {"intra_op": torch.get_num_threads(), "inter_op": torch.get_num_interop_threads()}
+    # Traced and compiled graphs have no submodule to hook; eager ones (quantized included) do
+    features_module = getattr(model, "avgpool", None) if info["serving_mode"] == "eager" else None
+    return TorchRunner(model, torch_device, features_module), classes, class_to_idx, info
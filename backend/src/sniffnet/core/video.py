@@ -0,0 +1,133 @@
+"""Classify sampled video frames in batches and summarize them as a per-segment timeline.
+
+Decoding uses PyAV (the ``video`` extra), imported only when a video is read.
+"""
+import logging
+import math
+from typing import BinaryIO, Iterator, List, Tuple
+
+import numpy as np
+
+from sniffnet.core.model_loader import DEFAULT_KEY, get_model_blocking, predict_batch
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def iter_video_frames(source: str | BinaryIO, sample_fps: float, size: int) -> Iterator[Tuple[float, np.ndarray]]:
+    """Yield ``(timestamp_s, pixels)`` for about ``sample_fps`` frames per second of video.
+
+    Every frame has to be decoded, but only sampled ones are converted: FFmpeg scales
+    them straight to ``size x size`` RGB, so full-resolution frames never reach NumPy.
+    Raises ValueError for data FFmpeg cannot decode.
+    """
+    import av
+
+    if sample_fps <= 0:
+        raise ValueError("sample_fps must be > 0")
+    interval = 1.0 / sample_fps
+
+    try:
+        container = av.open(source, mode="r")
+    except av.error.FFmpegError as exc:
+        raise ValueError(f"Invalid video file: {exc}") from exc
+
+    with container:
+        if not container.streams.video:
+            raise ValueError("Invalid video file: no video stream")
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        rate = float(stream.average_rate or 25)
+
+        next_sample = 0.0
+        try:
+            for index, frame in enumerate(container.decode(stream)):
+                timestamp = frame.time if frame.time is not None else index / rate
+                if timestamp + 1e-6 < next_sample:
+                    continue
+                next_sample = (math.floor(timestamp / interval + 1e-6) + 1) * interval
+                pixels = frame.to_ndarray(width=size, height=size, format="rgb24", interpolation="BILINEAR")
+                yield timestamp, pixels
+        except av.error.FFmpegError as exc:
+            raise ValueError(f"Invalid video file: {exc}") from exc
+
+
+def build_timeline(times: np.ndarray, probs: np.ndarray, classes: List[str], segment_s: float) -> dict:
+    """Average frame probabilities per ``segment_s`` window, then merge runs of equal class."""
+    if not len(times):
+        return {"segments": [], "timeline": [], "summary": {}}
+
+    segment_ids, inverse, counts = np.unique(
+        (times // segment_s).astype(np.int64), return_inverse=True, return_counts=True
+    )
+    sums = np.zeros((len(segment_ids), probs.shape[1]), dtype=np.float64)
+    np.add.at(sums, inverse, probs)
+    means = sums / counts[:, None]
+    labels = means.argmax(axis=1)
+
+    def name(idx: int) -> str:
+        return classes[idx] if idx < len(classes) else str(idx)
+
+    segments = [
+        {
+            "start_s": float(segment * segment_s),
+            "end_s": float((segment + 1) * segment_s),
+            "class": name(int(label)),
+            "confidence": float(row[label]),
+            "frames": int(count),
+        }
+        for segment, label, row, count in zip(segment_ids, labels, means, counts)
+    ]
+
+    timeline = []
+    for segment in segments:
+        last = timeline[-1] if timeline else None
+        if last is not None and last["class"] == segment["class"] and last["end_s"] == segment["start_s"]:
+            # Frame-weighted mean confidence of the merged run
+            total = last["frames"] + segment["frames"]
+            weighted = last["confidence"] * last["frames"] + segment["confidence"] * segment["frames"]
+            last["confidence"] = weighted / total
+            last.update(end_s=segment["end_s"], frames=total, segments=last["segments"] + 1)
+        else:
+            timeline.append({**segment, "segments": 1})
+
+    frame_labels = probs.argmax(axis=1)
+    summary = {name(idx): float((frame_labels == idx).mean()) for idx in range(probs.shape[1])}
+    return {"segments": segments, "timeline": timeline, "summary": summary}
+
+
+def classify_video(
+    source: str | BinaryIO,
+    sample_fps: float = 2.0,
+    segment_s: float = 1.0,
+    batch_size: int = 32,
+    key: str = DEFAULT_KEY,
+) -> dict:
+    """Classify sampled frames of a video with the model held by ``model_loader``.
+
+    Frames are normalized into one preallocated batch and classified ``batch_size`` at a time.
+    """
+    if segment_s <= 0:
+        raise ValueError("segment_s must be > 0")
+    _, transform, classes = get_model_blocking(key=key)
+    batch = np.empty((batch_size, 3, transform.size, transform.size), dtype=np.float32)
+
+    times, rows = [], []
+    filled = 0
+    for timestamp, pixels in iter_video_frames(source, sample_fps, transform.size):
+        transform.normalize(pixels, out=batch[filled])
+        times.append(timestamp)
+        filled += 1
+        if filled == batch_size:
+            rows.extend(predict_batch(batch, key=key))
+            filled = 0
+    if filled:
+        rows.extend(predict_batch(batch[:filled], key=key))
+    _LOGGER.info("Classified %d sampled video frames", len(times))
+
+    probs = np.stack(rows) if rows else np.empty((0, len(classes)), dtype=np.float32)
+    return {
+        "sample_fps": sample_fps,
+        "segment_s": segment_s,
+        "frames": len(times),
+        **build_timeline(np.asarray(times, dtype=np.float64), probs, classes, segment_s),
+    }
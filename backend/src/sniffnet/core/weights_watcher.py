@@ -0,0 +1,77 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WeightsWatcher:
+    """Poll a checkpoint file and call ``on_change`` once a new version has been fully written.
+
+    A change is only reported after the file's size and mtime have stayed the same for
+    one extra poll, so a checkpoint that is still being copied is never loaded half-written.
+    ``on_change`` returns whether it acted on the new version; until it does (e.g. while
+    an earlier reload is still running), every poll calls it again.
+    Polling keeps this dependency-free and works on network and container volumes.
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[], bool], interval_s: float = 2.0) -> None:
+        self.path = Path(path).expanduser()
+        self.on_change = on_change
+        self.interval_s = interval_s
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._seen = self._signature()
+        self._pending = None
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def poll(self) -> bool:
+        """Check the file once; returns True if ``on_change`` took the new version."""
+        signature = self._signature()
+        if signature is None or signature == self._seen:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Changed since the last poll: wait for it to settle
+            self._pending = signature
+            return False
+
+        _LOGGER.info("Detected new weights at %s", self.path)
+        try:
+            taken = self.on_change()
+        except Exception:
+            _LOGGER.exception("Reloading %s failed", self.path)
+            taken = False
+        if not taken:
+            # Stays pending, so the next poll tries again
+            _LOGGER.info("Could not reload %s yet; retrying on the next poll", self.path)
+            return False
+        self._seen = signature
+        self._pending = None
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.poll()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="weights-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_s + 1)
+            self._thread = None
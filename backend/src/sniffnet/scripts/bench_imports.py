@@ -0,0 +1,51 @@
+"""Benchmark: import time, peak RSS and heavy modules loaded by ``sniffnet.api.main`` per API_ROLE.
+
+Usage: python -m sniffnet.scripts.bench_imports [--roles all crud inference] [--runs 5]
+Each measurement runs in a fresh interpreter so nothing is already imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "torchvision", "onnxruntime", "numpy", "PIL", "alembic")
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import sniffnet.api.main
+seconds = time.perf_counter() - start
+print(json.dumps({
+    "seconds": seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure(role: str) -> dict:
+    env = {**os.environ, "API_ROLE": role}
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE % (HEAVY_MODULES,)], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--roles", nargs="+", default=["all", "crud", "inference"])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for role in args.roles:
+        samples = [measure(role) for _ in range(args.runs)]
+        seconds = statistics.median(sample["seconds"] for sample in samples)
+        rss = statistics.median(sample["max_rss_mb"] for sample in samples)
+        loaded = ", ".join(samples[-1]["loaded"]) or "-"
+        print(f"{role:10s} import {seconds * 1000:7.1f} ms  peak RSS {rss:6.1f} MB  heavy modules: {loaded}")
+
+
+if __name__ == "__main__":
+    main()
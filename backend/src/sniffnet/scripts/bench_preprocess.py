@@ -0,0 +1,81 @@
+"""Micro-benchmark: fast preprocessing path vs the torchvision ``transforms.Compose`` pipeline.
+
+Usage: python -m sniffnet.scripts.bench_preprocess [--image photo.jpg] [--iterations 20]
+Without ``--image`` a synthetic 4000x3000 (12 MP) JPEG is generated.
+"""
+import argparse
+import time
+from io import BytesIO
+
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+
+from sniffnet.core.preprocessing import IMAGE_MEAN, IMAGE_SIZE, IMAGE_STD, ImagePreprocessor, decode_image
+
+
+def synthetic_jpeg(width: int = 4000, height: int = 3000) -> bytes:
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels += rng.normal(0, 8, pixels.shape).astype(np.float32)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def reference_pipeline():
+    return transforms.Compose(
+        [
+            transforms.Resize((IMAGE_SIZE, IMAGE_SIZE)),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=list(IMAGE_MEAN), std=list(IMAGE_STD)),
+        ]
+    )
+
+
+def time_per_image(fn, iterations: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image", help="image file to benchmark with")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as fh:
+            data = fh.read()
+    else:
+        data = synthetic_jpeg()
+
+    reference = reference_pipeline()
+    fast = ImagePreprocessor()
+    out = np.empty((3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32)
+
+    def run_reference():
+        return reference(Image.open(BytesIO(data)).convert("RGB"))
+
+    def run_fast():
+        return fast(decode_image(data), out=out)
+
+    ref_ms = time_per_image(run_reference, args.iterations)
+    fast_ms = time_per_image(run_fast, args.iterations)
+    diff = (run_reference() - torch.from_numpy(run_fast())).abs()
+
+    print(f"input:     {Image.open(BytesIO(data)).size} {len(data) / 1e6:.1f} MB")
+    print(f"reference: {ref_ms:8.2f} ms/image")
+    print(f"fast:      {fast_ms:8.2f} ms/image  ({ref_ms / fast_ms:.1f}x)")
+    print(f"abs diff:  max {diff.max().item():.4f}, mean {diff.mean().item():.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Classify a video file into a per-segment Fresh/Bad timeline.
+
+Usage: python -m sniffnet.scripts.classify_video clip.mp4 [--sample-fps 2] [--segment-s 1] [--json]
+Frames are decoded and classified in batches in-process, with the same model settings
+as the API (MODEL_WEIGHTS_PATH, MODEL_BACKEND, ...). Needs the ``video`` extra (PyAV).
+"""
+import argparse
+import json
+
+from sniffnet.api.config import (
+    MODEL_DEVICE,
+    MODEL_LOAD_OPTIONS,
+    MODEL_WEIGHTS_PATH,
+    PREDICT_VIDEO_SAMPLE_FPS,
+    PREDICT_VIDEO_SEGMENT_S,
+)
+from sniffnet.core import model_loader
+from sniffnet.core.video import classify_video
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video", help="video file (any container/codec FFmpeg reads)")
+    parser.add_argument("--weights", default=str(MODEL_WEIGHTS_PATH), help="checkpoint to classify with")
+    parser.add_argument("--device", default=MODEL_DEVICE)
+    parser.add_argument("--sample-fps", type=float, default=PREDICT_VIDEO_SAMPLE_FPS, help="frames per second")
+    parser.add_argument("--segment-s", type=float, default=PREDICT_VIDEO_SEGMENT_S, help="timeline resolution")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args()
+
+    model_loader.start_load(args.weights, args.device, **MODEL_LOAD_OPTIONS)
+    model_loader.get_model_blocking()
+    result = classify_video(args.video, args.sample_fps, args.segment_s, args.batch_size)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    for run in result["timeline"]:
+        print(f"{run['start_s']:8.1f}s - {run['end_s']:8.1f}s  {run['class']:8s}  confidence {run['confidence']:.2f}")
+    summary = ", ".join(f"{name} {share:.0%}" for name, share in result["summary"].items())
+    print(f"{result['frames']} frames sampled: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Convert ``.pth`` checkpoints to memory-mappable ``.safetensors`` files.
+
+Usage: python -m sniffnet.scripts.convert_checkpoint model.pth [other.pth ...] [-o out.safetensors]
+``classes`` and ``class_to_idx`` are kept as safetensors metadata. Served safetensors
+files are memory-mapped: deploy a new version by renaming it over MODEL_WEIGHTS_PATH.
+"""
+import argparse
+import time
+
+import torch
+
+from sniffnet.core.checkpoints import convert_to_safetensors, extract_state_dict, load_checkpoint
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("weights", nargs="+", help="checkpoint(s) (.pth)")
+    parser.add_argument("-o", "--output", help="output file (only with a single input)")
+    args = parser.parse_args()
+    if args.output and len(args.weights) > 1:
+        parser.error("--output needs exactly one input checkpoint")
+
+    for weights in args.weights:
+        output = convert_to_safetensors(weights, args.output)
+
+        # Check the converted weights round-trip exactly and compare load times
+        start = time.perf_counter()
+        original, _ = extract_state_dict(torch.load(weights, map_location="cpu"))
+        pth_s = time.perf_counter() - start
+        start = time.perf_counter()
+        converted, _ = extract_state_dict(load_checkpoint(output))
+        mapped_s = time.perf_counter() - start
+        if original.keys() != converted.keys() or not all(torch.equal(original[k], converted[k]) for k in original):
+            raise SystemExit(f"{output}: converted weights differ from {weights}")
+
+        print(f"{weights} -> {output}  (load {pth_s * 1000:.1f} ms -> {mapped_s * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
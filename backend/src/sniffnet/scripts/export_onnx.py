@@ -0,0 +1,25 @@
+"""Export a checkpoint to ONNX for the onnxruntime serving backend.
+
+Usage: python -m sniffnet.scripts.export_onnx model.pth [model.onnx]
+"""
+import argparse
+from pathlib import Path
+
+from sniffnet.core.onnx_backend import onnx_cache_path
+from sniffnet.core.onnx_export import export_onnx
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("weights", help="checkpoint (.pth)")
+    parser.add_argument("output", nargs="?", help="output file (default: where the server looks for it)")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    weights = Path(args.weights)
+    output = Path(args.output) if args.output else onnx_cache_path(weights)
+    print(export_onnx(weights, output, opset=args.opset))
+
+
+if __name__ == "__main__":
+    main()
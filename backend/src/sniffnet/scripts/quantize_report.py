@@ -0,0 +1,38 @@
+"""Report accuracy and latency of INT8 quantization for a checkpoint before deploying it.
+
+Usage: python -m sniffnet.scripts.quantize_report model.pth images/ [--mode static]
+``images/`` may use the ``<class>/<image>`` layout to get an accuracy delta.
+"""
+import argparse
+import json
+
+from sniffnet.core.checkpoints import extract_class_metadata, extract_state_dict, load_checkpoint
+from sniffnet.core.preprocessing import ImagePreprocessor
+from sniffnet.core.quantization import build_quantized_model
+from sniffnet.core.resnet_model import create_resnet18, resnet_width
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("weights", help="checkpoint (.pth)")
+    parser.add_argument("calibration_dir", help="folder of calibration/evaluation images")
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="static")
+    parser.add_argument("--limit", type=int, default=256, help="max images to use")
+    args = parser.parse_args()
+
+    checkpoint = load_checkpoint(args.weights)
+    state_dict, _ = extract_state_dict(checkpoint)
+    classes, _ = extract_class_metadata(checkpoint)
+
+    model = create_resnet18(num_classes=len(classes), width=resnet_width(state_dict))
+    model.load_state_dict(state_dict, strict=True)
+    model.eval()
+
+    _, report = build_quantized_model(
+        model, args.mode, ImagePreprocessor(), classes, args.calibration_dir, args.limit
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
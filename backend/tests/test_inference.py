@@ -0,0 +1,1183 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import zipfile
+from contextlib import contextmanager
+from io import BytesIO
+
+import httpx
+import numpy as np
+import pytest
+import torch
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from sniffnet.api.inference_deps import (
+    get_admission_controller,
+    get_bulk_jobs,
+    get_embedding_index,
+    get_predict_batcher,
+)
+from sniffnet.api.main import app
+from sniffnet.api.routes import predict as predict_routes
+from sniffnet.api.startup import StartupChecks
+from sniffnet.core import model_loader, telemetry
+from sniffnet.core.admission import AdmissionController
+from sniffnet.core.batching import DeadlineExceeded, MicroBatcher
+from sniffnet.core.bulk_jobs import BulkJobs
+from sniffnet.core.checkpoints import convert_to_safetensors, load_checkpoint
+from sniffnet.core.embedding_index import EmbeddingIndex
+from sniffnet.core.executor import InferenceExecutor
+from sniffnet.core.fusion import check_equivalence, fuse_resnet
+from sniffnet.core.image_sources import iter_archive_images
+from sniffnet.core.onnx_backend import load_onnx_runner
+from sniffnet.core.onnx_export import export_onnx
+from sniffnet.core.perceptual_cache import PerceptualIndex, dhash
+from sniffnet.core.prediction_cache import PredictionCache, cache_key
+from sniffnet.core.preprocessing import ImagePreprocessor, decode_image
+from sniffnet.core.quantization import build_quantized_model
+from sniffnet.core.resnet_model import create_resnet18, resnet_width
+from sniffnet.core.runners import warmup
+from sniffnet.core.serving import build_serving_model, scripted_cache_path
+from sniffnet.core.torch_backend import TorchRunner, load_torch_runner
+from sniffnet.core.video import build_timeline
+from sniffnet.core.weights_watcher import WeightsWatcher
+
+
+@pytest.fixture(scope="module")
+def loaded_model(tmp_path_factory):
+    # Random weights are enough: the tests only check plumbing, not accuracy
+    torch.manual_seed(0)
+    weights_path = tmp_path_factory.mktemp("weights") / "model.pth"
+    model = create_resnet18(num_classes=2)
+    torch.save({"model_state": model.state_dict(), "classes": ["Fresh", "Bad"]}, weights_path)
+
+    model_loader.start_load(str(weights_path), "cpu")
+    return model_loader.get_model_blocking(timeout=60)
+
+
+def make_jpeg(size=(320, 240), color=(200, 40, 40)) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class _ConcurrencyProbe:
+    """A slow callable recording the most calls that ever ran at once."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._running = 0
+        self.peak = 0
+
+    def __call__(self, *args):
+        with self._lock:
+            self._running += 1
+            self.peak = max(self.peak, self._running)
+        time.sleep(0.05)
+        with self._lock:
+            self._running -= 1
+
+
+def _call_from_threads(fn, count):
+    threads = [threading.Thread(target=fn) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_inference_executor_runs_at_most_max_workers_calls():
+    executor = InferenceExecutor(max_workers=2)
+
+    async def run_all():
+        release = threading.Event()
+        tasks = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(5)]
+        await asyncio.sleep(0.1)
+        stats = executor.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return stats
+
+    probe = _ConcurrencyProbe()
+    try:
+        assert asyncio.run(run_all()) == {"max_workers": 2, "active": 2, "pending": 3}
+        _call_from_threads(lambda: asyncio.run(executor.run(probe)), 6)
+        assert probe.peak == 2 and executor.stats()["active"] == 0
+    finally:
+        executor.shutdown()
+    with pytest.raises(ValueError):
+        InferenceExecutor(max_workers=0)
+
+
+def test_forward_passes_are_capped_across_callers(loaded_model):
+    entry = model_loader._ENTRIES[model_loader.DEFAULT_KEY]
+    runner = entry.runner
+    probe = _ConcurrencyProbe()
+    batch = np.zeros((1, 3, 224, 224), dtype=np.float32)
+
+    def probed_runner(inputs):
+        probe()
+        return runner(inputs)
+
+    try:
+        model_loader.configure_forwards(1)
+        entry.runner = probed_runner
+        _call_from_threads(lambda: model_loader.predict_batch(batch), 4)
+        assert probe.peak == 1
+    finally:
+        entry.runner = runner
+        model_loader.configure_forwards(2)
+    with pytest.raises(ValueError):
+        model_loader.configure_forwards(0)
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    release = threading.Event()
+    seen_sizes = []
+
+    def run_batch(items):
+        release.wait(timeout=5)
+        seen_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(6)]
+    release.set()
+
+    assert [f.result(timeout=5) for f in futures] == [i * 2 for i in range(6)]
+    assert sum(seen_sizes) == 6
+    assert max(seen_sizes) <= 4
+
+    stats = batcher.stats()
+    assert stats["requests"] == 6
+    assert stats["largest_batch_size"] == max(seen_sizes)
+
+
+def test_micro_batcher_propagates_errors():
+    def run_batch(items):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.submit(1).result(timeout=5)
+
+
+def test_micro_batcher_drops_expired_items():
+    seen = []
+    batcher = MicroBatcher(lambda items: seen.extend(items) or items, max_batch_size=4, max_wait_ms=1)
+
+    expired = batcher.submit("stale", deadline=time.monotonic() - 1)
+    fresh = batcher.submit("fresh", deadline=time.monotonic() + 5)
+    with pytest.raises(DeadlineExceeded):
+        expired.result(timeout=5)
+    assert fresh.result(timeout=5) == "fresh"
+    assert seen == ["fresh"]
+    assert batcher.stats()["expired"] == 1
+
+    # The worker has sat idle in _collect: an item expiring since then is still dropped
+    batcher.submit("warm", deadline=time.monotonic() + 5).result(timeout=5)
+    time.sleep(0.2)
+    late = batcher.submit("late", deadline=time.monotonic() - 0.1)
+    with pytest.raises(DeadlineExceeded):
+        late.result(timeout=5)
+
+
+def test_admission_control_sheds_load_with_retry_after(loaded_model):
+    admission = AdmissionController(max_pending=1, deadline_s=0.001)
+    app.dependency_overrides[get_admission_controller] = lambda: admission
+    client = TestClient(app)
+    # A colour no other test uploads, so the prediction cache cannot answer it
+    upload = {"file": ("x.jpg", make_jpeg(color=(10, 200, 90)), "image/jpeg")}
+    try:
+        # A request already holds the only slot: the next one is rejected at once
+        with admission.admit("predict"):
+            resp = client.post("/api/predict", files=upload)
+        assert resp.status_code == 429
+        assert int(resp.headers["Retry-After"]) >= 1
+
+        # Admitted, but the deadline passes before the forward pass
+        resp = client.post("/api/predict", files=upload)
+        assert resp.status_code == 503
+        assert "Retry-After" in resp.headers
+    finally:
+        app.dependency_overrides.pop(get_admission_controller, None)
+
+    stats = admission.stats()
+    assert (stats["pending"], stats["rejected"], stats["expired"]) == (0, 1, 1)
+    metrics = client.get("/api/metrics").text
+    assert 'sniffnet_admission_rejected_total{endpoint="predict",reason="queue_full"}' in metrics
+    assert 'sniffnet_predict_requests_total{endpoint="predict",outcome="rejected"}' in metrics
+
+
+def test_predict_endpoint_returns_probs(loaded_model):
+    client = TestClient(app)
+    resp = client.post("/api/predict", files={"file": ("x.jpg", make_jpeg(), "image/jpeg")})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["class"] in ("Fresh", "Bad")
+    assert set(body["probs"]) == {"Fresh", "Bad"}
+    assert sum(body["probs"].values()) == pytest.approx(1.0, abs=1e-4)
+
+    stats = client.get("/api/predict/batching").json()
+    assert stats["requests"] >= 1
+
+
+def test_raw_pixel_input_matches_encoded_upload(loaded_model):
+    pixels = np.random.default_rng(3).integers(0, 256, (224, 224, 3), dtype=np.uint8)
+    png = BytesIO()
+    Image.fromarray(pixels).save(png, format="PNG")
+    npy = BytesIO()
+    np.save(npy, pixels[None])
+
+    client = TestClient(app)
+    expected = client.post("/api/predict", files={"file": ("x.png", png.getvalue(), "image/png")}).json()
+    raw = client.post("/api/predict/raw", content=pixels.tobytes(), params={"shape": "224,224,3"})
+    packed = client.post("/api/predict/raw", content=npy.getvalue())
+    for resp in (raw, packed):
+        assert resp.status_code == 200
+        assert resp.json()["probs"] == pytest.approx(expected["probs"], abs=1e-5)
+
+    for params, content in (({"shape": "112,112,3"}, pixels[:112, :112].tobytes()), ({}, pixels.tobytes())):
+        resp = client.post("/api/predict/raw", content=content, params=params)
+        assert resp.status_code == 400
+
+
+def test_raw_pixel_size_is_checked_against_the_requested_model(loaded_model, monkeypatch):
+    runner, _, classes = loaded_model
+
+    async def small_model(timeout=30, key=model_loader.DEFAULT_KEY):
+        return runner, ImagePreprocessor(112), classes
+
+    monkeypatch.setattr(predict_routes, "_get_model_or_raise", small_model)
+    pixels = np.random.default_rng(4).integers(0, 256, (224, 224, 3), dtype=np.uint8)
+    client = TestClient(app)
+    small = client.post("/api/predict/raw", content=pixels[:112, :112].tobytes(), params={"shape": "112,112,3"})
+    assert small.status_code == 200
+    resp = client.post("/api/predict/raw", content=pixels.tobytes(), params={"shape": "224,224,3"})
+    assert (resp.status_code, resp.json()["detail"]) == (400, "Invalid pixels: expected 112x112 pixels, got 224x224")
+
+
+def test_repeated_upload_is_served_from_prediction_cache(loaded_model):
+    client = TestClient(app)
+    image = make_jpeg(color=(30, 60, 90))
+    before = client.get("/api/predict/cache").json()
+    first = client.post("/api/predict", files={"file": ("a.jpg", image, "image/jpeg")}).json()
+    second = client.post("/api/predict", files={"file": ("b.jpg", image, "image/jpeg")}).json()
+    after = client.get("/api/predict/cache").json()
+
+    assert second == first
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_prediction_cache_lru_ttl_and_disk_tier(tmp_path):
+    cache = PredictionCache(max_entries=2, ttl_s=60, disk_dir=tmp_path)
+    keys = [cache_key(bytes([i]), "model-a") for i in range(3)]
+    assert cache_key(b"\0", "model-a") != cache_key(b"\0", "model-b")
+    for i, key in enumerate(keys):
+        cache.put(key, {"class": str(i)})
+    assert cache.stats()["evictions"] == 1
+
+    # Evicted from memory but still on disk, e.g. written by another worker
+    assert cache.get(keys[0]) == {"class": "0"}
+    assert cache.stats()["disk_hits"] == 1
+
+    expired = PredictionCache(max_entries=2, ttl_s=-1)
+    expired.put(keys[0], {"class": "0"})
+    assert expired.get(keys[0]) is None
+
+    # A put sweeps expired files out of the shared directory, live ones stay
+    def files():
+        return sorted(path.name for path in tmp_path.glob("*/*"))
+
+    assert len(files()) == 3
+    short_lived = PredictionCache(max_entries=2, ttl_s=-1, disk_dir=tmp_path, sweep_interval_s=60)
+    short_lived.put(cache_key(b"x", "model-a"), {"class": "x"})
+    assert files() == sorted(f"{key}.json" for key in keys)
+    assert short_lived.stats()["disk_swept"] == 1
+    short_lived.put(cache_key(b"y", "model-a"), {"class": "y"})
+    assert len(files()) == 4
+    assert short_lived.sweep_disk() == 1 and len(files()) == 3
+
+
+def test_predict_batch_accepts_files_and_archives(loaded_model):
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("scan/a.jpg", make_jpeg(color=(10, 200, 10)))
+        zf.writestr("scan/notes.txt", b"not an image")
+    files = [
+        ("files", ("one.jpg", make_jpeg(), "image/jpeg")),
+        ("files", ("broken.jpg", b"garbage", "image/jpeg")),
+        ("files", ("scans.zip", archive.getvalue(), "application/zip")),
+    ]
+
+    client = TestClient(app)
+    resp = client.post("/api/predict/batch", files=files)
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["filename"] for r in results] == ["one.jpg", "broken.jpg", "scan/a.jpg"]
+    assert results[1]["error"] == "Invalid image file"
+    single = client.post("/api/predict", files={"file": ("x.jpg", make_jpeg(), "image/jpeg")}).json()
+    assert results[0]["probs"] == pytest.approx(single["probs"], abs=1e-5)
+
+
+def test_predict_batch_stops_extracting_past_the_image_limit(loaded_model, monkeypatch):
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i in range(10):
+            zf.writestr(f"{i}.jpg", make_jpeg())
+    extracted = []
+
+    def counting_iter(data):
+        for image in iter_archive_images(data):
+            extracted.append(image[0])
+            yield image
+
+    monkeypatch.setattr("sniffnet.api.routes.predict.iter_archive_images", counting_iter)
+    monkeypatch.setattr("sniffnet.api.routes.predict.PREDICT_BULK_MAX_IMAGES", 3)
+    files = [
+        ("files", ("one.jpg", make_jpeg(), "image/jpeg")),
+        ("files", ("scans.zip", archive.getvalue(), "application/zip")),
+    ]
+    resp = TestClient(app).post("/api/predict/batch", files=files)
+    assert resp.status_code == 413
+    assert extracted == ["0.jpg", "1.jpg", "2.jpg"]
+
+
+def test_predict_batch_outlasting_the_deadline_still_completes(loaded_model, monkeypatch):
+    real_predict_batch = model_loader.predict_batch
+
+    def slow_predict_batch(batch, key):
+        time.sleep(0.3)
+        return real_predict_batch(batch, key=key)
+
+    monkeypatch.setattr("sniffnet.api.routes.predict.predict_batch", slow_predict_batch)
+    monkeypatch.setattr("sniffnet.api.routes.predict.PREDICT_BULK_CHUNK_SIZE", 1)
+    app.dependency_overrides[get_admission_controller] = lambda: AdmissionController(deadline_s=0.5)
+    files = [("files", (f"{i}.jpg", make_jpeg(color=(i, 90, 90)), "image/jpeg")) for i in range(4)]
+    try:
+        start = time.monotonic()
+        resp = TestClient(app).post("/api/predict/batch", files=files)
+    finally:
+        app.dependency_overrides.pop(get_admission_controller, None)
+    assert time.monotonic() - start > 0.5
+    assert resp.status_code == 200 and resp.json()["count"] == 4
+
+
+def test_bulk_job_streams_directory_and_archive_results(loaded_model, tmp_path, monkeypatch):
+    images = tmp_path / "images" / "crate"
+    images.mkdir(parents=True)
+    for i in range(5):
+        (images / f"{i}.jpg").write_bytes(make_jpeg(color=(40 * i, 100, 100)))
+    (images / "broken.png").write_bytes(b"not an image")
+
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.jpg", make_jpeg())
+        zf.writestr("notes.txt", "skipped")
+
+    jobs = BulkJobs(tmp_path / "jobs", batch_size=2)
+    app.dependency_overrides[get_bulk_jobs] = lambda: jobs
+    client = TestClient(app)
+    try:
+        # Server paths are refused until an input root is configured
+        assert client.post("/api/predict/jobs", data={"path": str(tmp_path / "images")}).status_code == 403
+        monkeypatch.setattr("sniffnet.api.routes.predict.PREDICT_JOBS_INPUT_ROOT", str(tmp_path / "images"))
+        assert client.post("/api/predict/jobs", data={"path": str(tmp_path / "jobs")}).status_code == 403
+
+        from_path = client.post("/api/predict/jobs", data={"path": str(tmp_path / "images")})
+        from_upload = client.post("/api/predict/jobs", files={"file": ("b.zip", archive.getvalue(), "application/zip")})
+        assert from_path.status_code == from_upload.status_code == 202
+
+        for job, total in ((from_path.json(), 6), (from_upload.json(), 1)):
+            deadline = time.monotonic() + 60
+            while (status := client.get(f"/api/predict/jobs/{job['id']}").json())["state"] in ("queued", "running"):
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+            assert (status["state"], status["total"], status["processed"]) == ("done", total, total)
+
+        assert from_path.json()["id"] != from_upload.json()["id"]
+        results = client.get(f"/api/predict/jobs/{from_path.json()['id']}/results", params={"limit": 10}).json()
+        by_name = {row["filename"]: row for row in results["results"]}
+        assert by_name["crate/broken.png"]["error"] == "Invalid image file"
+        assert by_name["crate/3.jpg"]["class"] in ("Fresh", "Bad")
+        assert not list((tmp_path / "jobs").glob("*.upload"))
+
+        assert client.get("/api/predict/jobs/" + "0" * 32).status_code == 404
+        assert client.post("/api/predict/jobs", data={"path": str(tmp_path / "images" / "missing")}).status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_bulk_jobs, None)
+
+
+def test_stored_model_weights_are_not_rewritten_while_the_model_loads(tmp_path):
+    weights_path = tmp_path / "model.pth"
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict(), "classes": ["Fresh", "Bad"]}, weights_path)
+
+    class NoDatabase:
+        def query(self, *args):
+            raise AssertionError("weights materialized again")
+
+    try:
+        model_loader.start_load(str(weights_path), "cpu", fuse=False, key="model:41")
+        # Loading or loaded, the registry entry is reused without touching the Model table
+        assert asyncio.run(predict_routes._resolve_model_key(41, NoDatabase())) == "model:41"
+        model_loader.get_model_blocking(timeout=60, key="model:41")
+        assert asyncio.run(predict_routes._resolve_model_key(41, NoDatabase())) == "model:41"
+    finally:
+        model_loader.unload("model:41")
+
+
+def test_bulk_job_worker_skips_corrupt_status_and_reloads_evicted_model(loaded_model, tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(3):
+        (images / f"{i}.jpg").write_bytes(make_jpeg(color=(60 * i, 100, 100)))
+    weights_path = tmp_path / "model.pth"
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict(), "classes": ["Fresh", "Bad"]}, weights_path)
+
+    loads = []
+
+    def load_model(key):
+        loads.append(key)
+        model_loader.start_load(str(weights_path), "cpu", fuse=False, key=key)
+
+    jobs = BulkJobs(tmp_path / "jobs", batch_size=2, load_model=load_model)
+    try:
+        # Loaded when the job was accepted, then evicted while it sat in the queue
+        load_model("jobs")
+        model_loader.get_model_blocking(timeout=60, key="jobs")
+        model_loader.unload("jobs")
+
+        corrupt_id = "f" * 32
+        (tmp_path / "jobs").mkdir()
+        (tmp_path / "jobs" / f"{corrupt_id}.json").write_text("{", encoding="utf-8")
+        jobs._ensure_worker()
+        jobs._queue.put(corrupt_id)
+        job = jobs.submit(images, key="jobs")
+
+        deadline = time.monotonic() + 60
+        while (status := jobs.get(job["id"]))["state"] in ("queued", "running"):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert (status["state"], status["processed"]) == ("done", 3)
+        assert loads == ["jobs", "jobs"]
+    finally:
+        model_loader.unload("jobs")
+
+
+def test_stream_replies_in_order_and_drops_stale_frames(loaded_model, monkeypatch):
+    client = TestClient(app)
+    with client.websocket_connect("/api/predict/stream") as ws:
+        for data in (make_jpeg(), b"garbage", make_jpeg(color=(0, 0, 255))):
+            ws.send_bytes(data)
+        replies = [ws.receive_json() for _ in range(3)]
+    assert [reply["frame"] for reply in replies] == [0, 1, 2]
+    assert replies[0]["class"] in ("Fresh", "Bad") and replies[1]["error"] == "Invalid image file"
+
+    # Labels are looked up again for every group of frames, e.g. after a hot swap
+    real_get_model = predict_routes._get_model_or_raise
+
+    async def relabelled(key):
+        model, transform, _ = await real_get_model(key=key)
+        return model, transform, ["Stale", "Spoiled"]
+
+    with client.websocket_connect("/api/predict/stream") as ws:
+        ws.send_bytes(make_jpeg())
+        assert ws.receive_json()["class"] in ("Fresh", "Bad")
+        monkeypatch.setattr(predict_routes, "_get_model_or_raise", relabelled)
+        ws.send_bytes(make_jpeg())
+        assert ws.receive_json()["class"] in ("Stale", "Spoiled")
+    monkeypatch.setattr(predict_routes, "_get_model_or_raise", real_get_model)
+
+    # A text message is unsupported data, not a server error
+    with client.websocket_connect("/api/predict/stream") as ws:
+        ws.send_text("hello")
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1003
+
+    # A model slower than the client: only the newest buffered frame survives
+    def slow_batch(items):
+        time.sleep(0.2)
+        return model_loader.predict_keyed_batch(items)
+
+    monkeypatch.setattr("sniffnet.api.routes.predict.PREDICT_STREAM_MAX_PENDING", 1)
+    app.dependency_overrides[get_predict_batcher] = lambda: MicroBatcher(slow_batch, max_wait_ms=1)
+    try:
+        with client.websocket_connect("/api/predict/stream") as ws:
+            for _ in range(5):
+                ws.send_bytes(make_jpeg())
+            replies = [ws.receive_json()]
+            while replies[-1]["frame"] != 4:
+                replies.append(ws.receive_json())
+    finally:
+        app.dependency_overrides.pop(get_predict_batcher, None)
+    assert replies[-1]["dropped"] > 0
+    assert replies[-1]["dropped"] + len(replies) == 5
+
+
+def test_video_timeline_merges_segments_of_equal_class():
+    times = np.array([0.0, 0.5, 1.0, 1.5, 2.0, 4.5])
+    probs = np.array([[0.9, 0.1], [0.7, 0.3], [0.6, 0.4], [0.8, 0.2], [0.2, 0.8], [0.1, 0.9]])
+    result = build_timeline(times, probs, ["Fresh", "Bad"], segment_s=1.0)
+
+    assert [(seg["start_s"], seg["class"], seg["frames"]) for seg in result["segments"]] == [
+        (0.0, "Fresh", 2), (1.0, "Fresh", 2), (2.0, "Bad", 1), (4.0, "Bad", 1)
+    ]
+    # Segments 2 and 4 agree, but the gap between them keeps them apart
+    runs = [(run["start_s"], run["end_s"], run["class"], run["segments"]) for run in result["timeline"]]
+    assert runs == [(0.0, 2.0, "Fresh", 2), (2.0, 3.0, "Bad", 1), (4.0, 5.0, "Bad", 1)]
+    assert result["timeline"][0]["confidence"] == pytest.approx(0.75)
+    assert result["summary"] == {"Fresh": pytest.approx(4 / 6), "Bad": pytest.approx(2 / 6)}
+
+
+def test_video_endpoint_classifies_sampled_frames(loaded_model, tmp_path):
+    av = pytest.importorskip("av")
+    video_path = tmp_path / "clip.mp4"
+    with av.open(str(video_path), "w") as container:
+        stream = container.add_stream("mpeg4", rate=10)
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        for i in range(30):
+            frame = np.full((48, 64, 3), (200 if i < 15 else 20, 120, 40), dtype=np.uint8)
+            container.mux(stream.encode(av.VideoFrame.from_ndarray(frame, format="rgb24")))
+        container.mux(stream.encode())
+
+    client = TestClient(app)
+    resp = client.post(
+        "/api/predict/video",
+        files={"file": ("clip.mp4", video_path.read_bytes(), "video/mp4")},
+        params={"sample_fps": 2, "segment_s": 1},
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["frames"] == 6
+    assert [seg["start_s"] for seg in body["segments"]] == [0.0, 1.0, 2.0]
+    assert all(run["class"] in ("Fresh", "Bad") for run in body["timeline"])
+    assert sum(run["frames"] for run in body["timeline"]) == 6
+
+    resp = client.post("/api/predict/video", files={"file": ("x.mp4", b"not a video" * 50, "video/mp4")})
+    assert resp.status_code == 400
+
+
+def test_perceptual_index_matches_near_duplicates_per_model():
+    preprocess = ImagePreprocessor()
+    rng = np.random.default_rng(0)
+
+    def scene(seed_pixels, brightness=1.0, quality=90):
+        image = Image.fromarray(np.kron(seed_pixels, np.ones((40, 40, 1))).astype(np.uint8))
+        image = Image.eval(image, lambda value: min(255, int(value * brightness)))
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        return dhash(preprocess(decode_image(buffer.getvalue())))
+
+    product = rng.integers(0, 255, (8, 8, 3))
+    frame, next_frame = scene(product), scene(product, brightness=1.05, quality=70)
+    unrelated = scene(rng.integers(0, 255, (8, 8, 3)))
+
+    index = PerceptualIndex(max_entries=8, max_distance=4)
+    index.put(frame, "model-a", {"class": "Fresh"})
+    assert index.get(next_frame, "model-a") == {"class": "Fresh"}
+    assert index.get(unrelated, "model-a") is None
+    # Predictions of other weights are never reused
+    assert index.get(frame, "model-b") is None
+    assert index.stats()["hits"] == 1
+
+
+def test_fast_preprocessing_matches_torchvision_pipeline():
+    from torchvision import transforms
+
+    reference = transforms.Compose(
+        [
+            transforms.Resize((224, 224)),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+        ]
+    )
+    rng = torch.Generator().manual_seed(0)
+    pixels = torch.randint(0, 256, (480, 640, 3), dtype=torch.uint8, generator=rng).numpy()
+    png = BytesIO()
+    Image.fromarray(pixels).save(png, format="PNG")
+
+    fast = ImagePreprocessor()
+    expected = reference(Image.open(BytesIO(png.getvalue())).convert("RGB"))
+    out = np.empty((3, 224, 224), dtype=np.float32)
+    actual = fast(decode_image(png.getvalue()), out=out)
+    assert actual is out
+    assert torch.allclose(torch.from_numpy(actual), expected, atol=1e-5)
+
+    # JPEG goes through reduced-scale draft decoding, so only approximately equal
+    jpeg = make_jpeg(size=(2000, 1500))
+    expected = reference(Image.open(BytesIO(jpeg)).convert("RGB"))
+    assert (torch.from_numpy(fast(decode_image(jpeg))) - expected).abs().max() < 0.1
+
+
+def test_conv_bn_fusion_is_numerically_equivalent():
+    torch.manual_seed(0)
+    model = create_resnet18(num_classes=2)
+    # Non-trivial BN statistics so folding actually changes the conv weights
+    for module in model.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+    model.eval()
+
+    fused = fuse_resnet(model)
+    assert not any(isinstance(m, torch.nn.BatchNorm2d) for m in fused.modules())
+    assert any(isinstance(m, torch.nn.BatchNorm2d) for m in model.modules())
+    assert check_equivalence(model, fused) < 1e-3
+
+
+def test_torchscript_serving_model_is_cached_next_to_checkpoint(tmp_path):
+    torch.manual_seed(0)
+    model = create_resnet18(num_classes=2).eval()
+    weights_path = tmp_path / "model.pth"
+    torch.save(model.state_dict(), weights_path)
+    device = torch.device("cpu")
+
+    scripted = build_serving_model(model, "torchscript", device, weights_path)
+    cache_file = scripted_cache_path(weights_path, fused=False)
+    assert cache_file.exists()
+
+    reloaded = build_serving_model(model, "torchscript", device, weights_path)
+    inputs = torch.randn(3, 3, 224, 224)
+    with torch.no_grad():
+        expected = model(inputs)
+        assert torch.allclose(scripted(inputs), expected, atol=1e-4)
+        assert torch.allclose(reloaded(inputs), expected, atol=1e-4)
+    assert set(warmup(TorchRunner(reloaded, device), [1, 2], iterations=1)) == {1, 2}
+
+
+def test_static_quantization_reports_accuracy_and_latency(tmp_path):
+    torch.manual_seed(0)
+    for name, color in (("Fresh", (30, 200, 30)), ("Bad", (120, 80, 20))):
+        folder = tmp_path / name
+        folder.mkdir()
+        for i in range(3):
+            (folder / f"{i}.jpg").write_bytes(make_jpeg(size=(256, 256), color=color))
+
+    model = create_resnet18(num_classes=2).eval()
+    quantized, report = build_quantized_model(
+        model, "static", ImagePreprocessor(), ["Fresh", "Bad"], str(tmp_path)
+    )
+    assert report["images"] == 6
+    assert report["accuracy_delta"] is not None
+    assert 0.0 <= report["top1_agreement"] <= 1.0
+    assert report["quantized_latency_ms"] > 0
+    with torch.no_grad():
+        assert quantized(torch.randn(2, 3, 224, 224)).shape == (2, 2)
+    logits, features = TorchRunner(quantized, torch.device("cpu"), quantized.avgpool).forward_features(
+        np.zeros((2, 3, 224, 224), dtype=np.float32)
+    )
+    assert logits.shape == (2, 2) and features.shape == (2, 512)
+
+
+def test_onnx_export_and_runtime_backend_match_torch(tmp_path):
+    torch.manual_seed(0)
+    model = create_resnet18(num_classes=2).eval()
+    weights_path = tmp_path / "model.pth"
+    torch.save({"model_state": model.state_dict(), "classes": ["Bad", "Fresh"]}, weights_path)
+
+    onnx_path = export_onnx(weights_path, tmp_path / "model.onnx")
+    runner, classes, _, info = load_onnx_runner(onnx_path)
+    assert classes == ["Bad", "Fresh"]
+    assert info["checkpoint_format"] == "onnx"
+    assert info["parameters"] == sum(p.numel() for p in fuse_resnet(model).parameters())
+
+    batch = np.random.default_rng(0).standard_normal((5, 3, 224, 224), dtype=np.float32)
+    with torch.no_grad():
+        expected, expected_features = (out.numpy() for out in model.forward_features(torch.from_numpy(batch)))
+    assert np.allclose(runner(batch), expected, atol=1e-3)
+    logits, features = runner.forward_features(batch)
+    assert np.allclose(logits, expected, atol=1e-3) and np.allclose(features, expected_features, atol=1e-3)
+
+
+def test_onnx_backend_exports_again_when_the_checkpoint_changes(tmp_path):
+    weights_path = tmp_path / "model.pth"
+    batch = np.random.default_rng(0).standard_normal((2, 3, 224, 224), dtype=np.float32)
+
+    def serve(seed):
+        torch.manual_seed(seed)
+        torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, weights_path)
+        os.utime(weights_path, ns=(seed, seed))
+        model_loader.unload("onnx")
+        model_loader.start_load(str(weights_path), "cpu", backend="onnxruntime", key="onnx")
+        runner, _, _ = model_loader.get_model_blocking(timeout=120, key="onnx")
+        return runner(batch)
+
+    try:
+        first = serve(0)
+        assert len(list(tmp_path.glob("model.*.onnx"))) == 1
+        # Same size, new mtime: the old export is stale and must not be served
+        second = serve(1)
+        assert len(list(tmp_path.glob("model.*.onnx"))) == 2
+        assert not np.allclose(first, second)
+    finally:
+        model_loader.unload("onnx")
+
+
+def test_explicit_onnx_file_is_part_of_the_model_identity(tmp_path):
+    weights_path, other_path, onnx_path = tmp_path / "model.pth", tmp_path / "other.pth", tmp_path / "served.onnx"
+    for seed, path in ((0, weights_path), (1, other_path)):
+        torch.manual_seed(seed)
+        torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, path)
+
+    try:
+        export_onnx(weights_path, onnx_path)
+        model_loader.start_load(str(weights_path), "cpu", backend="onnxruntime", onnx_path=str(onnx_path), key="onnx")
+        model_loader.get_model_blocking(timeout=120, key="onnx")
+        before = model_loader.get_model_identity("onnx")
+
+        # A new export at the same path, with the checkpoint untouched
+        export_onnx(other_path, onnx_path)
+        os.utime(onnx_path, ns=(1, 1))
+        assert model_loader.reload(key="onnx")
+        model_loader.wait_for_reload(timeout=120, key="onnx")
+        assert model_loader.get_model_identity("onnx") != before
+    finally:
+        model_loader.unload("onnx")
+
+
+def test_embedding_index_persists_grows_and_resets_on_new_weights(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((5, 8), dtype=np.float32)
+    index = EmbeddingIndex(tmp_path / "index", dim=8, dtype="float16", initial_capacity=2, flush_interval_s=60)
+
+    assert index.add(["a", "b", "c"], vectors[:3], [0, 1, 0], "v1", ["Fresh", "Bad"]) == 3
+    assert index.add(["c", "d", "e"], vectors[2:], [1, 1, 0], "v1", ["Fresh", "Bad"]) == 2
+    assert index.stats()["capacity"] == 8
+    # The files grew in place; the recorded count catches up on flush, not on every insert
+    assert (tmp_path / "index" / "vectors.bin").stat().st_size == 8 * 8 * 2
+    assert json.loads((tmp_path / "index" / "index.json").read_text())["count"] == 0
+    index.flush()
+    assert json.loads((tmp_path / "index" / "index.json").read_text())["count"] == 5
+
+    hits = index.search(vectors[3], k=2, identity="v1")
+    assert hits[0]["id"] == "d" and hits[0]["class"] == "Bad" and hits[0]["score"] == pytest.approx(1.0, abs=1e-3)
+    assert [hit["id"] for hit in index.search(vectors[3], k=4, identity="v1", exclude="d")][0] != "d"
+    assert index.search(vectors[3], k=2, identity="v2") == []
+
+    # Only one process may own the files
+    assert not EmbeddingIndex(tmp_path / "index", dim=8, dtype="float16").enabled
+    index.close()
+
+    reopened = EmbeddingIndex(tmp_path / "index", dim=8, dtype="float16")
+    assert reopened.stats()["entries"] == 5
+    assert np.allclose(reopened.get("d", "v1"), vectors[3] / np.linalg.norm(vectors[3]), atol=1e-3)
+    assert reopened.search(vectors[0], k=1, identity="v1")[0]["id"] == "a"
+
+    reopened.add(["x"], vectors[0], [0], "v2", ["Fresh", "Bad"])
+    assert reopened.stats()["entries"] == 1 and reopened.get("a", "v2") is None
+    reopened.close()
+
+
+def test_embedding_endpoint_shares_forward_pass_with_predictions(loaded_model, tmp_path):
+    pixels = np.zeros((3, 224, 224), dtype=np.float32)
+    plain, (probs, embedding) = model_loader.predict_keyed_batch(
+        [("default", pixels), ("default", pixels, model_loader.EMBEDDING_REQUIRED)]
+    )
+    assert np.allclose(plain, probs) and embedding.shape == (512,)
+
+    index = EmbeddingIndex(tmp_path / "index")
+    app.dependency_overrides[get_embedding_index] = lambda: index
+    try:
+        client = TestClient(app)
+        # Classifying feeds the index
+        assert client.post(
+            "/api/predict", files={"file": ("a.jpg", make_jpeg(color=(10, 200, 10)), "image/jpeg")}
+        ).status_code == 200
+        assert index.stats()["entries"] == 1
+
+        response = client.post(
+            "/api/predict/embedding",
+            files={"file": ("b.jpg", make_jpeg(color=(12, 198, 12)), "image/jpeg")},
+            data={"k": "5"},
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["embedding"]) == 512 and body["indexed"]
+        assert body["prediction"]["class"] in ("Fresh", "Bad")
+        assert len(body["neighbours"]) == 1 and body["neighbours"][0]["score"] > 0.9
+
+        neighbours = client.get(f"/api/predict/embedding/{body['id']}/neighbours", params={"k": 3}).json()
+        assert neighbours["neighbours"] == body["neighbours"]
+        assert client.get("/api/predict/embedding/unknown/neighbours").status_code == 404
+        assert client.get("/api/predict/embedding/index").json()["entries"] == 2
+    finally:
+        app.dependency_overrides.pop(get_embedding_index, None)
+        index.close()
+
+
+def test_model_registry_evicts_least_recently_used(loaded_model, tmp_path):
+    weights_path = tmp_path / "other.pth"
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, weights_path)
+
+    model_loader.configure_registry(max_models=2)
+    try:
+        for key in ("a", "b"):
+            model_loader.start_load(str(weights_path), "cpu", fuse=False, key=key)
+            model_loader.get_model_blocking(timeout=60, key=key)
+            pixels = np.zeros((3, 224, 224), dtype=np.float32)
+            rows = model_loader.predict_keyed_batch([(key, pixels), ("default", pixels), (key, pixels)])
+            assert [row.shape for row in rows] == [(2,)] * 3
+
+        # The pinned default model stays; "a" was least recently used
+        keys = [entry["key"] for entry in model_loader.list_models()]
+        assert sorted(keys) == ["b", "default"]
+        with pytest.raises(RuntimeError, match="model not loaded"):
+            model_loader.predict_batch([pixels], key="a")
+    finally:
+        model_loader.configure_registry()
+        model_loader.unload("b")
+
+
+def test_model_health_reports_self_benchmark(loaded_model, tmp_path):
+    weights_path = tmp_path / "bench.pth"
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, weights_path)
+
+    model_loader.start_load(str(weights_path), "cpu", fuse=False, health_batch_sizes=(1, 2), key="bench")
+    try:
+        model_loader.get_model_blocking(timeout=60, key="bench")
+        health = model_loader.get_model_health(key="bench")
+        assert set(health["latency_ms"]) == {"1", "2"}
+        assert health["latency_ms"]["2"]["ms_per_batch"] > 0
+        assert health["parameters"] == sum(p.numel() for p in create_resnet18(num_classes=2).parameters())
+        assert health["checkpoint_format"] == "model_state"
+        assert health["threads"]["intra_op"] >= 1
+        assert health["resident_memory_mb"] > 0
+    finally:
+        model_loader.unload("bench")
+
+    response = TestClient(app).get("/api/model/health")
+    assert response.status_code == 200
+    assert response.json()["backend"] == "torch"
+
+
+def test_reduced_width_checkpoint_loads_at_its_width(tmp_path):
+    model = create_resnet18(num_classes=2, width=16)
+    path = tmp_path / "small.pth"
+    torch.save({"model_state": model.state_dict()}, path)
+
+    assert resnet_width(model.state_dict()) == 16
+    assert resnet_width(create_resnet18().state_dict()) == 64
+    runner, _, _, _ = load_torch_runner(str(path), "cpu", fuse=False)
+    assert runner(np.zeros((1, 3, 112, 112), dtype=np.float32)).shape == (1, 2)
+
+
+def test_cascade_escalates_uncertain_images_to_full_model(loaded_model, tmp_path):
+    torch.manual_seed(0)
+    full_path, small_path = tmp_path / "full.pth", tmp_path / "small.pth"
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, full_path)
+    torch.save({"model_state": create_resnet18(num_classes=2, width=16).state_dict()}, small_path)
+    batch = np.random.default_rng(0).standard_normal((6, 3, 224, 224), dtype=np.float32)
+
+    model_loader.start_load(str(full_path), "cpu", fuse=False, key="full")
+    model_loader.get_model_blocking(timeout=60, key="full")
+    full_only = np.stack(model_loader.predict_batch(batch, key="full"))
+
+    def configure(threshold):
+        model_loader.configure_cascade(
+            str(small_path), threshold=threshold, input_stride=2, audit_rate=1.0, options={"fuse": False}, key="full"
+        )
+
+    try:
+        configure(0.0)
+        # The small model is still loading: the full model answers alone
+        assert np.allclose(np.stack(model_loader.predict_batch(batch, key="full")), full_only, atol=1e-5)
+        small, _, _ = model_loader.get_model_blocking(timeout=60, key="full:cascade")
+        assert model_loader.get_cascade_stats("full")["bypassed"] == 6
+
+        # Nothing is uncertain: small-model answers at half resolution, every one audited
+        small_only = model_loader.softmax(small(model_loader._pool_input(batch, 2)))
+        assert np.allclose(np.stack(model_loader.predict_batch(batch, key="full")), small_only, atol=1e-5)
+        stats = model_loader.get_cascade_stats("full")
+        assert (stats["escalated"], stats["audited"], stats["escalation_rate"]) == (0, 6, 0.0)
+        assert 0.0 <= stats["audit_agreement"] <= 1.0
+
+        # Everything is uncertain: all rows come from the full model
+        configure(1.01)
+        assert np.allclose(np.stack(model_loader.predict_batch(batch, key="full")), full_only, atol=1e-5)
+        stats = model_loader.get_cascade_stats("full")
+        assert stats["escalation_rate"] == 1.0 and stats["small_ms_per_image"] > 0
+        assert "sniffnet_cascade_images_total" in telemetry.render()
+
+        # Embeddings do not bypass the cascade: confident rows come back without one
+        # unless it is required, and keep the small model's answer either way
+        configure(0.0)
+        model_loader.configure_cascade(
+            str(small_path), threshold=0.0, input_stride=2, audit_rate=0.0, options={"fuse": False}, key="full"
+        )
+        required = np.array([True, False, False, False, False, False])
+        rows = model_loader.predict_batch(batch, key="full", embeddings=True, required=required)
+        assert np.allclose(np.stack([probs for probs, _ in rows]), small_only, atol=1e-5)
+        assert rows[0][1].shape == (512,) and all(embedding is None for _, embedding in rows[1:])
+        stats = model_loader.get_cascade_stats("full")
+        assert (stats["images"], stats["escalated"], stats["embedded"]) == (6, 0, 1)
+        with TestClient(app) as client:
+            assert client.get("/api/model/cascade").status_code == 404
+    finally:
+        model_loader.configure_cascade(None, key="full")
+        model_loader.unload("full")
+        model_loader.unload("full:cascade")
+
+
+def test_cascade_small_model_that_fails_to_load_is_not_retried(tmp_path):
+    full_path = tmp_path / "full.pth"
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, full_path)
+    batch = np.zeros((2, 3, 224, 224), dtype=np.float32)
+    failed_before = telemetry.MODEL_LOADS.value("broken:cascade", "failed")
+
+    model_loader.start_load(str(full_path), "cpu", fuse=False, key="broken")
+    model_loader.get_model_blocking(timeout=60, key="broken")
+    try:
+        model_loader.configure_cascade(str(tmp_path / "missing.pth"), options={"fuse": False}, key="broken")
+        model_loader.predict_batch(batch, key="broken")
+        with pytest.raises(RuntimeError):
+            model_loader.get_model_blocking(timeout=60, key="broken:cascade")
+        stats = model_loader.get_cascade_stats("broken")
+        assert stats["small_model_state"] == "error" and "Traceback" in stats["small_model_error"]
+
+        # Later batches keep bypassing without starting the load again
+        for _ in range(3):
+            assert len(model_loader.predict_batch(batch, key="broken")) == 2
+        assert not model_loader.is_loading("broken:cascade")
+        assert telemetry.MODEL_LOADS.value("broken:cascade", "failed") == failed_before + 1
+        assert model_loader.get_cascade_stats("broken")["bypassed"] == 8
+    finally:
+        model_loader.configure_cascade(None, key="broken")
+        model_loader.unload("broken")
+        model_loader.unload("broken:cascade")
+
+
+def test_reload_hot_swaps_weights_while_old_runner_keeps_serving(tmp_path):
+    weights_path = tmp_path / "swap.pth"
+    torch.manual_seed(1)
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, weights_path)
+    model_loader.start_load(str(weights_path), "cpu", fuse=False, key="swap")
+    old_runner, _, _ = model_loader.get_model_blocking(timeout=60, key="swap")
+
+    changes = []
+
+    def on_change():
+        changes.append(model_loader.reload(key="swap"))
+        return changes[-1]
+
+    watcher = WeightsWatcher(weights_path, on_change)
+    # A change arriving while another reload runs is retried until one can start
+    assert model_loader.reload(key="swap")
+    torch.manual_seed(2)
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict()}, weights_path)
+    # Any change is reported only after the file has stayed the same for one more poll
+    os.utime(weights_path, ns=(0, 0))
+    assert not watcher.poll()
+    assert not watcher.poll() and changes == [False]
+    model_loader.wait_for_reload(timeout=60, key="swap")
+    assert watcher.poll() and changes == [False, True]
+    assert not watcher.poll()
+
+    model_loader.wait_for_reload(timeout=60, key="swap")
+    try:
+        new_runner, _, _ = model_loader.get_model_blocking(key="swap")
+        assert new_runner is not old_runner
+        entry = next(entry for entry in model_loader.list_models() if entry["key"] == "swap")
+        # The reload started by hand, then the one the watcher retried
+        assert entry["generation"] == 2 and entry["state"] == "loaded"
+
+        # A batch that grabbed the old runner before the swap still completes on it
+        batch = np.zeros((1, 3, 224, 224), dtype=np.float32)
+        assert not np.allclose(old_runner(batch), new_runner(batch))
+        assert np.allclose(model_loader.predict_batch(batch, key="swap")[0].sum(), 1.0)
+    finally:
+        model_loader.unload("swap")
+
+
+def test_startup_steps_run_concurrently_and_gate_readiness():
+    def slow():
+        time.sleep(0.3)
+
+    def broken():
+        raise RuntimeError("database unreachable")
+
+    client = TestClient(app)
+    checks = StartupChecks({"migrations": slow, "model": slow})
+    app.state.startup = checks
+    try:
+        assert client.get("/api/ready").status_code == 503
+        start = time.perf_counter()
+        asyncio.run(checks.run())
+        assert time.perf_counter() - start < 0.55
+        resp = client.get("/api/ready")
+        assert resp.status_code == 200 and resp.json()["steps"]["model"]["status"] == "ready"
+
+        app.state.startup = StartupChecks({"database": broken})
+        asyncio.run(app.state.startup.run())
+        resp = client.get("/api/ready")
+        assert resp.status_code == 503
+        assert resp.json()["steps"]["database"]["error"] == "database unreachable"
+    finally:
+        del app.state.startup
+
+
+def test_crud_role_does_not_import_the_ml_stack():
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    probe = "import sys, sniffnet.api.main; print(sorted(m for m in ('torch', 'numpy', 'PIL') if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", probe], env={**env, "API_ROLE": "crud"}, check=True, capture_output=True, text=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_safetensors_checkpoint_is_memory_mapped_and_keeps_classes(tmp_path):
+    torch.manual_seed(0)
+    weights_path = tmp_path / "model.pth"
+    torch.save(
+        {"model_state": create_resnet18(num_classes=2).state_dict(), "classes": ["Bad", "Fresh"]}, weights_path
+    )
+
+    converted = convert_to_safetensors(weights_path)
+    assert converted.suffix == ".safetensors"
+    checkpoint = load_checkpoint(converted)
+    assert checkpoint["classes"] == ["Bad", "Fresh"]
+    assert checkpoint["class_to_idx"] == {"Fresh": 0, "Bad": 1}
+
+    # Default options: fusion would copy the weights, so it is skipped for mapped ones
+    runner, classes, _, info = load_torch_runner(converted, "cpu")
+    reference, _, _, _ = load_torch_runner(weights_path, "cpu", fuse=False)
+    assert classes == ["Bad", "Fresh"]
+    assert not info["fused"] and info["weights_mapped"]
+    batch = np.zeros((1, 3, 224, 224), dtype=np.float32)
+    assert np.allclose(runner(batch), reference(batch), atol=1e-5)
+
+    mapping = []
+    with open("/proc/self/maps", "r", encoding="ascii") as fh:
+        for line in fh:
+            fields = line.split()
+            if len(fields) >= 6 and fields[5] == os.path.realpath(converted):
+                mapping.append(tuple(int(address, 16) for address in fields[0].split("-")))
+    pointers = [parameter.data_ptr() for parameter in runner.model.parameters()]
+    assert mapping and all(any(start <= ptr < end for start, end in mapping) for ptr in pointers)
+
+
+@contextmanager
+def prefork_server(**env):
+    """Run ``main()`` with two pre-forked workers on a free port; yields the base URL."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(sys.path),
+        "API_WORKERS": "2",
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(port),
+        "STARTUP_RUN_MIGRATIONS": "0",
+        **env,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-c", "from sniffnet.api.main import main; main()"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.time() + 60
+        while True:
+            try:
+                stats = json.loads(urllib.request.urlopen(f"{url}/api/workers", timeout=5).read())
+                if all(worker["pid"] for worker in stats["workers"]):
+                    break
+            except OSError:
+                pass
+            assert time.time() < deadline, "pre-fork server did not start"
+            time.sleep(0.2)
+        yield url
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def test_prefork_serves_from_workers_and_reports_memory():
+    with prefork_server(API_ROLE="crud") as url:
+        for _ in range(10):
+            stats = json.loads(urllib.request.urlopen(f"{url}/api/workers", timeout=5).read())
+        assert len({worker["pid"] for worker in stats["workers"]}) == 2
+        assert stats["total_requests"] >= 10
+        assert stats["throughput_rps"] > 0
+        assert all(worker["memory"]["pss_mb"] > 0 for worker in stats["workers"])
+
+
+def test_prefork_inference_workers_predict_with_their_own_threads(tmp_path):
+    torch.manual_seed(0)
+    weights_path = tmp_path / "model.pth"
+    torch.save({"model_state": create_resnet18(num_classes=2).state_dict(), "classes": ["Fresh", "Bad"]}, weights_path)
+    env = {
+        "API_ROLE": "inference",
+        # Readiness includes a database warmup
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'sniffnet.db'}",
+        "API_WORKER_THREADS": "2",
+        "INFERENCE_WORKERS": "1",
+        "MODEL_WEIGHTS_PATH": str(weights_path),
+        "MODEL_WARMUP_BATCH_SIZES": "1",
+        "MODEL_HEALTH_BATCH_SIZES": "1",
+    }
+    with prefork_server(**env) as url, httpx.Client(base_url=url, timeout=30) as client:
+        deadline = time.time() + 60
+        # Both workers are ready once several requests in a row say so
+        ready = 0
+        while ready < 10:
+            ready = ready + 1 if client.get("/api/ready").status_code == 200 else 0
+            assert time.time() < deadline, "pre-fork workers did not become ready"
+
+        # The parent loaded the model single-threaded; each worker benchmarked it with its own threads
+        for _ in range(10):
+            health = client.get("/api/model/health").json()
+            assert health["threads"]["intra_op"] == 2
+            assert set(health["latency_ms"]) == {"1"}
+
+        for i in range(6):
+            image = make_jpeg(color=(40 * i, 100, 100))
+            resp = client.post("/api/predict", files={"file": (f"{i}.jpg", image, "image/jpeg")})
+            assert resp.status_code == 200 and resp.json()["class"] in ("Fresh", "Bad")
+        stats = client.get("/api/workers").json()
+        assert stats["total_requests"] >= 6 + 10
+        assert all(worker["memory"]["pss_mb"] > 0 for worker in stats["workers"])
+
+
+def test_prometheus_endpoint_exposes_per_stage_latency(loaded_model):
+    client = TestClient(app)
+    client.post("/api/predict", files={"file": ("s.jpg", make_jpeg(color=(1, 2, 3)), "image/jpeg")})
+    client.post("/api/predict", files={"file": ("bad.jpg", b"garbage", "image/jpeg")})
+
+    resp = client.get("/api/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    for stage in ("read", "model", "decode", "transform", "batch"):
+        assert f'sniffnet_predict_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'sniffnet_predict_requests_total{endpoint="predict",outcome="client_error"}' in text
+    assert 'sniffnet_predict_in_flight{endpoint="predict"} 0' in text
+    assert 'sniffnet_model_forward_seconds_bucket{model="default",le="+Inf"}' in text
+    assert 'sniffnet_model_load_seconds{model="default"}' in text
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = telemetry.Histogram("test_latency_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    try:
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, "x")
+        lines = histogram.render().splitlines()
+        assert 'test_latency_seconds_bucket{stage="x",le="0.1"} 1' in lines
+        assert 'test_latency_seconds_bucket{stage="x",le="1"} 3' in lines
+        assert 'test_latency_seconds_bucket{stage="x",le="+Inf"} 4' in lines
+        assert 'test_latency_seconds_count{stage="x"} 4' in lines
+    finally:
+        telemetry.REGISTRY.remove(histogram)